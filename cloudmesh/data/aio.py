@@ -0,0 +1,158 @@
+import contextvars
+import functools
+import io
+import os
+import shutil
+import threading
+import typing
+
+"""
+Helpers for the asyncio API of Data.
+
+Jobs that run in python are offloaded to the default executor, gzip, bz2,
+lzma and zstd release the GIL while they compress. A running thread can
+not be interrupted, so a cancelled job is stopped cooperatively: the job
+runs in a copy of the context in which CANCEL holds an event, the archive
+file it reads or writes is wrapped in a CancellableFile, and the next read
+or write after the event is set raises. The job then removes its partial
+output like after any other error.
+
+asyncio is imported by the coroutines, so that the synchronous API does
+not pay for its import.
+"""
+
+# the event of the offloaded job running in this context
+CANCEL: contextvars.ContextVar = contextvars.ContextVar('cancel', default=None)
+
+
+class CancellableFile(io.RawIOBase):
+
+    def __init__(self, fileobj: typing.BinaryIO, event: threading.Event):
+        """File object that raises once a job is cancelled
+
+        Args:
+            fileobj: the wrapped binary file object
+            event(threading.Event): set when the job is cancelled
+        """
+        super().__init__()
+        self._fileobj = fileobj
+        self._event = event
+        self.name = getattr(fileobj, 'name', None)
+        self.mode = getattr(fileobj, 'mode', None)
+
+    def _check(self):
+        if self._event.is_set():
+            raise RuntimeError(f"Cancelled {self.name}")
+
+    def readable(self):
+        return self._fileobj.readable()
+
+    def writable(self):
+        return self._fileobj.writable()
+
+    def seekable(self):
+        return self._fileobj.seekable()
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._fileobj.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._fileobj.tell()
+
+    def readinto(self, b) -> int:
+        self._check()
+        return self._fileobj.readinto(b)
+
+    def write(self, b) -> int:
+        self._check()
+        return self._fileobj.write(b)
+
+    def flush(self):
+        if not self._fileobj.closed:
+            self._fileobj.flush()
+
+    def close(self):
+        # the owner of the wrapped file closes it
+        super().close()
+
+
+def cancellable(fileobj: typing.BinaryIO) -> typing.BinaryIO:
+    """Wraps a file object if the calling job can be cancelled"""
+    event = CANCEL.get()
+    return fileobj if event is None else CancellableFile(fileobj, event)
+
+
+def remove(path: typing.Optional[str]):
+    """Removes a partial output file or directory"""
+    if path is None or not os.path.lexists(path):
+        return
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        os.remove(path)
+
+
+async def offload(function: typing.Callable, *args, output: str = None, **kwargs) -> typing.Any:
+    """Runs a blocking job on the default executor
+
+    Cancelling the awaiting task sets the event of the job, waits until it
+    stopped and removes `output` if it did not exist before the job.
+
+    Args:
+        function: the job
+        *args: the arguments of the job
+        output(str): the file or directory the job creates
+        **kwargs: the keyword arguments of the job
+
+    Returns:
+        the result of the job
+    """
+    import asyncio
+
+    existed = output is not None and os.path.lexists(output)
+    event = threading.Event()
+    context = contextvars.copy_context()
+    context.run(CANCEL.set, event)
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(None, functools.partial(context.run, function, *args, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        event.set()
+        try:
+            await future
+        except Exception:
+            pass
+        if not existed:
+            remove(output)
+        raise
+
+
+async def feed(source: typing.BinaryIO, writer: 'asyncio.StreamWriter', size: int):
+    """Writes a file object into the stdin of a process and closes it"""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, source.read, size)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def drain(reader: 'asyncio.StreamReader', destination: typing.BinaryIO, size: int):
+    """Writes the stdout of a process into a file object"""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await reader.read(size)
+        if not chunk:
+            break
+        await loop.run_in_executor(None, destination.write, chunk)
@@ -0,0 +1,242 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import typing
+
+from cloudmesh.data import create
+from cloudmesh.data.block import MB
+from cloudmesh.data.codec import ALL_CODECS
+from cloudmesh.data.codec import available
+from cloudmesh.data.data import CompressExtensions
+from cloudmesh.data.data import NativeData
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.estimate import files
+from cloudmesh.data.metrics import rusage
+
+"""
+Benchmark matrix of algorithm x level x backend x corpus.
+
+Every run is executed in a child process so that the CPU time and the
+peak RSS belong to that run alone. The CPU time includes the native tools
+started by the run. The peak RSS is the larger of the python process and
+its largest tool and includes the interpreter itself.
+"""
+
+BACKENDS = {
+    'native': NativeData,
+    'python': PythonData,
+}
+
+# the default corpora, every generator of cloudmesh.data.create can be used
+CORPORA = ('ascii', 'random', 'mixed', 'tree')
+
+ORDER = ['corpus', 'backend', 'algorithm', 'level', 'action', 'status',
+         'input', 'output', 'ratio', 'seconds', 'mb_in', 'mb_out',
+         'user', 'sys', 'rss']
+
+
+def create_corpus(kind: str, directory: str, size: str = "10MB", files: int = 1000) -> str:
+    """Creates a benchmark corpus with cloudmesh.data.create
+
+    Args:
+        kind(str): a generator of cloudmesh.data.create or tree
+        directory(str): the directory the corpus is created in
+        size(str): the size, e.g. 10MB
+        files(int): the number of files of a tree
+
+    Returns:
+        str: the path of the file or directory
+    """
+    path = os.path.join(directory, f"corpus_{kind}")
+    if kind == 'tree':
+        os.makedirs(path, exist_ok=True)
+        create.tree(path, size, files=files, verbose=False)
+    elif kind in create.GENERATORS:
+        create.GENERATORS[kind](path, size, verbose=False)
+    else:
+        raise RuntimeError(f"Unknown corpus {kind}")
+    return path
+
+
+def _child(writer, function, args):
+    try:
+        usage = rusage()
+        start = time.perf_counter()
+        function(*args)
+        seconds = time.perf_counter() - start
+        result = {'seconds': seconds}
+        if usage is not None:
+            end = rusage()
+            result.update({
+                'user': end['user'] - usage['user'],
+                'sys': end['sys'] - usage['sys'],
+                'rss': end['rss'],
+            })
+        writer.send(result)
+    except Exception as e:
+        writer.send({'error': str(e)})
+    finally:
+        writer.close()
+
+
+def measure(function: typing.Callable, *args) -> dict:
+    """Runs a function in a child process and measures it
+
+    Args:
+        function: a module level function
+        *args: its arguments
+
+    Returns:
+        dict: seconds, user and sys CPU seconds and the peak rss in bytes
+
+    Raises:
+        RuntimeError: if the function raised an exception
+    """
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_child, args=(writer, function, args))
+    process.start()
+    writer.close()
+    try:
+        result = reader.recv()
+    except EOFError:
+        result = {'error': f"benchmark process died with exit code {process.exitcode}"}
+    process.join()
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result
+
+
+def _compress(backend, algorithm, level, workers, source, destination):
+    data = BACKENDS[backend](algorithm=algorithm, workers=workers)
+    data.compress(source=source, destination=destination, level=level)
+
+
+def _uncompress(backend, algorithm, workers, source, destination):
+    data = BACKENDS[backend](algorithm=algorithm, workers=workers)
+    data.uncompress(source=source, destination=destination)
+
+
+def _size(path: str) -> int:
+    return sum(size for _, size in files(path))
+
+
+def _row(corpus, backend, algorithm, level, action, status, input_, output, run=None):
+    row = dict(corpus=corpus, backend=backend, algorithm=algorithm, level=level,
+               action=action, status=status, input=input_, output=output,
+               ratio=None, seconds=None, mb_in=None, mb_out=None,
+               user=None, sys=None, rss=None)
+    if run is not None:
+        seconds = run['seconds']
+        row.update(seconds=round(seconds, 4),
+                   mb_in=round(input_ / MB / seconds, 2) if seconds else None,
+                   mb_out=round(output / MB / seconds, 2) if seconds else None,
+                   user=round(run['user'], 4) if 'user' in run else None,
+                   sys=round(run['sys'], 4) if 'sys' in run else None,
+                   rss=run.get('rss'))
+        compressed = output if action == 'compress' else input_
+        uncompressed = input_ if action == 'compress' else output
+        row['ratio'] = round(compressed / uncompressed, 4) if uncompressed else None
+    return row
+
+
+def benchmark(algorithms: typing.List[str] = None,
+              levels: typing.List[int] = None,
+              backends: typing.List[str] = None,
+              corpora: typing.List[str] = None,
+              size: str = "10MB",
+              workers: int = 1,
+              directory: str = None) -> typing.List[dict]:
+    """Runs the benchmark matrix
+
+    For every corpus, backend, algorithm and level the corpus is
+    compressed and uncompressed again. Files are compressed with the plain
+    codec, trees with its tar variant.
+
+    Args:
+        algorithms(list): the codecs, by default all that are available
+        levels(list): the levels, by default 1, 5 and 9
+        backends(list): native and/or python
+        corpora(list): generators of cloudmesh.data.create and/or tree
+        size(str): the size of each corpus
+        workers(int): the workers of each run
+        directory(str): the working directory, by default a temporary
+            directory that is removed at the end
+
+    Returns:
+        list: a row per run with corpus, backend, algorithm, level, action,
+            status, input and output bytes, ratio, seconds, MB/s in and out,
+            user and sys CPU seconds and peak rss in bytes
+    """
+    algorithms = algorithms or [codec for codec in ALL_CODECS if available(codec)]
+    levels = levels or [1, 5, 9]
+    backends = backends or list(BACKENDS)
+    corpora = corpora or list(CORPORA)
+
+    cleanup = directory is None
+    directory = directory or tempfile.mkdtemp(prefix="cloudmesh-data-benchmark-")
+    os.makedirs(directory, exist_ok=True)
+    rows = []
+    try:
+        for corpus in corpora:
+            source = create_corpus(corpus, directory, size)
+            original = _size(source)
+            for backend in backends:
+                for codec in algorithms:
+                    algorithm = f"tar{codec}" if os.path.isdir(source) else codec
+                    for level in levels:
+                        archive = os.path.join(directory, f"{corpus}.{backend}.{level}") + \
+                            CompressExtensions.extension(algorithm)
+                        restored = os.path.join(directory, f"restored.{corpus}.{backend}.{level}")
+                        try:
+                            BACKENDS[backend](algorithm=algorithm)
+                        except RuntimeError:
+                            rows.append(_row(corpus, backend, algorithm, level, 'compress',
+                                             'skipped', original, None))
+                            continue
+                        action = 'compress'
+                        try:
+                            run = measure(_compress, backend, algorithm, int(level), workers, source, archive)
+                            compressed = os.path.getsize(archive)
+                            rows.append(_row(corpus, backend, algorithm, level, 'compress',
+                                             'ok', original, compressed, run))
+                            action = 'uncompress'
+                            run = measure(_uncompress, backend, algorithm, workers, archive, restored)
+                            rows.append(_row(corpus, backend, algorithm, level, 'uncompress',
+                                             'ok', compressed, original, run))
+                        except RuntimeError as e:
+                            rows.append(_row(corpus, backend, algorithm, level, action,
+                                             f'failed: {e}', original, None))
+                        finally:
+                            for path in (archive, restored):
+                                if os.path.isdir(path):
+                                    shutil.rmtree(path)
+                                elif os.path.exists(path):
+                                    os.remove(path)
+    finally:
+        if cleanup:
+            shutil.rmtree(directory, ignore_errors=True)
+    return rows
+
+
+def write(rows: typing.List[dict], output: str = 'csv') -> str:
+    """Formats benchmark rows as csv or json
+
+    Args:
+        rows(list): the rows as returned by benchmark
+        output(str): csv or json
+
+    Returns:
+        str: the formatted rows
+    """
+    if output == 'json':
+        return json.dumps(rows, indent=2)
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, fieldnames=ORDER)
+    writer.writeheader()
+    writer.writerows(rows)
+    return stream.getvalue()
@@ -0,0 +1,717 @@
+import collections
+import concurrent.futures
+import io
+import os
+import re
+import struct
+import typing
+import zlib
+
+from cloudmesh.data.codec import optional
+
+"""
+Block-parallel compression.
+
+The input stream is cut into independent blocks that are compressed on a
+thread pool. zlib, lzma and bz2 release the GIL while they work, so threads
+scale with the number of cores without the pickling cost of a process pool.
+The blocks are written back in order and always produce a standard file:
+
+gz:  one gzip member per block (multi-member gzip, RFC 1952)
+bz2: one bz2 stream per block (concatenated streams)
+xz:  one xz stream with one block per input block and a proper index
+
+Every gzip member carries an extra subfield 'CM' with the total size of the
+member so that a reader can find the member boundaries without inflating.
+
+Decompression reverses this. The boundaries of the independent units are
+found from the xz index, the 'CM' subfield of the gzip member headers or
+the bz2 stream magic, the units are decompressed on a thread pool and the
+output is returned in order. Archives with a single unit are left to the
+regular sequential readers.
+"""
+
+KB = 1024
+MB = KB ** 2
+
+XZ_MAGIC = b'\xfd7zXZ\x00'
+XZ_FOOTER_MAGIC = b'YZ'
+XZ_CHECK_CRC32 = 0x01
+XZ_FILTER_LZMA2 = 0x21
+
+GZ_MAGIC = b'\x1f\x8b'
+GZ_SUBFIELD = b'CM'
+
+# the dictionary size xz uses for the presets 0 to 9
+XZ_PRESET_DICT = (256 * KB, 1 * MB, 2 * MB, 4 * MB, 4 * MB,
+                  8 * MB, 8 * MB, 16 * MB, 32 * MB, 64 * MB)
+
+CODECS = ('gz', 'bz2', 'xz')
+
+# codecs with a container that can hold uncompressed data, gz uses deflate
+# stored blocks and xz uncompressed LZMA2 chunks
+STORE_CODECS = ('gz', 'xz')
+
+# the start of a bz2 stream with data or of an empty bz2 stream
+BZ2_STREAM = re.compile(rb'BZh[1-9](?:1AY&SY|\x17rE8P\x90)')
+
+# a compressed unit of an archive that can be decompressed on its own
+Segment = collections.namedtuple('Segment', 'offset length info')
+
+
+def resolve_workers(workers: typing.Optional[int]) -> int:
+    """Translates a requested worker count into a real one
+
+    Args:
+        workers(int): the number of workers, 0 selects one worker per cpu
+            and None selects a single worker.
+
+    Returns:
+        int: the number of workers to use
+    """
+    if workers is None:
+        return 1
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def default_block_size(codec: str, level: int = 5) -> int:
+    """Block size used when none is specified
+
+    xz needs blocks of a few dictionaries to reach its normal ratio, this is
+    also what `xz -T` does. gzip and bz2 only look back 32 KB and 900 KB so
+    smaller blocks do not cost ratio.
+
+    Args:
+        codec(str): one of gz, bz2, xz
+        level(int): the compression level
+
+    Returns:
+        int: the block size in bytes
+    """
+    if codec == 'xz':
+        return 3 * xz_dict_size(level)
+    return 4 * MB
+
+
+def varint(value: int) -> bytes:
+    """Encodes an integer as xz multibyte integer"""
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def xz_dict_size(level: int) -> int:
+    return XZ_PRESET_DICT[min(max(int(level), 0), 9)]
+
+
+def xz_dict_props(dict_size: int) -> int:
+    """Encodes a dictionary size as the LZMA2 filter property byte"""
+    for bits in range(40):
+        if (2 | (bits & 1)) << (bits // 2 + 11) >= dict_size:
+            return bits
+    return 40
+
+
+def read_varint(data: bytes, position: int) -> typing.Tuple[int, int]:
+    """Decodes an xz multibyte integer
+
+    Returns:
+        tuple: (value, position after the integer)
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
+        if shift > 63:
+            raise ValueError("Invalid xz multibyte integer")
+
+
+def xz_stream_header(flags: bytes = bytes([0, XZ_CHECK_CRC32])) -> bytes:
+    return XZ_MAGIC + flags + struct.pack('<I', zlib.crc32(flags))
+
+
+def xz_index(records: typing.List[typing.Tuple[int, int]]) -> bytes:
+    """Creates the xz index
+
+    Args:
+        records: list of (unpadded size, uncompressed size) for each block
+
+    Returns:
+        bytes: the index including its padding and CRC32
+    """
+    index = bytearray(b'\x00')
+    index += varint(len(records))
+    for unpadded, uncompressed in records:
+        index += varint(unpadded)
+        index += varint(uncompressed)
+    index += b'\x00' * (-len(index) % 4)
+    index += struct.pack('<I', zlib.crc32(index))
+    return bytes(index)
+
+
+def xz_stream_footer(index_size: int, flags: bytes = bytes([0, XZ_CHECK_CRC32])) -> bytes:
+    backward = struct.pack('<I', index_size // 4 - 1)
+    return struct.pack('<I', zlib.crc32(backward + flags)) + backward + flags + XZ_FOOTER_MAGIC
+
+
+def xz_block_header(compressed: int, uncompressed: int, dict_size: int) -> bytes:
+    """Creates the header of an xz block with a single LZMA2 filter
+
+    The header records the compressed and uncompressed size so that
+    readers can locate and size the block without decoding it.
+    """
+    body = bytearray([0xC0])
+    body += varint(compressed)
+    body += varint(uncompressed)
+    body += varint(XZ_FILTER_LZMA2) + varint(1) + bytes([xz_dict_props(dict_size)])
+    size = (1 + len(body) + 4 + 3) & ~3
+    header = bytearray([size // 4 - 1]) + body
+    header += b'\x00' * (size - 4 - len(header))
+    header += struct.pack('<I', zlib.crc32(header))
+    return bytes(header)
+
+
+def xz_pack_block(data: bytes, payload: bytes, dict_size: int) -> typing.Tuple[bytes, int, int]:
+    header = xz_block_header(len(payload), len(data), dict_size)
+    unpadded = len(header) + len(payload) + 4
+    block = b''.join([header,
+                      payload,
+                      b'\x00' * (-len(payload) % 4),
+                      struct.pack('<I', zlib.crc32(data))])
+    return block, unpadded, len(data)
+
+
+def xz_block(data: bytes, level: int = 5) -> typing.Tuple[bytes, int, int]:
+    """Compresses data into a single xz block
+
+    Args:
+        data(bytes): the uncompressed data
+        level(int): the xz preset
+
+    Returns:
+        tuple: (block bytes, unpadded size, uncompressed size)
+    """
+    lzma = optional('lzma')
+    dict_size = max(4 * KB, min(xz_dict_size(level), len(data)))
+    compressor = lzma.LZMACompressor(
+        format=lzma.FORMAT_RAW,
+        filters=[{'id': lzma.FILTER_LZMA2,
+                  'preset': int(level),
+                  'dict_size': dict_size}])
+    payload = compressor.compress(data) + compressor.flush()
+    return xz_pack_block(data, payload, dict_size)
+
+
+def xz_stored_block(data: bytes, level: int = None) -> typing.Tuple[bytes, int, int]:
+    """Stores data in a single xz block without compressing it
+
+    The data is framed as uncompressed LZMA2 chunks of at most 64 KB, so
+    the only work is the copy and the CRC32.
+
+    Args:
+        data(bytes): the uncompressed data
+        level(int): ignored, provided to match the signature of xz_block
+
+    Returns:
+        tuple: (block bytes, unpadded size, uncompressed size)
+    """
+    chunks = []
+    view = memoryview(data)
+    for start in range(0, len(data), 64 * KB):
+        chunk = view[start:start + 64 * KB]
+        control = 0x01 if start == 0 else 0x02
+        chunks.append(struct.pack('>BH', control, len(chunk) - 1))
+        chunks.append(chunk)
+    chunks.append(b'\x00')
+    return xz_pack_block(data, b''.join(chunks), 64 * KB)
+
+
+def gz_member(data: bytes, level: int = 5) -> bytes:
+    """Compresses data into a single gzip member
+
+    Args:
+        data(bytes): the uncompressed data
+        level(int): the deflate level 0 to 9
+
+    Returns:
+        bytes: the gzip member
+    """
+    compressor = zlib.compressobj(int(level), zlib.DEFLATED, -zlib.MAX_WBITS)
+    payload = compressor.compress(data) + compressor.flush()
+    extra_size = 4 + 8
+    size = 10 + 2 + extra_size + len(payload) + 8
+    xfl = 2 if level == 9 else 4 if level == 1 else 0
+    header = struct.pack('<BBBBIBBH', 0x1f, 0x8b, 8, 0x04, 0, xfl, 255, extra_size)
+    extra = GZ_SUBFIELD + struct.pack('<HQ', 8, size)
+    trailer = struct.pack('<II', zlib.crc32(data), len(data) & 0xffffffff)
+    return b''.join([header, extra, payload, trailer])
+
+
+def bz2_stream(data: bytes, level: int = 5) -> bytes:
+    return optional('bz2').compress(data, min(max(int(level), 1), 9))
+
+
+class BlockWriter(io.RawIOBase):
+
+    def __init__(self,
+                 fileobj: typing.BinaryIO,
+                 codec: str = 'xz',
+                 level: int = 5,
+                 workers: int = 0,
+                 block_size: int = None,
+                 store: bool = False):
+        """Write only file object that compresses blocks in parallel
+
+        Data written to the object is collected into blocks of `block_size`
+        bytes. Each block is compressed independently on a thread pool and
+        the results are written to `fileobj` in their original order. At
+        most two blocks per worker are in flight, so the memory use is
+        bounded by the block size and the number of workers.
+
+        Args:
+            fileobj: the binary file object the compressed data is written to
+            codec(str): one of gz, bz2, xz
+            level(int): the compression level
+            workers(int): number of threads, 0 uses one thread per cpu
+            block_size(int): the uncompressed size of a block
+            store(bool): write the blocks uncompressed in a valid gz or xz
+                container, used for data that does not compress
+        """
+        super().__init__()
+        if codec not in CODECS:
+            raise RuntimeError(f"Unsupported algorithm {codec}")
+        if store and codec not in STORE_CODECS:
+            raise RuntimeError(f"The algorithm {codec} can not store data uncompressed")
+        if codec == 'xz' and optional('lzma') is None:
+            raise RuntimeError("System not built with LZMA support")
+        self._fileobj = fileobj
+        self._codec = codec
+        self._level = 5 if level is None else int(level)
+        self._store = store
+        self._workers = resolve_workers(workers)
+        self._block_size = block_size or default_block_size(codec, 0 if store else self._level)
+        self._buffer = bytearray()
+        self._pending = collections.deque()
+        self._records = []
+        self._blocks = 0
+        # the compressed segments and their uncompressed sizes in file order
+        self.segments = []
+        self.sizes = []
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._workers)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if codec == 'xz':
+            self._emit(xz_stream_header())
+
+    def writable(self):
+        return True
+
+    def write(self, b) -> int:
+        if self.closed:
+            raise ValueError("write to closed file")
+        self._buffer += b
+        size = len(b) if not isinstance(b, memoryview) else b.nbytes
+        self.bytes_in += size
+        while len(self._buffer) >= self._block_size:
+            block = bytes(self._buffer[:self._block_size])
+            del self._buffer[:self._block_size]
+            self._submit(block)
+        return size
+
+    def switch(self, store: bool):
+        """Stores or compresses the data written from now on
+
+        The data written so far in the other mode is cut into a block of
+        its own, so no block mixes stored and compressed data.
+
+        Args:
+            store(bool): write the following data uncompressed in the gz
+                or xz container
+        """
+        if store == self._store:
+            return
+        if store and self._codec not in STORE_CODECS:
+            raise RuntimeError(f"The algorithm {self._codec} can not store data uncompressed")
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        self._store = store
+
+    def _submit(self, block: bytes):
+        level = 0 if self._store else self._level
+        if self._codec == 'xz':
+            encode = xz_stored_block if self._store else xz_block
+            future = self._executor.submit(encode, block, level)
+        elif self._codec == 'gz':
+            future = self._executor.submit(gz_member, block, level)
+        else:
+            future = self._executor.submit(bz2_stream, block, level)
+        self._pending.append((future, len(block)))
+        self._blocks += 1
+        self._drain(2 * self._workers)
+
+    def _drain(self, limit: int):
+        while len(self._pending) > limit:
+            future, size = self._pending.popleft()
+            result = future.result()
+            info = None
+            if self._codec == 'xz':
+                result, unpadded, uncompressed = result
+                info = (bytes([0, XZ_CHECK_CRC32]), unpadded, uncompressed)
+            self._append(result, size, info)
+
+    def _append(self, data: bytes, size: int, info: typing.Optional[tuple]):
+        """Writes a compressed block, the blocks arrive in file order"""
+        if info is not None:
+            self._records.append(info[1:])
+        self.segments.append(Segment(self.bytes_out, len(data), info))
+        self.sizes.append(size)
+        self._emit(data)
+
+    def _finish(self):
+        """Ends the stream after its last block, xz needs an index"""
+        if self._codec == 'xz':
+            index = xz_index(self._records)
+            self._emit(index)
+            self._emit(xz_stream_footer(len(index)))
+
+    def _emit(self, data: bytes):
+        self._fileobj.write(data)
+        self.bytes_out += len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer or self._blocks == 0:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            self._drain(0)
+            self._finish()
+            self._fileobj.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            super().close()
+
+
+def compress_file(source: str,
+                  destination: str,
+                  codec: str = 'xz',
+                  level: int = 5,
+                  workers: int = 0,
+                  block_size: int = None,
+                  store: bool = False) -> str:
+    """Compresses a single file with the block-parallel writer
+
+    Args:
+        source(str): the file to compress
+        destination(str): the compressed file to write
+        codec(str): one of gz, bz2, xz
+        level(int): the compression level
+        workers(int): number of threads, 0 uses one thread per cpu
+        block_size(int): the uncompressed size of a block
+        store(bool): write the data uncompressed in a gz or xz container
+
+    Returns:
+        str: the path to the compressed file
+    """
+    with open(source, 'rb') as f, open(destination, 'wb') as out:
+        with BlockWriter(out, codec=codec, level=level, workers=workers,
+                         block_size=block_size, store=store) as zf:
+            while True:
+                chunk = f.read(1 * MB)
+                if not chunk:
+                    break
+                zf.write(chunk)
+    return destination
+
+
+def xz_unblock(data: bytes, info: typing.Tuple[bytes, int, int]) -> bytes:
+    """Decompresses a single block of an xz stream
+
+    The block is wrapped into a stream of its own so that liblzma decodes
+    the filter chain and verifies the check of any type.
+
+    Args:
+        data(bytes): the block including its padding and check
+        info: (stream flags, unpadded size, uncompressed size) of the block
+
+    Returns:
+        bytes: the uncompressed data
+    """
+    lzma = optional('lzma')
+    flags, unpadded, uncompressed = info
+    index = xz_index([(unpadded, uncompressed)])
+    stream = b''.join([xz_stream_header(flags),
+                       data,
+                       index,
+                       xz_stream_footer(len(index), flags)])
+    return lzma.decompress(stream, format=lzma.FORMAT_XZ)
+
+
+def gz_unmember(data: bytes, info=None) -> bytes:
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    out = decompressor.decompress(data)
+    if not decompressor.eof or decompressor.unused_data:
+        raise RuntimeError("Corrupted gzip member")
+    return out
+
+
+def bz2_unstream(data: bytes, info=None) -> bytes:
+    decompressor = optional('bz2').BZ2Decompressor()
+    out = decompressor.decompress(data)
+    if not decompressor.eof or decompressor.unused_data:
+        raise RuntimeError("Corrupted bz2 stream")
+    return out
+
+
+DECODERS = {
+    'xz': xz_unblock,
+    'gz': gz_unmember,
+    'bz2': bz2_unstream,
+}
+
+
+def scan_xz(fileobj: typing.BinaryIO, size: int) -> typing.List[Segment]:
+    """Finds the blocks of an xz file from its indexes
+
+    Works from the end of the file backwards so that concatenated streams
+    and stream padding are handled. Only the stream footers, indexes and
+    headers are read.
+    """
+    segments = []
+    end = size
+    while end > 0:
+        if end < 32:
+            return None
+        fileobj.seek(end - 4)
+        if fileobj.read(4) == b'\x00' * 4:
+            end -= 4
+            continue
+        fileobj.seek(end - 12)
+        footer = fileobj.read(12)
+        if footer[10:12] != XZ_FOOTER_MAGIC or zlib.crc32(footer[4:10]) != struct.unpack('<I', footer[:4])[0]:
+            return None
+        flags = footer[8:10]
+        index_size = (struct.unpack('<I', footer[4:8])[0] + 1) * 4
+        index_start = end - 12 - index_size
+        if index_start < 12:
+            return None
+        fileobj.seek(index_start)
+        index = fileobj.read(index_size)
+        if index[0] != 0 or zlib.crc32(index[:-4]) != struct.unpack('<I', index[-4:])[0]:
+            return None
+        count, position = read_varint(index, 1)
+        records = []
+        for _ in range(count):
+            unpadded, position = read_varint(index, position)
+            uncompressed, position = read_varint(index, position)
+            records.append((unpadded, uncompressed))
+        stream_start = index_start - sum((unpadded + 3) & ~3 for unpadded, _ in records) - 12
+        if stream_start < 0:
+            return None
+        fileobj.seek(stream_start)
+        if fileobj.read(12) != xz_stream_header(flags):
+            return None
+        offset = stream_start + 12
+        stream = []
+        for unpadded, uncompressed in records:
+            padded = (unpadded + 3) & ~3
+            stream.append(Segment(offset, padded, (flags, unpadded, uncompressed)))
+            offset += padded
+        segments = stream + segments
+        end = stream_start
+    return segments
+
+
+def gz_member_size(extra: bytes) -> typing.Optional[int]:
+    """Returns the member size recorded in the 'CM' subfield of a gzip header"""
+    position = 0
+    while position + 4 <= len(extra):
+        length = struct.unpack('<H', extra[position + 2:position + 4])[0]
+        if extra[position:position + 2] == GZ_SUBFIELD and length == 8:
+            return struct.unpack('<Q', extra[position + 4:position + 12])[0]
+        position += 4 + length
+    return None
+
+
+def scan_gz(fileobj: typing.BinaryIO, size: int) -> typing.List[Segment]:
+    """Finds the members of a gzip file written by BlockWriter
+
+    Returns None as soon as a member does not record its size, as the
+    members of other gzip files can only be found by inflating them.
+    """
+    segments = []
+    offset = 0
+    while offset < size:
+        fileobj.seek(offset)
+        header = fileobj.read(12)
+        if len(header) < 12 or header[:2] != GZ_MAGIC or not header[3] & 0x04:
+            return None
+        member = gz_member_size(fileobj.read(struct.unpack('<H', header[10:12])[0]))
+        if member is None or offset + member > size:
+            return None
+        segments.append(Segment(offset, member, None))
+        offset += member
+    return segments
+
+
+def scan_bz2(fileobj: typing.BinaryIO, size: int) -> typing.List[Segment]:
+    """Finds the streams of a concatenated bz2 file by their magic
+
+    bz2 streams start byte aligned while the blocks inside a stream are bit
+    aligned, so the magic only shows up at stream starts. Each stream is
+    checked for a clean end when it is decompressed.
+    """
+    starts = []
+    overlap = 9
+    offset = 0
+    fileobj.seek(0)
+    tail = b''
+    while True:
+        chunk = fileobj.read(4 * MB)
+        if not chunk:
+            break
+        data = tail + chunk
+        base = offset - len(tail)
+        for match in BZ2_STREAM.finditer(data):
+            start = base + match.start()
+            if not starts or start > starts[-1]:
+                starts.append(start)
+        offset += len(chunk)
+        tail = data[-overlap:]
+    if not starts or starts[0] != 0:
+        return None
+    ends = starts[1:] + [size]
+    return [Segment(start, end - start, None) for start, end in zip(starts, ends)]
+
+
+SCANNERS = {
+    'xz': scan_xz,
+    'gz': scan_gz,
+    'bz2': scan_bz2,
+}
+
+
+def scan(fileobj: typing.BinaryIO, codec: str) -> typing.Optional[typing.List[Segment]]:
+    """Finds the independently compressed units of an archive
+
+    Args:
+        fileobj: the seekable compressed file
+        codec(str): one of gz, bz2, xz
+
+    Returns:
+        list: the segments in order, None if they can not be determined
+    """
+    if codec not in SCANNERS:
+        return None
+    size = fileobj.seek(0, os.SEEK_END)
+    try:
+        return SCANNERS[codec](fileobj, size)
+    except (IndexError, ValueError, struct.error):
+        return None
+
+
+class BlockReader(io.RawIOBase):
+
+    def __init__(self,
+                 fileobj: typing.BinaryIO,
+                 codec: str,
+                 segments: typing.List[Segment],
+                 workers: int = 0):
+        """Read only file object that decompresses blocks in parallel
+
+        The segments are read from `fileobj` in order, decompressed on a
+        thread pool and returned in order. At most two segments per worker
+        are in flight, so the memory use is bounded by the block size and
+        the number of workers.
+
+        Args:
+            fileobj: the seekable binary file object with the compressed data
+            codec(str): one of gz, bz2, xz
+            segments(list): the segments as returned by `scan`
+            workers(int): number of threads, 0 uses one thread per cpu
+        """
+        super().__init__()
+        if codec == 'xz' and optional('lzma') is None:
+            raise RuntimeError("System not built with LZMA support")
+        self._fileobj = fileobj
+        self._decode = DECODERS[codec]
+        self._segments = iter(segments)
+        self._workers = resolve_workers(workers)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._workers)
+        self._pending = collections.deque()
+        self._current = memoryview(b'')
+        self._position = 0
+        self._fill()
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        while len(self._pending) < 2 * self._workers:
+            segment = next(self._segments, None)
+            if segment is None:
+                break
+            self._fileobj.seek(segment.offset)
+            data = self._fileobj.read(segment.length)
+            self._pending.append(self._executor.submit(self._decode, data, segment.info))
+
+    def readinto(self, b) -> int:
+        while self._position >= len(self._current):
+            if not self._pending:
+                return 0
+            self._current = memoryview(self._pending.popleft().result())
+            self._position = 0
+            self._fill()
+        size = min(len(b), len(self._current) - self._position)
+        b[:size] = self._current[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            for future in self._pending:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            self._fileobj.close()
+        finally:
+            super().close()
+
+
+def open_blocks(path: typing.Union[str, typing.BinaryIO],
+                codec: str,
+                workers: int = 0) -> typing.Optional[BlockReader]:
+    """Opens an archive for parallel decompression
+
+    Args:
+        path: the compressed file or its seekable file object, which is
+            rewound if the archive must be read sequentially
+        codec(str): one of gz, bz2, xz
+        workers(int): number of threads, 0 uses one thread per cpu
+
+    Returns:
+        BlockReader: the reader, None if the archive does not have several
+            independent blocks and must be read sequentially.
+    """
+    fileobj = open(path, 'rb') if isinstance(path, str) else path
+    segments = scan(fileobj, codec)
+    if segments is None or len(segments) < 2:
+        if isinstance(path, str):
+            fileobj.close()
+        else:
+            fileobj.seek(0)
+        return None
+    return BlockReader(fileobj, codec, segments, workers=workers)
@@ -0,0 +1,280 @@
+import collections
+import concurrent.futures
+import io
+import os
+import stat
+import tarfile
+import typing
+
+from cloudmesh.data.block import MB
+from cloudmesh.data.metrics import count_bytes
+from cloudmesh.data.metrics import phase_of
+
+try:
+    import grp
+    import pwd
+except ImportError:
+    grp = None
+    pwd = None
+
+"""
+Creation of tar archives of large trees of small files.
+
+tarfile.add lists, stats, opens and reads one path after the other in the
+order of the directory listings, so on network filesystems and spinning
+disks the archive is bound by the latency of these calls and not by the
+compressor. add_tree splits the work:
+
+1. The tree is listed with os.scandir and every entry is stat'ed on a
+   thread pool, one directory listing per job, level by level.
+2. Directories, links and special files are added in the order tarfile.add
+   would use, sorted and depth first.
+3. Regular files are added in the order of their inode numbers, which on
+   most filesystems follows their physical location. Small files are read
+   ahead on the thread pool, so the single compressor stream receives
+   their data without waiting for open and read; larger files are read
+   by tarfile while they are added.
+
+Hard links are detected like tarfile does it, the first path of an inode
+holds the data and the others link to it.
+"""
+
+# the threads listing the tree and reading small files ahead
+PREFETCH_WORKERS = 8
+
+# regular files up to this size are read ahead
+SMALL_FILE = 1 * MB
+
+# the bytes read ahead of the compressor
+READ_AHEAD = 64 * MB
+
+# the number of small files read by one job
+BATCH = 32
+
+# the number of batches read ahead
+READ_AHEAD_BATCHES = 64
+
+_TYPES = (
+    (stat.S_ISREG, tarfile.REGTYPE),
+    (stat.S_ISDIR, tarfile.DIRTYPE),
+    (stat.S_ISFIFO, tarfile.FIFOTYPE),
+    (stat.S_ISLNK, tarfile.SYMTYPE),
+    (stat.S_ISCHR, tarfile.CHRTYPE),
+    (stat.S_ISBLK, tarfile.BLKTYPE),
+)
+
+
+def _list(path: str) -> typing.List[typing.Tuple[str, os.stat_result]]:
+    """The names and lstat results of a directory, sorted by name"""
+    with os.scandir(path) as entries:
+        return sorted((entry.name, entry.stat(follow_symlinks=False)) for entry in entries)
+
+
+def scan(source: str,
+         arcname: str = None,
+         executor: concurrent.futures.Executor = None) -> typing.List[typing.Tuple[str, str, os.stat_result]]:
+    """Lists a tree in the order of tarfile.add
+
+    Args:
+        source(str): the file or directory
+        arcname(str): its name in the archive, by default source
+        executor: the pool the directories are listed on
+
+    Returns:
+        list: (path, name in the archive, lstat result) of every entry
+    """
+    arcname = source if arcname is None else arcname
+    root = os.lstat(source)
+    listings = {}
+    level = [source] if stat.S_ISDIR(root.st_mode) else []
+    while level:
+        results = executor.map(_list, level) if executor is not None else map(_list, level)
+        below = []
+        for path, listing in zip(level, results):
+            listings[path] = listing
+            below += [os.path.join(path, name) for name, status in listing if stat.S_ISDIR(status.st_mode)]
+        level = below
+    ordered = []
+    stack = [(source, arcname, root)]
+    while stack:
+        path, name, status = stack.pop()
+        ordered.append((path, name, status))
+        if stat.S_ISDIR(status.st_mode):
+            for child, child_status in reversed(listings[path]):
+                stack.append((os.path.join(path, child), os.path.join(name, child), child_status))
+    return ordered
+
+
+class _Names:
+
+    def __init__(self):
+        """Caches the user and group names of ids"""
+        self.users = {}
+        self.groups = {}
+
+    def user(self, uid: int) -> str:
+        if uid not in self.users:
+            try:
+                self.users[uid] = pwd.getpwuid(uid)[0] if pwd else ""
+            except KeyError:
+                self.users[uid] = ""
+        return self.users[uid]
+
+    def group(self, gid: int) -> str:
+        if gid not in self.groups:
+            try:
+                self.groups[gid] = grp.getgrgid(gid)[0] if grp else ""
+            except KeyError:
+                self.groups[gid] = ""
+        return self.groups[gid]
+
+
+def make_tarinfo(tar: tarfile.TarFile,
+                 path: str,
+                 arcname: str,
+                 status: os.stat_result,
+                 names: _Names) -> typing.Optional[tarfile.TarInfo]:
+    """The TarInfo of tarfile.gettarinfo from an existing lstat result
+
+    Returns:
+        tarfile.TarInfo: the member, None for sockets and unknown types
+    """
+    mode = status.st_mode
+    kind = next((kind for test, kind in _TYPES if test(mode)), None)
+    if kind is None:
+        return None
+    arcname = os.path.splitdrive(arcname)[1].replace(os.sep, "/").lstrip("/")
+    linkname = ""
+    if kind == tarfile.REGTYPE:
+        inode = (status.st_ino, status.st_dev)
+        if status.st_nlink > 1 and inode in tar.inodes and arcname != tar.inodes[inode]:
+            kind = tarfile.LNKTYPE
+            linkname = tar.inodes[inode]
+        elif inode[0]:
+            tar.inodes[inode] = arcname
+    elif kind == tarfile.SYMTYPE:
+        linkname = os.readlink(path)
+    member = tar.tarinfo()
+    member.tarfile = tar
+    member.name = arcname
+    member.mode = mode
+    member.uid = status.st_uid
+    member.gid = status.st_gid
+    member.size = status.st_size if kind == tarfile.REGTYPE else 0
+    member.mtime = status.st_mtime
+    member.type = kind
+    member.linkname = linkname
+    member.uname = names.user(status.st_uid)
+    member.gname = names.group(status.st_gid)
+    if kind in (tarfile.CHRTYPE, tarfile.BLKTYPE) and hasattr(os, "major"):
+        member.devmajor = os.major(status.st_rdev)
+        member.devminor = os.minor(status.st_rdev)
+    return member
+
+
+def _batches(files: list) -> typing.Iterator[list]:
+    """Groups consecutive small files, every other file is a batch of its own"""
+    batch = []
+    size = 0
+    for item in files:
+        status = item[2]
+        if status.st_size > SMALL_FILE or status.st_nlink > 1:
+            if batch:
+                yield batch
+            batch, size = [], 0
+            yield [item]
+            continue
+        batch.append(item)
+        size += status.st_size
+        if len(batch) >= BATCH or size >= SMALL_FILE:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def _read_batch(batch: list) -> typing.List[bytes]:
+    result = []
+    for path, _, status in batch:
+        with open(path, 'rb') as f:
+            result.append(f.read(status.st_size))
+    return result
+
+
+def _add_batch(tar: tarfile.TarFile,
+               batch: list,
+               future: typing.Optional[concurrent.futures.Future],
+               names: _Names,
+               on_file: typing.Callable = None) -> int:
+    """Adds the files of a batch, returns the bytes that were read ahead"""
+    contents = None if future is None else future.result()
+    for i, (path, name, status) in enumerate(batch):
+        member = make_tarinfo(tar, path, name, status, names)
+        if member.type == tarfile.LNKTYPE:
+            tar.addfile(member)
+            continue
+        if on_file is not None:
+            on_file(path, status, None if contents is None else contents[i])
+        if contents is not None:
+            tar.addfile(member, io.BytesIO(contents[i]))
+        else:
+            with open(path, 'rb') as f:
+                tar.addfile(member, f)
+    return 0 if contents is None else sum(status.st_size for _, _, status in batch)
+
+
+def add_tree(tar: tarfile.TarFile,
+             source: str,
+             arcname: str = None,
+             workers: int = PREFETCH_WORKERS,
+             on_file: typing.Callable[[str, os.stat_result, typing.Optional[bytes]], typing.Any] = None) -> int:
+    """Adds a file or directory to a tar archive like tar.add(source)
+
+    Args:
+        tar(tarfile.TarFile): the archive opened for writing, also a stream
+        source(str): the file or directory
+        arcname(str): its name in the archive, by default source
+        workers(int): the threads listing the tree and reading ahead
+        on_file: called with the path, the stat result and the content if
+            it was read ahead, right before a regular file is added
+
+    Returns:
+        int: the number of added members
+    """
+    names = _Names()
+    # the archive itself is not added, like in tar.add
+    archive = None if tar.name is None else os.path.abspath(tar.name)
+    archive_name = None if archive is None else os.path.basename(archive)
+    count = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        files = []
+        with phase_of('walk'):
+            entries = scan(source, arcname, executor)
+        for path, name, status in entries:
+            if os.path.basename(path) == archive_name and os.path.abspath(path) == archive:
+                continue
+            if stat.S_ISREG(status.st_mode):
+                files.append((path, name, status))
+                continue
+            member = make_tarinfo(tar, path, name, status, names)
+            if member is not None:
+                tar.addfile(member)
+                count += 1
+        files.sort(key=lambda item: (item[2].st_dev, item[2].st_ino))
+        count_bytes('walk', sum(status.st_size for _, _, status in files))
+
+        # the small files are read ahead in batches in the order they are added
+        ahead = collections.deque()
+        queued = 0
+        for batch in _batches(files):
+            if batch[0][2].st_size > SMALL_FILE or batch[0][2].st_nlink > 1:
+                ahead.append((batch, None))
+            else:
+                ahead.append((batch, executor.submit(_read_batch, batch)))
+                queued += sum(status.st_size for _, _, status in batch)
+            while ahead and (queued >= READ_AHEAD or len(ahead) > READ_AHEAD_BATCHES):
+                queued -= _add_batch(tar, *ahead.popleft(), names, on_file)
+        while ahead:
+            _add_batch(tar, *ahead.popleft(), names, on_file)
+        count += len(files)
+    return count
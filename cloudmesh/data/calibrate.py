@@ -0,0 +1,221 @@
+import json
+import os
+import platform
+import shutil
+import tempfile
+import typing
+
+from cloudmesh.data import create
+from cloudmesh.data.benchmark import BACKENDS
+from cloudmesh.data.benchmark import _compress
+from cloudmesh.data.benchmark import _uncompress
+from cloudmesh.data.benchmark import measure
+from cloudmesh.data.capabilities import registry
+from cloudmesh.data.codec import module
+from cloudmesh.data.data import CompressExtensions
+from cloudmesh.data.pipeline import find_tool
+
+"""
+Selection of the fastest backend of an algorithm on this host.
+
+The first time the auto backend is asked for an algorithm, level and
+number of workers, a synthetic sample is compressed and uncompressed by
+every backend that can run the algorithm, each run in a child process
+like in the benchmark. Files are calibrated with a mixed file, the tar
+variants with a small tree. The seconds and the fastest backend of each
+action are kept in a json file, separately for every host, so a home
+directory shared by a cluster does not mix the nodes.
+
+Every entry records the fingerprint it was measured with: the cpu, the
+number of cpus, the python version and the versions of the native tools
+and python modules of the algorithm. An entry whose fingerprint differs
+from the current one is calibrated again.
+"""
+
+# the json file the calibrations are kept in
+CACHE = os.path.join(os.path.expanduser("~"), ".cloudmesh", "data", "calibration.json")
+
+# the size of the synthetic sample
+SAMPLE_SIZE = "4MB"
+
+# the number of files of the sample of the tar variants
+SAMPLE_FILES = 100
+
+ACTIONS = ('compress', 'uncompress')
+
+
+def _cpu() -> str:
+    """The model of the cpu"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def fingerprint(algorithm: str) -> dict:
+    """What a calibration of an algorithm depends on
+
+    Args:
+        algorithm(str): the algorithm name, e.g. tarxz
+
+    Returns:
+        dict: the cpu, the number of cpus, the python version and the
+            versions of the native tools and the python module
+    """
+    algorithm = CompressExtensions.normalize(algorithm)
+    codec = CompressExtensions.codec(algorithm)
+    tools = {}
+    names = ['tar'] if algorithm.startswith('tar') else []
+    tool = None if codec is None else find_tool(codec)
+    if tool is not None:
+        names.append(tool.name)
+    for name in names:
+        capability = registry().tool(name)
+        tools[name] = None if capability is None else capability.version
+    lib = None if codec is None else module(codec)
+    return {
+        'machine': platform.machine(),
+        'cpu': _cpu(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'tools': tools,
+        'module': None if lib is None else getattr(lib, '__version__', None),
+    }
+
+
+def _key(algorithm: str, level: int, workers: int) -> str:
+    return f"{algorithm}:{level}:{workers}"
+
+
+def _sample(algorithm: str, directory: str, size: str) -> str:
+    """Creates the synthetic sample of an algorithm"""
+    path = os.path.join(directory, "sample")
+    if algorithm.startswith('tar'):
+        create.tree(path, size, files=SAMPLE_FILES, seed=1, verbose=False)
+    else:
+        create.mixed_file(path, size, seed=1, verbose=False)
+    return path
+
+
+def backends(algorithm: str) -> typing.List[str]:
+    """The backends that can run an algorithm on this host"""
+    result = []
+    for name, backend in BACKENDS.items():
+        try:
+            backend(algorithm=algorithm)
+        except RuntimeError:
+            continue
+        result.append(name)
+    return result
+
+
+def calibrate(algorithm: str,
+              level: int = 5,
+              workers: int = 1,
+              size: str = SAMPLE_SIZE) -> dict:
+    """Measures every backend of an algorithm on a synthetic sample
+
+    Args:
+        algorithm(str): the algorithm name, e.g. tarxz
+        level(int): the compression level
+        workers(int): the workers of the backends
+        size(str): the size of the sample
+
+    Returns:
+        dict: the fingerprint, the seconds of every backend and action and
+            the fastest backend of every action
+    """
+    algorithm = CompressExtensions.normalize(algorithm)
+    entry = {'fingerprint': fingerprint(algorithm), 'size': size}
+    seconds = {action: {} for action in ACTIONS}
+    candidates = backends(algorithm)
+    directory = tempfile.mkdtemp(prefix="cloudmesh-data-calibrate-")
+    try:
+        source = _sample(algorithm, directory, size)
+        for backend in candidates if len(candidates) > 1 else []:
+            archive = os.path.join(directory, backend) + CompressExtensions.extension(algorithm)
+            restored = os.path.join(directory, f"restored.{backend}")
+            try:
+                run = measure(_compress, backend, algorithm, level, workers, source, archive)
+                seconds['compress'][backend] = round(run['seconds'], 4)
+                run = measure(_uncompress, backend, algorithm, workers, archive, restored)
+                seconds['uncompress'][backend] = round(run['seconds'], 4)
+            except RuntimeError:
+                continue
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    entry['seconds'] = seconds
+    entry['best'] = {}
+    for action in ACTIONS:
+        if seconds[action]:
+            entry['best'][action] = min(seconds[action], key=seconds[action].get)
+        elif candidates:
+            entry['best'][action] = candidates[0]
+    return entry
+
+
+def _load(cache: str) -> dict:
+    try:
+        with open(cache) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(cache: str, content: dict):
+    try:
+        if os.path.dirname(cache):
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+        partial = f"{cache}.{os.getpid()}"
+        with open(partial, "w") as f:
+            json.dump(content, f, indent=2)
+        os.replace(partial, cache)
+    except OSError:
+        # a read only home directory only costs calibrating again
+        pass
+
+
+def select(algorithm: str,
+           action: str = 'compress',
+           level: typing.Union[str, int] = None,
+           workers: int = 1,
+           cache: str = CACHE,
+           size: str = SAMPLE_SIZE) -> str:
+    """The fastest backend of an algorithm on this host
+
+    The algorithm is calibrated if this host has no calibration of it or
+    if its fingerprint changed.
+
+    Args:
+        algorithm(str): the algorithm name, e.g. tarxz
+        action(str): compress or uncompress
+        level(int): the compression level, by default 5
+        workers(int): the workers of the backends
+        cache(str): the json file of the calibrations
+        size(str): the size of the sample of a new calibration
+
+    Returns:
+        str: the name of the backend in benchmark.BACKENDS, e.g. native
+
+    Raises:
+        RuntimeError: if no backend can run the algorithm
+    """
+    algorithm = CompressExtensions.normalize(algorithm or 'xz')
+    level = 5 if level is None else int(level)
+    content = _load(cache)
+    host = content.setdefault(platform.node(), {})
+    key = _key(algorithm, level, workers)
+    entry = host.get(key)
+    if entry is None or entry.get('fingerprint') != fingerprint(algorithm):
+        entry = calibrate(algorithm, level=level, workers=workers, size=size)
+        # the file may have changed while the sample was measured
+        content = _load(cache)
+        content.setdefault(platform.node(), {})[key] = entry
+        _save(cache, content)
+    if action not in entry['best']:
+        raise RuntimeError(f"No backend can run the algorithm {algorithm}")
+    return entry['best'][action]
@@ -0,0 +1,177 @@
+import collections
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import typing
+
+"""
+Registry of the native tools that are available.
+
+Looking up a tool runs shutil.which once per directory of the PATH, and
+finding out its version and whether it understands a thread option runs
+the tool itself. The registry does this once per tool and keeps the
+results in memory and in a json file, so the next process that asks for
+the same tool reads them instead of probing again.
+
+The results are only valid for the PATH they were found with. The key of
+the cache is the PATH together with the modification times of its
+directories, so changing the PATH or installing or removing a tool in one
+of its directories probes again.
+"""
+
+# the json file the results are kept in between processes
+CACHE = os.path.join(os.path.expanduser("~"), ".cloudmesh", "data", "capabilities.json")
+
+# the seconds a tool may take to print its version or help
+PROBE_TIMEOUT = 5
+
+
+# a native tool as found on the PATH: the name of the command, the path of
+# the executable, the first line it prints for --version and whether its
+# help lists the thread option
+Capability = collections.namedtuple('Capability', 'name path version threads')
+
+
+def path_key(path: str = None) -> str:
+    """The key of the cache for a PATH
+
+    Args:
+        path(str): the PATH, by default the PATH of the environment
+
+    Returns:
+        str: the directories of the PATH with their modification times
+    """
+    path = os.environ.get("PATH", os.defpath) if path is None else path
+    key = []
+    for directory in path.split(os.pathsep):
+        try:
+            mtime = os.stat(directory or os.curdir).st_mtime_ns
+        except OSError:
+            mtime = None
+        key.append(f"{directory}:{mtime}")
+    return os.pathsep.join(key)
+
+
+def _output(command: typing.List[str]) -> str:
+    """The combined stdout and stderr of a command, "" if it can not run"""
+    try:
+        result = subprocess.run(command,
+                                stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT,
+                                timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return result.stdout.decode(errors="replace")
+
+
+def probe(name: str, flag: str = None) -> typing.Optional[Capability]:
+    """Finds a tool on the PATH and runs it to learn what it supports
+
+    Args:
+        name(str): the name of the command
+        flag(str): the option that sets the number of threads, e.g. -T
+
+    Returns:
+        Capability: the tool, None if it is not on the PATH
+    """
+    path = shutil.which(name)
+    if path is None:
+        return None
+    lines = [line.strip() for line in _output([path, "--version"]).splitlines()]
+    version = next((line for line in lines if line), "")
+    threads = False
+    if flag:
+        pattern = r"(^|[\s,\[])" + re.escape(flag) + r"(?![a-zA-Z-])"
+        threads = re.search(pattern, _output([path, "--help"]), re.MULTILINE) is not None
+    return Capability(name, path, version, threads)
+
+
+class Registry:
+
+    def __init__(self, cache: str = CACHE):
+        """The tools probed so far for the PATH of the environment
+
+        Args:
+            cache(str): the json file the results are kept in, None keeps
+                them in memory only
+        """
+        self.cache = cache
+        self._key = None
+        self._tools = {}
+        self._lock = threading.Lock()
+
+    def _load(self, key: str):
+        self._key = key
+        self._tools = {}
+        if self.cache is None:
+            return
+        try:
+            with open(self.cache) as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return
+        if content.get("key") == key:
+            for name, tool in content.get("tools", {}).items():
+                self._tools[name] = None if tool is None else Capability(**tool)
+
+    def _save(self):
+        if self.cache is None:
+            return
+        content = {
+            "key": self._key,
+            "tools": {name: None if tool is None else tool._asdict() for name, tool in self._tools.items()}
+        }
+        try:
+            if os.path.dirname(self.cache):
+                os.makedirs(os.path.dirname(self.cache), exist_ok=True)
+            partial = f"{self.cache}.{os.getpid()}"
+            with open(partial, "w") as f:
+                json.dump(content, f, indent=2)
+            os.replace(partial, self.cache)
+        except OSError:
+            # a read only home directory only costs probing again
+            pass
+
+    def tool(self, name: str, flag: str = None) -> typing.Optional[Capability]:
+        """Looks up a tool, probing it only if it is not in the cache
+
+        Args:
+            name(str): the name of the command
+            flag(str): the option that sets the number of threads
+
+        Returns:
+            Capability: the tool, None if it is not on the PATH
+        """
+        key = path_key()
+        # whether the tool has threads depends on the flag it was probed with
+        entry = name if flag is None else f"{name}:{flag}"
+        with self._lock:
+            if key != self._key:
+                self._load(key)
+            if entry not in self._tools:
+                self._tools[entry] = probe(name, flag)
+                self._save()
+            return self._tools[entry]
+
+    def clear(self):
+        """Forgets all tools, also in the cache file"""
+        with self._lock:
+            self._key = None
+            self._tools = {}
+            if self.cache is not None and os.path.exists(self.cache):
+                os.remove(self.cache)
+
+
+_registry = None
+
+
+def registry() -> Registry:
+    """The registry of the process, kept in CACHE"""
+    global _registry
+    if _registry is None:
+        _registry = Registry()
+    return _registry
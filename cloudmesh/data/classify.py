@@ -0,0 +1,104 @@
+import collections
+import math
+import os
+import typing
+
+from cloudmesh.data.block import KB
+
+"""
+Classification of files that are already compressed.
+
+A directory archive with per-member codecs stores the data of members
+that would not shrink and compresses the others. A member is treated as
+already compressed if
+
+1. its extension is one of a compressed format, e.g. .gz, .jpg, .parquet,
+2. its first bytes are the magic of such a format, or
+3. the bytes of a sample from its start have an entropy close to 8 bits
+   per byte.
+
+The checks are ordered by cost, the extension needs no read, the magic and
+the entropy share one read of SAMPLE_SIZE bytes.
+"""
+
+# the bytes read from the start of a file for its magic and entropy
+SAMPLE_SIZE = 64 * KB
+
+# a sample with more bits per byte does not compress
+ENTROPY_LIMIT = 7.5
+
+# smaller members are compressed with their neighbours, a block of their
+# own would cost more than storing them saves
+MIN_SIZE = 64 * KB
+
+# extensions of compressed archives, images, audio, video and columnar data
+COMPRESSED_EXTENSIONS = {
+    '.gz', '.tgz', '.bz2', '.tbz2', '.xz', '.txz', '.lzma', '.zst', '.tzst', '.lz4', '.br', '.z',
+    '.zip', '.7z', '.rar', '.jar', '.war', '.whl', '.apk', '.deb', '.rpm', '.cab',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.avif', '.jp2',
+    '.mp3', '.aac', '.m4a', '.ogg', '.opus', '.flac',
+    '.mp4', '.m4v', '.mkv', '.webm', '.mov', '.avi',
+    '.parquet', '.orc', '.arrow', '.feather',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp', '.epub',
+}
+
+# the magic bytes of compressed formats at the start of a file
+COMPRESSED_MAGIC = (
+    b'\x1f\x8b',  # gzip
+    b'BZh',  # bzip2
+    b'\xfd7zXZ\x00',  # xz
+    b'\x28\xb5\x2f\xfd',  # zstd
+    b'\x04\x22\x4d\x18',  # lz4
+    b'PK\x03\x04',  # zip, jar, docx
+    b'7z\xbc\xaf\x27\x1c',  # 7z
+    b'Rar!\x1a\x07',  # rar
+    b'\x89PNG\r\n\x1a\n',  # png
+    b'\xff\xd8\xff',  # jpeg
+    b'GIF87a',  # gif
+    b'GIF89a',  # gif
+    b'PAR1',  # parquet
+    b'ORC',  # orc
+    b'OggS',  # ogg
+    b'fLaC',  # flac
+)
+
+
+def entropy(data: bytes) -> float:
+    """The Shannon entropy of bytes
+
+    Args:
+        data(bytes): the bytes
+
+    Returns:
+        float: the bits per byte, 0 to 8
+    """
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(count / total * math.log2(count / total) for count in collections.Counter(data).values())
+
+
+def is_compressed(path: str, data: typing.Optional[bytes] = None) -> bool:
+    """Checks if a file is already compressed
+
+    Args:
+        path(str): the file
+        data(bytes): its content or its start if it was read already,
+            otherwise SAMPLE_SIZE bytes are read
+
+    Returns:
+        bool: True if compressing the file would not gain anything
+    """
+    if os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return True
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read(SAMPLE_SIZE)
+    else:
+        data = data[:SAMPLE_SIZE]
+    if data.startswith(COMPRESSED_MAGIC):
+        return True
+    # mp4, mov and heic keep their type after the size of the first box
+    if data[4:8] == b'ftyp' or (data[:4] == b'RIFF' and data[8:12] in (b'WEBP', b'AVI ')):
+        return True
+    return entropy(data) > ENTROPY_LIMIT
@@ -0,0 +1,221 @@
+import functools
+import importlib
+import subprocess
+import types
+import typing
+
+from cloudmesh.data.pipeline import LEVELS
+from cloudmesh.data.pipeline import ToolFile
+from cloudmesh.data.pipeline import ZSTD_LONG
+from cloudmesh.data.pipeline import find_tool
+from cloudmesh.data.pipeline import tool_command
+
+"""
+Compressed file objects for the python implementation.
+
+gz, bz2 and xz use the standard library. zstd uses compression.zstd of
+python 3.14 and lz4 the lz4 package when they are available, otherwise the
+data is streamed through the zstd and lz4 commands.
+
+The modules are imported when a codec is first used, a command that only
+needs gz does not import lzma, bz2 or zstd.
+"""
+
+STREAM_CODECS = ('zst', 'lz4')
+
+ALL_CODECS = ('gz', 'bz2', 'xz', 'zst', 'lz4')
+
+# the python module of a codec
+MODULES = {
+    'gz': 'gzip',
+    'bz2': 'bz2',
+    'xz': 'lzma',
+    'zst': 'compression.zstd',
+    'lz4': 'lz4.frame',
+}
+
+# levels accepted by the python modules, gzip stores the data at level 0
+# while the gzip command rejects it
+PYTHON_LEVELS = dict(LEVELS, gz=(0, 9))
+
+
+@functools.lru_cache(maxsize=None)
+def optional(name: str) -> typing.Optional[types.ModuleType]:
+    """Imports a module on first use
+
+    Args:
+        name(str): the module, e.g. lzma
+
+    Returns:
+        module: the module, None if it is not available
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def module(codec: str) -> typing.Optional[types.ModuleType]:
+    """The python module of a codec, None if it is not available"""
+    return optional(MODULES[codec]) if codec in MODULES else None
+
+
+def clip_level(codec: str, level: typing.Union[str, int]) -> int:
+    level = 5 if level is None else int(level)
+    if codec in PYTHON_LEVELS:
+        low, high = PYTHON_LEVELS[codec]
+        level = min(max(level, low), high)
+    return level
+
+
+def zstd_options(writing: bool, level: int, workers: int, long: int) -> dict:
+    """Keyword arguments for compression.zstd.open
+
+    Args:
+        writing(bool): True to compress
+        level(int): the zstd level 1 to 22
+        workers(int): the number of threads of the multithreaded mode
+        long(int): the window log for long distance matching, 0 disables it
+
+    Returns:
+        dict: the options
+    """
+    zstd = optional('compression.zstd')
+    window_log = ZSTD_LONG if long is True else long
+    if writing:
+        options = {zstd.CompressionParameter.compression_level: level}
+        if workers > 1:
+            options[zstd.CompressionParameter.nb_workers] = workers
+        if window_log:
+            options[zstd.CompressionParameter.enable_long_distance_matching] = 1
+            options[zstd.CompressionParameter.window_log] = window_log
+        return dict(options=options)
+    if window_log:
+        return dict(options={zstd.DecompressionParameter.window_log_max: window_log})
+    return {}
+
+
+def open_tool(path: typing.Union[str, typing.BinaryIO],
+              codec: str,
+              mode: str = 'rb',
+              level: int = 5,
+              workers: int = 1,
+              long: int = 0) -> ToolFile:
+    tool = find_tool(codec)
+    if tool is None:
+        raise RuntimeError(f"Neither a python module nor a native command for {codec} is available")
+    action = 'uncompress' if mode.startswith('r') else 'compress'
+    command = tool_command(tool, action, level=level, threads=workers, codec=codec, long=long)
+    return ToolFile(command, path, mode='rb' if action == 'uncompress' else 'wb')
+
+
+def open_codec(path: typing.Union[str, typing.BinaryIO],
+               codec: str,
+               mode: str = 'rb',
+               level: typing.Union[str, int] = 5,
+               workers: int = 1,
+               long: int = 0) -> typing.BinaryIO:
+    """Opens a compressed file
+
+    Args:
+        path: the compressed file or a binary file object, which is not
+            closed with the returned object
+        codec(str): one of gz, bz2, xz, zst, lz4
+        mode(str): 'rb' to read, 'wb' or 'xb' to write
+        level(int): the compression level
+        workers(int): the number of threads, used by zstd
+        long(int): the window log for zstd long distance matching
+
+    Returns:
+        file object: the binary file object
+
+    Raises:
+        RuntimeError: if the codec is not supported
+    """
+    writing = not mode.startswith('r')
+    level = clip_level(codec, level)
+    lib = module(codec)
+    if codec in ('gz', 'bz2'):
+        return lib.open(path, mode, compresslevel=level) if writing else lib.open(path, mode)
+    elif codec == 'xz':
+        if lib is None:
+            raise RuntimeError("System not built with LZMA support")
+        return lib.open(path, mode, preset=level) if writing else lib.open(path, mode)
+    elif codec == 'zst':
+        if lib is not None:
+            return lib.open(path, mode, **zstd_options(writing, level, workers, long))
+        return open_tool(path, codec, mode, level, workers, long)
+    elif codec == 'lz4':
+        if lib is not None:
+            if writing:
+                return lib.open(path, mode, compression_level=level)
+            return lib.open(path, mode)
+        return open_tool(path, codec, mode, level, workers, long)
+    raise RuntimeError(f"Unsupported algorithm {codec}")
+
+
+def available(codec: str) -> bool:
+    """Checks if a codec can be used by the python implementation"""
+    if codec in ('gz', 'bz2', 'xz'):
+        return module(codec) is not None
+    elif codec in STREAM_CODECS:
+        return module(codec) is not None or find_tool(codec) is not None
+    return False
+
+
+def compress_buffer(data: bytes,
+                    codec: str,
+                    level: typing.Union[str, int] = 5) -> bytes:
+    """Compresses a buffer in memory
+
+    Args:
+        data(bytes): the uncompressed data
+        codec(str): one of gz, bz2, xz, zst, lz4
+        level(int): the compression level
+
+    Returns:
+        bytes: the compressed data
+    """
+    level = clip_level(codec, level)
+    lib = module(codec)
+    if codec == 'gz':
+        return lib.compress(data, compresslevel=level)
+    elif codec == 'bz2':
+        return lib.compress(data, level)
+    elif codec == 'xz':
+        return lib.compress(data, preset=level)
+    elif codec == 'zst' and lib is not None:
+        return lib.compress(data, level=level)
+    elif codec == 'lz4' and lib is not None:
+        return lib.compress(data, compression_level=level)
+    elif codec in STREAM_CODECS:
+        tool = find_tool(codec)
+        if tool is None:
+            raise RuntimeError(f"Neither a python module nor a native command for {codec} is available")
+        command = tool_command(tool, 'compress', level=level, codec=codec)
+        return subprocess.run(command, input=data, stdout=subprocess.PIPE, check=True).stdout
+    raise RuntimeError(f"Unsupported algorithm {codec}")
+
+
+def decompress_buffer(data: bytes, codec: str) -> bytes:
+    """Decompresses a buffer written by compress_buffer
+
+    Args:
+        data(bytes): the compressed data
+        codec(str): one of gz, bz2, xz, zst, lz4
+
+    Returns:
+        bytes: the uncompressed data
+    """
+    lib = module(codec)
+    if codec in ('gz', 'bz2', 'xz'):
+        return lib.decompress(data)
+    elif codec in STREAM_CODECS and lib is not None:
+        return lib.decompress(data)
+    elif codec in STREAM_CODECS:
+        tool = find_tool(codec)
+        if tool is None:
+            raise RuntimeError(f"Neither a python module nor a native command for {codec} is available")
+        command = tool_command(tool, 'uncompress', codec=codec)
+        return subprocess.run(command, input=data, stdout=subprocess.PIPE, check=True).stdout
+    raise RuntimeError(f"Unsupported algorithm {codec}")
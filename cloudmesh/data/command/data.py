@@ -1,9 +1,8 @@
 import sys
 
+from cloudmesh.common.Printer import Printer
+from cloudmesh.common.parameter import Parameter
 from cloudmesh.common.util import path_expand
-from cloudmesh.data.data import CompressExtensions
-from cloudmesh.data.data import NativeData
-from cloudmesh.data.data import PythonData
 from cloudmesh.shell.command import PluginCommand
 from cloudmesh.shell.command import command
 from cloudmesh.shell.command import map_parameters
@@ -18,31 +17,153 @@ class DataCommand(PluginCommand):
         ::
 
           Usage:
-                data compress [--benchmark] [--algorithm=KIND] [--level=N] --source=SOURCE [--destination=DESTINATION] [--dryrun]
-                data uncompress [--benchmark] [--force] --source=SOURCE [--destination=DESTINATION] [--dryrun]
-                data info --source=SOURCE
+                data compress [--benchmark] [--algorithm=KIND] [--level=N] [--threads=N] [--long] [--store-incompressible] [--per-member] [--seekable] [--volume-size=SIZE] [--incremental] [--base=ARCHIVE] [--hash] [--dedup] [--chunks=DIRECTORY] [--digest=ALGORITHM] [--metrics=FILE] [--profile] [--backend=BACKEND] [--jobs=N] [--memlimit=SIZE] --source=SOURCE... [--destination=DESTINATION] [--dryrun]
+                data uncompress [--benchmark] [--algorithm=KIND] [--force] [--threads=N] [--long] [--metrics=FILE] [--profile] [--backend=BACKEND] [--jobs=N] [--memlimit=SIZE] --source=SOURCE... [--destination=DESTINATION] [--dryrun]
+                data transcode [--algorithm=KIND] [--level=N] [--threads=N] [--long] [--digest=ALGORITHM] [--metrics=FILE] [--profile] [--backend=BACKEND] [--jobs=N] [--memlimit=SIZE] --source=SOURCE... [--destination=DESTINATION] [--dryrun]
+                data info [--threads=N] [--jobs=N] --source=SOURCE...
+                data verify [--threads=N] [--jobs=N] --source=SOURCE...
+                data list --source=SOURCE...
+                data extract [--threads=N] --source=SOURCE... --member=PATH... [--destination=DESTINATION]
+                data estimate [--algorithm=KIND] [--level=N] [--threads=N] --source=SOURCE
+                data benchmark [--algorithms=LIST] [--levels=LIST] [--backends=LIST] [--corpora=LIST] [--size=SIZE] [--threads=N] [--output=FORMAT] [--file=FILE] [--directory=DIRECTORY]
 
           Compresses the specified item. The default algorithm is xz, Alternative it gz.
           Example if destination in compress is not specified the destination will be set to
           SOURCE.tar.xz
 
+          compress --seekable writes a directory as independently compressed blocks of a
+          gz, bz2 or xz archive and a sidecar index DESTINATION.idx. data extract then only
+          decompresses the blocks that hold the requested members, data list reads the
+          members from the index. Archives without an index are decompressed as usual.
+
+          compress --per-member classifies every file of a directory by its extension, its magic
+          bytes or the entropy of its first 64 KB. Files that are already compressed, e.g. jpg,
+          mp4, gz or parquet, are stored in the gz or xz container, the others are compressed.
+          The archive is a regular tar.gz or tar.xz.
+
+          compress --volume-size=SIZE writes the gz, bz2 or xz archive directly as numbered parts
+          DESTINATION.001, DESTINATION.002, ... of at most SIZE, e.g. 2G, and a sidecar
+          DESTINATION.volumes. Every part can be decompressed on its own, concatenated they are
+          the whole archive. uncompress of DESTINATION, its sidecar or a part checks that all
+          parts are there and decompresses their blocks on --threads threads.
+
+          compress --incremental writes a tar archive of a directory and a manifest
+          DESTINATION.manifest. With --base, only the paths that are new or changed since
+          the manifest of ARCHIVE are written, deleted paths are recorded as tombstones.
+          uncompress of such a delta restores its base and all deltas up to it.
+
+          compress --dedup cuts the files into content-defined chunks and stores every unique
+          chunk once, compressed, in the chunk store DIRECTORY, by default .chunks next to
+          DESTINATION. DESTINATION is a small recipe, by default SOURCE.dedup. Chunks that are
+          already in the store are not compressed again, so near-copies only cost their
+          differences. uncompress and info detect recipes by their extension .dedup.
+
+          compress --digest computes the sha256, xxh64 or xxh3 of the archive on the bytes
+          while they are written and stores it in DESTINATION.sha256 (or .xxh64, .xxh3) in
+          the format of sha256sum. uncompress checks the digest of an archive that has one
+          on the bytes it reads anyway.
+
+          compress --source=- compresses stdin, e.g. pg_dump db | cms data compress --source=- ...,
+          for the tar variants stdin is a tar stream. --destination=- writes the archive of a
+          file or directory to stdout. uncompress --source=- reads an archive of --algorithm from
+          stdin and extracts a tar archive into DESTINATION, uncompress --destination=- writes the
+          uncompressed stream, for the tar variants the tar stream, to stdout. Without
+          a destination a stream from stdin is written to stdout. Streams use bounded memory.
+
+          compress and uncompress --metrics append a JSON line per operation to FILE, FILE -
+          prints them. A line holds the bytes in and out, the throughput of the uncompressed
+          side in MB/s, the CPU user and system seconds, the peak RSS and the seconds spent in
+          the phases walk, read, compress or uncompress and write. --profile runs the python
+          backends under cProfile and prints the functions with the largest cumulative time,
+          with --metrics they are also part of the line.
+
+          compress and uncompress --backend=auto use the backend that is fastest on this host
+          for the algorithm, level and threads. The first use runs every backend on a small
+          synthetic sample and keeps the result per host in ~/.cloudmesh/data/calibration.json,
+          it is measured again when the cpu, python or the versions of the tools change.
+
+          compress and uncompress --memlimit=SIZE bound the memory of the operation, e.g. 512M,
+          for several sources the memory of all jobs together. The threads are lowered first,
+          the level only if one thread at the requested level needs more. The native xz gets
+          the limit as --memlimit-compress or --memlimit-decompress, zstd as --memory. The level,
+          threads and the planned memory are printed on stderr, --metrics records the limit and
+          the planned memory next to the peak RSS.
+
+          data transcode converts archives into the algorithm of --algorithm or of the extension of
+          DESTINATION, e.g. --source=a.tar.gz --destination=a.tar.xz. The decompressed stream goes
+          from the decoder to the encoder in memory, nothing but the new archive is written. The
+          native backend pipes the decompressor into the compressor, the python backend compresses
+          gz, bz2 and xz with --threads independent blocks. A tar archive stays a tar archive, the
+          default DESTINATION is SOURCE with the new extension.
+
+          data verify decompresses archives into a null sink, which checks their CRCs and tar
+          headers, and compares their digests if they have one. Several archives are
+          checked in parallel.
+
+          data info reports the size of files and directories and the compressed and
+          uncompressed size of archives as recorded in their metadata, nothing is
+          decompressed. bz2 does not record the uncompressed size.
+
+          If several sources are given, they are processed on a pool whose size is derived
+          from the cpus, the cgroup cpu quota and the available memory. DESTINATION is then
+          the directory the results are written to. A summary table is printed and the items
+          that failed are reported on stderr.
+
+          data benchmark runs every combination of algorithm, level, backend and corpus in its
+          own process and reports ratio, MB/s, CPU time and peak RSS of compress and uncompress.
+          Directory corpora use the tar variant of the algorithm, backends that are not
+          installed are reported as skipped.
+
           Arguments:
               SOURCE       the file source on which compress or uncompress is aplied
               DESTINATION  the destination file on which compress or uncompress is performed
 
           Options:
               -h                help
-              --level=N         the level of compression to apply 0 (no compression) to 9 (extreme)
-              --algorithm=KIND  the algorithm to use; gz, bzip2, xz
+              --level=N         the level of compression to apply 0 (no compression) to 9 (extreme),
+                                zstd supports 1 to 22 and lz4 1 to 12
+              --algorithm=KIND  the algorithm to use; gz, bzip2, xz, zstd, lz4
               --force           disables file overwrite protection [default: False].
+              --threads=N       number of threads used to compress or uncompress independent blocks in parallel,
+                                0 uses one thread per cpu [default: 0]
+              --long            use zstd long distance matching with a 128 MB window
+              --store-incompressible  estimate the ratio first and store the data uncompressed
+                                      in the gz or xz container if it does not shrink
+              --per-member      store the files that are already compressed in the gz or xz container
+              --seekable        write a block archive with a sidecar index for data extract
+              --volume-size=SIZE  split the archive into parts of at most SIZE, e.g. 512M or 2G
+              --incremental     write a manifest, with --base write only the changes
+              --base=ARCHIVE    the previous full or delta archive of an incremental archive
+              --hash            record sha256 digests in the manifest, touched files whose
+                                content did not change are not archived again
+              --dedup           store content-defined chunks once in a chunk store and write a recipe
+              --chunks=DIRECTORY  the chunk store of --dedup
+              --digest=ALGORITHM  writes the sha256, xxh64 or xxh3 digest of the archive next to it
+              --metrics=FILE    appends the metrics of every operation as JSON lines to FILE, - is stdout
+              --profile         profiles the python backends with cProfile
+              --backend=BACKEND  native, python or auto, native falls back to python if its
+                                 tools are missing [default: native]
+              --member=PATH     a member of the archive as shown by data list, a directory
+                                extracts its content
+              --jobs=N          the number of sources processed at the same time, by default
+                                derived from cpus and memory
+              --memlimit=SIZE   the memory compress, uncompress or transcode may use, e.g. 512M or 2G
+              --algorithms=LIST  the algorithms of the benchmark, e.g. gz,xz,zst, by default all available
+              --levels=LIST     the levels of the benchmark, e.g. 1,5,9 [default: 1,5,9]
+              --backends=LIST   native and/or python [default: native,python]
+              --corpora=LIST    ascii, random, mixed, entropy, text, log, columnar and/or tree
+                                [default: ascii,random,mixed,tree]
+              --size=SIZE       the size of each corpus [default: 10MB]
+              --output=FORMAT   table, csv or json [default: table]
+              --file=FILE       writes the csv or json output to a file
+              --directory=DIRECTORY  the working directory of the benchmark, by default a
+                                     temporary directory that is removed afterwards
 
           Description:
             TBD
 
         """
 
-        # TODO: compress should be
-        #     data compress [--benchmark] [--algorithm=KIND] [--level=N] --source=SOURCE... [--destination=DESTINATION]
         # TODO: as far as I can tell sepopts is not needed .... do not have two steps ...
 
         """
@@ -53,72 +174,303 @@ class DataCommand(PluginCommand):
             compress  data.tar.xz | ok       | 70.286 | 70.286 | 2022-02-17 02:06:34
         """
 
+        # arguments.benchmark is the benchmark command, the option is arguments["--benchmark"]
         map_parameters(arguments,
-                       "benchmark",
                        "algorithm",
                        "source",
                        "destination",
                        "level",
                        "force",
                        "csv",
-                       "dryrun")
+                       "dryrun",
+                       "threads",
+                       "long",
+                       "store-incompressible",
+                       "per-member",
+                       "seekable",
+                       "volume-size",
+                       "incremental",
+                       "base",
+                       "hash",
+                       "dedup",
+                       "chunks",
+                       "digest",
+                       "metrics",
+                       "profile",
+                       "backend",
+                       "member",
+                       "jobs",
+                       "memlimit",
+                       "algorithms",
+                       "levels",
+                       "backends",
+                       "corpora",
+                       "size",
+                       "output",
+                       "file",
+                       "directory")
+
+        if arguments.benchmark:
+            self._benchmark(arguments)
+            return ""
+
+        # cms loads every command when it starts, the backends are only
+        # imported when the data command runs
+        from cloudmesh.data.data import CompressExtensions
+        from cloudmesh.data.data import DedupData
+        from cloudmesh.data.dedup import RECIPE_EXTENSION
+        from cloudmesh.data.info import human_size
+
+        sources = [path_expand(source) for source in arguments.source]
+        arguments.source = sources[0]
+        # a stream from stdin goes to stdout unless a destination is given
+        if arguments.source == "-" and arguments.destination is None:
+            arguments.destination = "-"
+        jobs = None if arguments.jobs is None else int(arguments.jobs)
 
         if arguments.algorithm:
             algorithm = arguments.algorithm
         else:
-            if arguments.compress:
-                algorithm = CompressExtensions.detect(arguments.destination)
+            if arguments.compress or arguments.transcode:
+                algorithm = CompressExtensions.detect(arguments.destination or "")
             else:
                 algorithm = CompressExtensions.detect(arguments.source)
 
             if algorithm is None:
                 algorithm = 'xz'
 
-        try:
-            worker = NativeData(algorithm=algorithm, dryrun=arguments.dryrun)
-        except RuntimeError as e:
-            print(e, file=sys.stderr)
-            worker = PythonData(algorithm=algorithm, dryrun=arguments.dryrun)
+        workers = 0 if arguments.threads is None else int(arguments.threads)
+
+        profiles = []
+        sink = self._sink(arguments, profiles)
+
+        if arguments.dedup or any(source.endswith(RECIPE_EXTENSION) for source in sources):
+            store = None if arguments.chunks is None else path_expand(arguments.chunks)
+            worker = DedupData(algorithm=algorithm, dryrun=arguments.dryrun, workers=workers,
+                               digest=arguments.digest, store=store, metrics=sink, profile=bool(arguments.profile),
+                               memlimit=arguments.memlimit)
+        else:
+            backend = self._backend(arguments, algorithm, workers)
+            worker = backend(algorithm=algorithm, dryrun=arguments.dryrun, workers=workers,
+                             long=bool(arguments.long), digest=arguments.digest,
+                             metrics=sink, profile=bool(arguments.profile),
+                             memlimit=arguments.memlimit)
+
+        if arguments.memlimit and (arguments.compress or arguments.uncompress or arguments.transcode):
+            self._limits(worker, arguments)
+
+        if arguments.compress and len(sources) > 1:
+            destination = None if arguments.destination is None else path_expand(arguments.destination)
+            results = worker.compress_many(sources,
+                                           destination=destination,
+                                           level=arguments.level,
+                                           jobs=jobs,
+                                           store_incompressible=arguments["store-incompressible"],
+                                           seekable=arguments.seekable,
+                                           volume_size=arguments["volume-size"],
+                                           per_member=arguments["per-member"])
+            self._summary(results)
+            if arguments["--benchmark"]:
+                worker.benchmark()
+
+        elif arguments.uncompress and len(sources) > 1:
+            destination = None if arguments.destination is None else path_expand(arguments.destination)
+            results = worker.uncompress_many(sources,
+                                             destination=destination,
+                                             jobs=jobs,
+                                             force=arguments.force)
+            self._summary(results)
+            if arguments["--benchmark"]:
+                worker.benchmark()
+
+        elif arguments.transcode and len(sources) > 1:
+            destination = None if arguments.destination is None else path_expand(arguments.destination)
+            results = worker.transcode_many(sources,
+                                            destination=destination,
+                                            level=arguments.level,
+                                            jobs=jobs)
+            self._summary(results)
+
+        elif arguments.transcode:
+            destination = None if arguments.destination is None else path_expand(arguments.destination)
+            print(worker.transcode(arguments.source, destination, level=arguments.level))
+
+        elif arguments.compress and (arguments.incremental or arguments.base):
+            result = worker.compress_incremental(source=arguments.source,
+                                                 destination=path_expand(arguments.destination),
+                                                 base=None if arguments.base is None else path_expand(arguments.base),
+                                                 level=arguments.level,
+                                                 digest=arguments.hash)
+            if result:
+                print(Printer.attribute(result))
+            if arguments["--benchmark"]:
+                worker.benchmark()
 
-        if arguments.compress:
-            arguments.source = path_expand(arguments.source)
+        elif arguments.compress:
             arguments.destination = path_expand(arguments.destination)
 
             worker.compress(source=arguments.source,
                             destination=arguments.destination,
-                            level=arguments.level)
-            if arguments.benchmark:
+                            level=arguments.level,
+                            store_incompressible=arguments["store-incompressible"],
+                            seekable=arguments.seekable,
+                            volume_size=arguments["volume-size"],
+                            per_member=arguments["per-member"])
+            if arguments["--benchmark"]:
                 worker.benchmark()
 
         elif arguments.uncompress:
-            arguments.source = path_expand(arguments.source)
             arguments.destination = path_expand(arguments.destination)
 
-            print("In uncompress")
-            print(type(worker))
+            if arguments.destination != "-":
+                print("In uncompress")
+                print(type(worker))
             worker.uncompress(
                 source=arguments.source,
                 destination=arguments.destination,
                 force=arguments.force)
-            if arguments.benchmark:
+            if arguments["--benchmark"]:
                 worker.benchmark()
 
-        elif arguments.info:
-            arguments.source = path_expand(arguments.source)
-            _info_dest = worker.get_info(arguments.source)
-            print(_info_dest, arguments.source)
+        elif arguments.estimate:
+            algorithms = [arguments.algorithm] if arguments.algorithm else None
+            results = worker.estimate(arguments.source,
+                                      algorithms=algorithms,
+                                      level=arguments.level)
+            print(Printer.write(results,
+                                order=["algorithm", "level", "size", "estimate",
+                                       "ratio", "seconds", "throughput"]))
+
+        elif arguments.list:
+            print(Printer.write(worker.list(arguments.source), order=["name", "type", "size"]))
+
+        elif arguments.extract:
+            destination = None if arguments.destination is None else path_expand(arguments.destination)
+            for name in worker.extract(arguments.source, arguments.member, destination=destination):
+                print(name)
 
-            try:
-                source = arguments.source.rsplit(".", 1)[0]
-                _info_source = worker.get_info(source)
-                print(_info_source, source)
+        elif arguments.info:
+            results = worker.info_many(sources, jobs=jobs)
+            for result in results:
+                for key in ["size", "uncompressed"]:
+                    result[key] = human_size(result.get(key))
+            print(Printer.write(results,
+                                order=["source", "type", "algorithm", "size", "uncompressed",
+                                       "ratio", "files", "members", "status"]))
+            for result in results:
+                if result["status"] != "ok":
+                    print(f"ERROR: {result['source']}: {result['error']}", file=sys.stderr)
 
-                s = _info_source.split()[0]
-                d = _info_dest.split()[0]
-                r = float(worker.get_info(source, binary=True)) / float(worker.get_info(arguments.source, binary=True))
-                print(f"{r:.2f}")
+        elif arguments.verify:
+            results = worker.verify_many(sources, jobs=jobs)
+            for result in results:
+                for key in ["size", "uncompressed"]:
+                    result[key] = human_size(result.get(key))
+            print(Printer.write(results,
+                                order=["source", "algorithm", "digest", "size", "uncompressed",
+                                       "members", "status", "seconds"]))
+            for result in results:
+                if result["status"] != "ok":
+                    print(f"ERROR: {result['source']}: {result['error']}", file=sys.stderr)
 
-            except Exception as e:
-                print(e)
+        for record in profiles:
+            print(f"Profile of {record['operation']} {record['source']}")
+            print(Printer.write(record['profile'], order=["function", "calls", "tottime", "cumtime"]))
 
         return ""
+
+    @staticmethod
+    def _sink(arguments, profiles):
+        """The metrics sink of --metrics and --profile, profiled records are collected in profiles"""
+        from cloudmesh.data.metrics import emit
+
+        path = arguments.metrics
+        if path is not None and path != "-":
+            path = path_expand(path)
+        if not arguments.profile:
+            return path
+
+        def sink(record):
+            if "profile" in record:
+                profiles.append(record)
+            if path is not None:
+                emit(record, path)
+
+        return sink
+
+    @staticmethod
+    def _backend(arguments, algorithm, workers):
+        """The backend class of --backend, auto selects the calibrated fastest backend"""
+        from cloudmesh.data.data import NativeData
+        from cloudmesh.data.data import PythonData
+
+        name = arguments.backend or "native"
+        if name == "auto" and (arguments.compress or arguments.uncompress or arguments.transcode):
+            from cloudmesh.data.calibrate import select
+
+            action = "uncompress" if arguments.uncompress else "compress"
+            name = select(algorithm, action, level=arguments.level, workers=workers)
+        if name == "python":
+            return PythonData
+        reason = NativeData.missing(algorithm)
+        if reason is not None:
+            print(reason, file=sys.stderr)
+            return PythonData
+        return NativeData
+
+    @staticmethod
+    def _limits(worker, arguments):
+        """Prints the level, threads and memory of an operation under --memlimit on stderr"""
+        from cloudmesh.data.info import human_size
+
+        action = "uncompress" if arguments.uncompress else "compress"
+        limits = worker.limits(action, arguments.level)
+        line = f"memlimit {human_size(limits['memlimit'])}: {limits['threads']} threads"
+        if action == "compress":
+            requested = 5 if arguments.level is None else int(arguments.level)
+            if limits['level'] != requested:
+                line += f", level {requested} lowered to {limits['level']}"
+            else:
+                line += f", level {requested}"
+        print(f"{line}, about {human_size(limits['memory'])} per job", file=sys.stderr)
+
+    @staticmethod
+    def _benchmark(arguments):
+        """Runs the benchmark matrix and prints or writes the rows"""
+        from cloudmesh.data import benchmark
+        from cloudmesh.data.data import CompressExtensions
+
+        workers = 0 if arguments.threads is None else int(arguments.threads)
+        algorithms = None
+        if arguments.algorithms:
+            algorithms = [CompressExtensions.codec(algorithm)
+                          for algorithm in Parameter.expand(arguments.algorithms)]
+        rows = benchmark.benchmark(algorithms=algorithms,
+                                   levels=[int(level) for level in Parameter.expand(arguments.levels)],
+                                   backends=Parameter.expand(arguments.backends),
+                                   corpora=Parameter.expand(arguments.corpora),
+                                   size=arguments.size,
+                                   workers=workers,
+                                   directory=None if arguments.directory is None
+                                   else path_expand(arguments.directory))
+        if arguments.output == "table":
+            print(Printer.write(rows, order=benchmark.ORDER))
+            return
+        result = benchmark.write(rows, output=arguments.output)
+        if arguments.file:
+            with open(path_expand(arguments.file), "w") as f:
+                f.write(result)
+        else:
+            print(result)
+
+    @staticmethod
+    def _summary(results):
+        """Prints the results of a batch and reports the failed items on stderr"""
+        print(Printer.write(results,
+                            order=["source", "destination", "algorithm", "status",
+                                   "seconds", "input", "output"]))
+        failed = [result for result in results if result["status"] != "ok"]
+        for result in failed:
+            print(f"ERROR: {result['source']}: {result['error']}", file=sys.stderr)
+        if failed:
+            print(f"ERROR: {len(failed)} of {len(results)} items failed", file=sys.stderr)
@@ -1,42 +1,389 @@
 import os
+import random
+import time
 
+"""
+Streaming generators for test data.
 
-def random_file(filename, size):
+All generators write in chunks of CHUNK bytes from reused buffers, so the
+memory does not depend on the size of the file and producing large
+fixtures is limited by the disk. Every generator takes a seed, the same
+seed produces the same content.
+"""
+
+# the size of the chunks written at once
+CHUNK = 4 * 1024 * 1024
+
+# the size of the pieces the entropy of a file is controlled in, smaller
+# than the window of every codec so that the ratio does not depend on it
+PIECE = 4 * 1024
+
+# the number of distinct sentences, log messages and rows the text corpora
+# are drawn from, and the number of lines generated at once
+POOL = 4096
+
+# the first timestamp of log and columnar files, 2022-01-01
+EPOCH = 1640995200
+
+WORDS = ("the", "of", "and", "to", "in", "data", "is", "for", "that", "with",
+         "on", "as", "by", "file", "was", "compression", "block", "stream",
+         "from", "at", "an", "this", "be", "are", "which", "or", "it", "cloud",
+         "mesh", "server", "request", "value", "archive", "storage", "network",
+         "python", "algorithm", "throughput", "memory", "thread", "process")
+
+LEVELS = ("INFO", "INFO", "INFO", "INFO", "DEBUG", "DEBUG", "WARNING", "ERROR")
+
+COMPONENTS = ("api", "scheduler", "storage", "worker", "auth", "cache", "network")
+
+CATEGORIES = ("red", "green", "blue", "cyan", "magenta", "yellow", "black")
+
+
+def _random_bytes(rng, n):
+    """n random bytes from a random.Random, randbytes is python 3.9+"""
+    if n == 0:
+        return b''
+    return rng.getrandbits(n * 8).to_bytes(n, 'little')
+
+
+def _write(filename, size, fill):
+    """
+    writes a file in chunks
+
+    :param filename: the filename
+    :type filename: str
+    :param size: the size in bytes
+    :type size: int
+    :param fill: called with the number of bytes wanted, returns at most
+                 that many bytes, e.g. a slice of a reused buffer
+    :type fill: callable
+    :return: void
+    """
+    written = 0
+    with open(filename, 'wb', buffering=0) as f:
+        while written < size:
+            chunk = fill(min(CHUNK, size - written))
+            f.write(chunk)
+            written += len(chunk)
+
+
+def _lines(filename, size, lines):
+    """
+    writes a file from generated lines, truncated to the size
+
+    :param filename: the filename
+    :type filename: str
+    :param size: the size in bytes
+    :type size: int
+    :param lines: called with the number of the first line and a count,
+                  returns that many str ending in a newline
+    :type lines: callable
+    :return: void
+    """
+    buffer = bytearray()
+    number = 0
+
+    def fill(n):
+        nonlocal number
+        while len(buffer) < n:
+            batch = lines(number, POOL)
+            number += POOL
+            buffer.extend(''.join(batch).encode())
+        chunk = bytes(buffer[:n])
+        del buffer[:n]
+        return chunk
+
+    _write(filename, size, fill)
+
+
+def random_file(filename, size, seed=None, verbose=True):
     """
     generate a binary with given size
+
     :param filename: the filename
     :param size: the size in bytes
+    :param seed: the seed of the random bytes
+    :param verbose: print a message
     :return: void
     """
     s = get_real_size(size)
-    with open(filename, 'wb') as f:
-        f.write(os.urandom(s))
-    print(f'Created random file of size: {size}')
+    rng = random.Random(seed)
+    _write(filename, s, lambda n: _random_bytes(rng, n))
+    if verbose:
+        print(f'Created random file of size: {size}')
 
 
-def ascii_file(filename, size, c="0"):
+def ascii_file(filename, size, c="0", seed=None, verbose=True):
     """
     generate an ascii file with given size that only contains the char c
 
     :param filename: the filename
-    :type filename:
+    :type filename: str
     :param size: the size in bytes
-    :type size:
-    :param c:
-    :type c:
+    :type size: str
+    :param c: the char
+    :type c: str
+    :param seed: not used, the content is constant
+    :type seed: int
+    :param verbose: print a message
+    :type verbose: bool
     :return: void
     :rtype: void
     """
+    s = get_real_size(size)
+    buffer = memoryview(CHUNK * c.encode()[:1])
+    _write(filename, s, lambda n: buffer[:n])
+    if verbose:
+        print(f'Created file with {c} of size: {size}')
+
+
+def entropy_file(filename, size, ratio=0.5, seed=None, verbose=True):
+    """
+    generate a file that compresses to about the given ratio
+
+    Every piece of 4 KB starts with ratio * 4 KB random bytes, the rest is
+    zeros. The random bytes do not compress and the zeros nearly vanish
+    with every codec, so the compressed size is about ratio * size.
+
+    :param filename: the filename
+    :type filename: str
+    :param size: the size in bytes
+    :type size: str
+    :param ratio: the target compressed size / size between 0 and 1
+    :type ratio: float
+    :param seed: the seed of the random bytes
+    :type seed: int
+    :param verbose: print a message
+    :type verbose: bool
+    :return: void
+    """
+    s = get_real_size(size)
+    ratio = min(max(float(ratio), 0.0), 1.0)
+    rng = random.Random(seed)
+    noise = int(PIECE * ratio)
+    buffer = bytearray(CHUNK)
+    view = memoryview(buffer)
+
+    def fill(n):
+        pieces = -(-n // PIECE)
+        data = _random_bytes(rng, pieces * noise)
+        source = memoryview(data)
+        for i in range(pieces):
+            # the zeros after the random bytes of a piece are never overwritten
+            view[i * PIECE:i * PIECE + noise] = source[i * noise:(i + 1) * noise]
+        return view[:n]
+
+    _write(filename, s, fill)
+    if verbose:
+        print(f'Created file with ratio {ratio} of size: {size}')
+
+
+def mixed_file(filename, size, block="64KB", seed=None, verbose=True):
+    """
+    generate a file with given size that alternates blocks of random bytes
+    and blocks of a single char, so that about half of it compresses
+
+    :param filename: the filename
+    :type filename: str
+    :param size: the size in bytes
+    :type size: str
+    :param block: the size of the alternating blocks
+    :type block: str
+    :param seed: the seed of the random bytes
+    :type seed: int
+    :param verbose: print a message
+    :type verbose: bool
+    :return: void
+    """
+    s = get_real_size(size)
+    b = get_real_size(block)
+    rng = random.Random(seed)
+    zeros = memoryview(min(b, CHUNK) * b'0')
+    position = 0
+
+    def fill(n):
+        nonlocal position
+        offset = position % b
+        n = min(n, b - offset)
+        position += n
+        if (position - n) // b % 2 == 0:
+            return _random_bytes(rng, n)
+        return zeros[:n]
+
+    _write(filename, s, fill)
+    if verbose:
+        print(f'Created mixed file of size: {size}')
+
+
+def text_file(filename, size, seed=None, verbose=True):
+    """
+    generate a text file of sentences whose word frequencies follow
+    Zipf's law like natural language
+
+    :param filename: the filename
+    :type filename: str
+    :param size: the size in bytes
+    :type size: str
+    :param seed: the seed of the text
+    :type seed: int
+    :param verbose: print a message
+    :type verbose: bool
+    :return: void
+    """
+    s = get_real_size(size)
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    sentences = [' '.join(rng.choices(WORDS, weights=weights, k=rng.randint(4, 16))).capitalize() + '.\n'
+                 for _ in range(POOL)]
+
+    _lines(filename, s, lambda number, count: rng.choices(sentences, k=count))
+    if verbose:
+        print(f'Created text file of size: {size}')
+
+
+def log_file(filename, size, seed=None, verbose=True):
+    """
+    generate a log file with increasing timestamps, levels, components,
+    request ids and messages
+
+    :param filename: the filename
+    :type filename: str
+    :param size: the size in bytes
+    :type size: str
+    :param seed: the seed of the log
+    :type seed: int
+    :param verbose: print a message
+    :type verbose: bool
+    :return: void
+    """
+    s = get_real_size(size)
+    rng = random.Random(seed)
+    messages = [f"{rng.choice(LEVELS):<7} [{rng.choice(COMPONENTS)}] request={rng.getrandbits(32):08x} "
+                f"duration={rng.randint(1, 5000)}ms {' '.join(rng.choices(WORDS, k=rng.randint(3, 10)))}\n"
+                for _ in range(POOL)]
+
+    def lines(number, count):
+        # ten lines per second
+        stamps = [time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(EPOCH + second))
+                  for second in range(number // 10, (number + count) // 10 + 1)]
+        return [f"{stamps[i // 10 - number // 10]}.{i % 10}00Z {message}"
+                for i, message in zip(range(number, number + count), rng.choices(messages, k=count))]
+
+    _lines(filename, s, lines)
+    if verbose:
+        print(f'Created log file of size: {size}')
+
+
+def columnar_file(filename, size, seed=None, verbose=True):
+    """
+    generate a csv file with an increasing id, a timestamp, a category,
+    an integer counter and a float measurement column
+
+    :param filename: the filename
+    :type filename: str
+    :param size: the size in bytes
+    :type size: str
+    :param seed: the seed of the values
+    :type seed: int
+    :param verbose: print a message
+    :type verbose: bool
+    :return: void
     """
-    
+    s = get_real_size(size)
+    rng = random.Random(seed)
+    values = [f"{rng.choice(CATEGORIES)},{rng.randint(0, 1000)},{rng.gauss(100, 15):.4f}\n"
+              for _ in range(POOL)]
+
+    def lines(number, count):
+        batch = [f"{i},{EPOCH + i * 60},{value}"
+                 for i, value in zip(range(number, number + count), rng.choices(values, k=count))]
+        if number == 0:
+            batch[0] = "id,timestamp,category,count,value\n"
+        return batch
+
+    _lines(filename, s, lines)
+    if verbose:
+        print(f'Created columnar file of size: {size}')
+
+
+GENERATORS = {
+    "ascii": ascii_file,
+    "random": random_file,
+    "mixed": mixed_file,
+    "entropy": entropy_file,
+    "text": text_file,
+    "log": log_file,
+    "columnar": columnar_file,
+}
+
+
+def file_sizes(size, files, distribution="uniform", seed=None):
+    """
+    splits a total size into file sizes
+
+    :param size: the total size in bytes
+    :type size: int
+    :param files: the number of files
+    :type files: int
+    :param distribution: uniform (all equal), lognormal (many small and
+                         some large files) or pareto (few files hold most
+                         of the data)
+    :type distribution: str
+    :param seed: the seed of the sizes
+    :type seed: int
+    :return: the sizes, they add up to size
+    :rtype: list
+    """
+    rng = random.Random(seed)
+    if distribution == "uniform":
+        weights = [1.0] * files
+    elif distribution == "lognormal":
+        weights = [rng.lognormvariate(0, 1.5) for _ in range(files)]
+    elif distribution == "pareto":
+        weights = [rng.paretovariate(1.16) for _ in range(files)]
+    else:
+        raise ValueError(f"Unknown distribution {distribution}")
+    total = sum(weights)
+    sizes = [int(size * weight / total) for weight in weights]
+    for i in range(size - sum(sizes)):
+        sizes[i % files] += 1
+    return sizes
+
+
+def tree(directory, size, files=100, kind="mixed", distribution="uniform", seed=None, verbose=True):
+    """
+    generate a directory with many files, at most 100 in a subdirectory
+
+    :param directory: the directory
+    :type directory: str
+    :param size: the total size in bytes
+    :type size: str
+    :param files: the number of files
+    :type files: int
+    :param kind: the content of the files, one of the keys of GENERATORS
+    :type kind: str
+    :param distribution: the distribution of the file sizes, see file_sizes
+    :type distribution: str
+    :param seed: the seed of sizes and content
+    :type seed: int
+    :param verbose: print a message
+    :type verbose: bool
+    :return: void
     """
     s = get_real_size(size)
-    with open(filename, 'wb') as f:
-        f.write(s * b'{c}')
-    print(f'Created file with {c} of size: {size}')
+    generate = GENERATORS[kind]
+    for i, length in enumerate(file_sizes(s, files, distribution=distribution, seed=seed)):
+        path = os.path.join(directory, f"{i // 100:03d}")
+        os.makedirs(path, exist_ok=True)
+        generate(os.path.join(path, f"file_{i:06d}.dat"), length,
+                 seed=None if seed is None else seed + i, verbose=False)
+    if verbose:
+        print(f'Created tree of {files} files of size: {size}')
 
 
 def get_real_size(size):
+    if isinstance(size, int):
+        return size
+
     KB = int(1024)
     MB = int(KB ** 2)  # 1,048,576
     GB = int(KB ** 3)  # 1,073,741,824
@@ -1,21 +1,81 @@
-from cloudmesh.common.Shell import Shell
-from cloudmesh.common.StopWatch import StopWatch
-
-import bz2
+from cloudmesh.data.aio import cancellable
+from cloudmesh.data.aio import offload
+from cloudmesh.data.aio import remove
+from cloudmesh.data.block import CODECS as BLOCK_CODECS
+from cloudmesh.data.block import MB
+from cloudmesh.data.block import STORE_CODECS
+from cloudmesh.data.block import BlockWriter
+from cloudmesh.data.block import open_blocks
+from cloudmesh.data.block import resolve_workers
+from cloudmesh.data.builder import add_tree
+from cloudmesh.data.capabilities import registry
+from cloudmesh.data.classify import MIN_SIZE as MEMBER_SIZE
+from cloudmesh.data.classify import is_compressed
+from cloudmesh.data.codec import open_codec
+from cloudmesh.data.dedup import DEFAULT_STORE
+from cloudmesh.data.dedup import RECIPE_EXTENSION
+from cloudmesh.data.dedup import ChunkStore
+from cloudmesh.data.dedup import read_recipe
+from cloudmesh.data.dedup import recipe_info
+from cloudmesh.data.dedup import restore_recipe
+from cloudmesh.data.dedup import write_recipe
+from cloudmesh.data.digest import DigestFile
+from cloudmesh.data.digest import digest_path
+from cloudmesh.data.digest import new_digest
+from cloudmesh.data.digest import read_digest
+from cloudmesh.data.digest import write_digest
+from cloudmesh.data.estimate import INCOMPRESSIBLE
+from cloudmesh.data.estimate import estimate
+from cloudmesh.data.estimate import files
+from cloudmesh.data.extract import extract_member
+from cloudmesh.data.extract import extract_tar
+from cloudmesh.data.incremental import chain
+from cloudmesh.data.incremental import read_manifest
+from cloudmesh.data.incremental import restore
+from cloudmesh.data.incremental import write_incremental
+from cloudmesh.data.info import human_size
+from cloudmesh.data.info import tar_members
+from cloudmesh.data.info import uncompressed_size
+from cloudmesh.data.info import walk
+from cloudmesh.data.metrics import CURRENT
+from cloudmesh.data.metrics import Metrics
+from cloudmesh.data.metrics import emit
+from cloudmesh.data.metrics import profiled
+from cloudmesh.data.metrics import remainder
+from cloudmesh.data.metrics import timed
+from cloudmesh.data.pipeline import Pipeline
+from cloudmesh.data.pipeline import TOOLS
+from cloudmesh.data.pipeline import find_tool
+from cloudmesh.data.pipeline import run_pipeline
+from cloudmesh.data.pipeline import run_pipeline_async
+from cloudmesh.data.pipeline import tool_command
+from cloudmesh.data.pool import cpu_limit
+from cloudmesh.data.pool import fit
+from cloudmesh.data.pool import job_memory
+from cloudmesh.data.pool import pool_size
+from cloudmesh.data.pool import run_pool
+from cloudmesh.data.seekable import TYPES
+from cloudmesh.data.seekable import extract_members
+from cloudmesh.data.seekable import index_path
+from cloudmesh.data.seekable import read_index
+from cloudmesh.data.seekable import write_archive
+from cloudmesh.data.transfer import KernelTarFile
+from cloudmesh.data.transfer import copy_file
+from cloudmesh.data.transfer import copy_stream
+from cloudmesh.data.volume import VolumeWriter
+from cloudmesh.data.volume import archive_size
+from cloudmesh.data.volume import base
+from cloudmesh.data.volume import open_volumes
+from cloudmesh.data.volume import parse_size
+from cloudmesh.data.volume import read_volumes
+
+import contextlib
 import dataclasses
-import gzip
 import os
-import shutil
 import sys
 import tarfile
 import typing
 
-try:
-    import lzma
-except ImportError as e:
-    print("WARNING: System not built with LZMA support, system will only support native calls",
-          file=sys.stderr)
-
 """
 BUG: benchmark can be obtained with (this should also work just n a single file not just a dir
 BUG: the lzma missing library bug should be caught and automatically the native method be used ... 
@@ -46,6 +106,43 @@ tar xf DIR.tar.gz
 """
 
 
+# the path that stands for stdin or stdout
+STREAM = '-'
+
+
+def _is_path(path) -> bool:
+    """True for a path, False for - and for file objects"""
+    return isinstance(path, str) and path != STREAM
+
+
+def _name(path) -> typing.Optional[str]:
+    """The path or the name of a file object, e.g. <stdin>"""
+    if path is None or isinstance(path, str):
+        return path
+    return str(getattr(path, 'name', '<stream>'))
+
+
+def _size(path: typing.Optional[str]) -> typing.Optional[int]:
+    """The size of a file or the total size of the files of a directory"""
+    if not _is_path(path) or not os.path.exists(path):
+        return None
+    return sum(size for _, size in files(path))
+
+
+@contextlib.contextmanager
+def _output_file(path) -> typing.Iterator[typing.BinaryIO]:
+    """Opens an uncompressed output, - is stdout and file objects stay open"""
+    if _is_path(path):
+        with open(path, 'wb') as f:
+            yield f
+        return
+    if path == STREAM:
+        sys.stdout.flush()
+        path = sys.stdout.buffer
+    yield path
+    path.flush()
+
+
 @dataclasses.dataclass
 class CompressExtensions:
     gz = ('.gz',)
@@ -55,23 +152,110 @@ class CompressExtensions:
     targz = ('.tar.gz', '.tgz')
     tarbz2 = ('.tar.bz2', '.tbz2')
     tarxz = ('.tar.xz', '.txz')
+    zst = ('.zst',)
+    lz4 = ('.lz4',)
+    tarzst = ('.tar.zst', '.tzst')
+    tarlz4 = ('.tar.lz4',)
+
+    # alternative names accepted for the algorithms
+    aliases = {
+        'gzip': 'gz',
+        'bzip2': 'bz2',
+        'lzma': 'xz',
+        'tgz': 'targz',
+        'tbz2': 'tarbz2',
+        'txz': 'tarxz',
+        'zstd': 'zst',
+        'tarzstd': 'tarzst',
+        'tzst': 'tarzst',
+    }
+
+    @staticmethod
+    def normalize(algorithm):
+        """Maps an alternative algorithm name to the name used internally
+
+        Args:
+            algorithm(str): the algorithm name, e.g. gzip, bzip2, lzma, xz
+
+        Returns:
+            str: the internal algorithm name
+        """
+        if algorithm is None:
+            return None
+        return CompressExtensions.aliases.get(algorithm, algorithm)
+
+    @staticmethod
+    def codec(algorithm):
+        """Returns the stream codec of an algorithm without the tar container
+
+        Args:
+            algorithm(str): the algorithm name, e.g. tarxz or gz
+
+        Returns:
+            str: the codec, e.g. xz or gz, None for an uncompressed tar
+        """
+        algorithm = CompressExtensions.normalize(algorithm)
+        if algorithm.startswith('tar'):
+            algorithm = algorithm[3:]
+        return algorithm or None
+
+    @staticmethod
+    def extension(algorithm):
+        """Returns the preferred file extension of an algorithm
+
+        Args:
+            algorithm(str): the algorithm name, e.g. tarxz
+
+        Returns:
+            str: the extension, e.g. .tar.xz
+        """
+        return getattr(CompressExtensions, CompressExtensions.normalize(algorithm))[0]
+
+    @staticmethod
+    def strip(path):
+        """Removes the compression extension from a path
+
+        Args:
+            path(str): the path of the archive, e.g. data.tar.xz, or of a
+                part of it, e.g. data.tar.xz.001
+
+        Returns:
+            str: the path without the extension, e.g. data
+        """
+        path = base(path)
+        algorithm = CompressExtensions.detect(path)
+        if algorithm is not None:
+            for extension in getattr(CompressExtensions, algorithm):
+                if path.endswith(extension):
+                    return path[:-len(extension)]
+        return path
 
     @staticmethod
     def detect(path):
         DEBUG = True
         ret = None
+        # the parts and the sidecar of a volume set, e.g. data.tar.xz.001
+        path = base(path)
         if path.endswith(CompressExtensions.targz):
             ret = 'targz'
         elif path.endswith(CompressExtensions.tarbz2):
             ret = 'tarbz2'
         elif path.endswith(CompressExtensions.tarxz):
             ret = 'tarxz'
+        elif path.endswith(CompressExtensions.tarzst):
+            ret = 'tarzst'
+        elif path.endswith(CompressExtensions.tarlz4):
+            ret = 'tarlz4'
         elif path.endswith(CompressExtensions.gz):
             ret = "gz"
         elif path.endswith(CompressExtensions.bz2):
             ret = 'bz2'
         elif path.endswith(CompressExtensions.xz):
             ret = 'xz'
+        elif path.endswith(CompressExtensions.zst):
+            ret = 'zst'
+        elif path.endswith(CompressExtensions.lz4):
+            ret = 'lz4'
         elif path.endswith(CompressExtensions.tar):
             ret = "tar"
         else:
@@ -99,40 +283,175 @@ class Data:
                  dryrun: bool = False,
                  force: bool = True,
                  tag: str = "",
+                 workers: int = 0,
+                 long: int = 0,
+                 digest: str = None,
+                 metrics: typing.Union[str, typing.Callable[[dict], typing.Any]] = None,
+                 profile: bool = False,
+                 memlimit: typing.Union[str, int] = None,
                  *args,
                  **kwargs):
 
         # Establish instance-level configuration settings
-        self._algo: typing.Final = 'xz' if algorithm is None else algorithm
+        self._algo: typing.Final = 'xz' if algorithm is None else CompressExtensions.normalize(algorithm)
         self._tag: typing.Final = "" if tag is None else f" {tag}"
         self._dryrun: typing.Final = dryrun
         self._force: typing.Final = force
+        self._workers: typing.Final = resolve_workers(workers)
+        self._long: typing.Final = 0 if long is None else long
+        self._digest: typing.Final = digest
+        if digest is not None:
+            new_digest(digest)
+        self._metrics: typing.Final = metrics
+        self._profile: typing.Final = profile
+        self._memlimit: typing.Final = None if memlimit is None else parse_size(memlimit)
         self.config = {
             'algorithm': self._algo,
             'dryrun': self._dryrun,
             'force': self._force,
-            'tag': self._tag
+            'tag': self._tag,
+            'workers': self._workers,
+            'long': self._long,
+            'digest': self._digest,
+            'metrics': self._metrics,
+            'profile': self._profile,
+            'memlimit': self._memlimit
         }
         self.config.update({'args': args,
                             'kwargs': kwargs})
 
     @staticmethod
     def benchmark():
+        from cloudmesh.common.StopWatch import StopWatch
+
         # setting it to tru so it looks better
         StopWatch.timer_status["command"] = True
         StopWatch.benchmark()
 
     @staticmethod
     def _start(kind, location, tag):
+        from cloudmesh.common.StopWatch import StopWatch
+
         name = location.replace("/", "-")
         StopWatch.start(f"{kind}{tag} {name}")
 
     @staticmethod
     def _stop(kind, location, tag):
+        from cloudmesh.common.StopWatch import StopWatch
+
         name = location.replace("/", "-")
         StopWatch.stop(f"{kind}{tag} {name}")
 
-    def _run(self, command, driver=Shell.run):
+    @contextlib.contextmanager
+    def _measure(self,
+                 operation: str,
+                 source: str,
+                 destination: str = None,
+                 level: typing.Union[str, int] = None) -> typing.Iterator[typing.Optional[Metrics]]:
+        """Times an operation and records its metrics
+
+        The operation is timed with the StopWatch. If the instance has a
+        metrics sink, the bytes in and out, the CPU time, the peak RSS and
+        the phases of the operation are recorded in a Metrics object,
+        which is emitted when the operation finished or failed. Phases are
+        timed by the file objects wrapped with metrics.timed while the
+        operation runs. With profile set, the python backends also run the
+        operation under cProfile.
+
+        With a memory limit, the limit and the memory the operation is
+        planned to use are recorded next to the peak RSS.
+
+        Args:
+            operation(str): compress, uncompress or transcode
+            source(str): the file, directory or archive that is read
+            destination(str): the file, directory or archive that is written
+            level(int): the compression level of a compress
+
+        Returns:
+            Metrics: the metrics, None if they are not recorded
+        """
+        if self._dryrun:
+            yield None
+            return
+        location = _name(source if operation == 'uncompress' or destination is None else destination)
+        self._start(operation, location, self._tag)
+        if self._metrics is None:
+            yield None
+            self._stop(operation, location, self._tag)
+            return
+        metrics = Metrics(operation, self._backend(), self._algo, _name(source), _name(destination))
+        if self._memlimit is not None:
+            metrics.memlimit = self._memlimit
+            metrics.memory = self.limits('uncompress' if operation == 'uncompress' else 'compress',
+                                         level)['memory']
+        token = CURRENT.set(metrics)
+        metrics.start()
+        error = None
+        try:
+            # the walk of a directory counts its bytes while the compress runs
+            if not (operation == 'compress' and _is_path(source) and os.path.isdir(source)):
+                metrics.bytes_in = _size(source)
+            with profiled(metrics) if self._profile and self._profiled else contextlib.nullcontext():
+                yield metrics
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            CURRENT.reset(token)
+            metrics.stop(error)
+            self._stop(operation, location, self._tag)
+            if error is None:
+                if operation == 'uncompress' and 'uncompress' in metrics.transferred:
+                    metrics.bytes_out = metrics.transferred['uncompress']
+                else:
+                    metrics.bytes_out = _size(destination)
+                # directories and streams are counted while they are read
+                if metrics.bytes_in is None:
+                    metrics.bytes_in = metrics.transferred.get('walk', metrics.transferred.get('read'))
+                if metrics.bytes_out is None:
+                    metrics.bytes_out = metrics.transferred.get('write')
+            emit(metrics.to_dict(), self._metrics)
+
+    # whether profile runs the operations of the backend under cProfile
+    _profiled = False
+
+    def _backend(self) -> str:
+        """The name of the backend, e.g. native for NativeData"""
+        return type(self).__name__.replace('Data', '').lower() or 'data'
+
+    def limits(self, action: str = 'compress', level: typing.Union[str, int] = None) -> dict:
+        """The settings an operation runs with under the memory limit
+
+        The threads are reduced to fit the limit, the level only if one
+        thread at the requested level does not fit.
+
+        Args:
+            action(str): compress or uncompress
+            level(int): the requested compression level
+
+        Returns:
+            dict: the level, the threads, the memory they are estimated to
+                need in bytes and the memory limit in bytes, None if the
+                instance has none.
+
+        Raises:
+            RuntimeError: if a compress does not fit even at the lowest level
+        """
+        codec = CompressExtensions.codec(self._algo)
+        level, threads = fit(codec, level, self._memlimit, action=action, threads=self._workers, long=self._long)
+        return dict(level=level,
+                    threads=threads,
+                    memory=job_memory(codec, level, action=action, threads=threads, long=self._long),
+                    memlimit=self._memlimit)
+
+    def _limited(self, action: str, level: typing.Union[str, int] = None) -> typing.Tuple["Data", int]:
+        """The instance and the level that keep an operation within the memory limit"""
+        if self._memlimit is None:
+            return self, level
+        limits = self.limits(action, level)
+        return self._clone(self._algo, workers=limits['threads']), limits['level']
+
+    def _run(self, command, driver=None):
         """CLI Command Runner with driver substitution.
 
         Runs `command` using the specified `driver` on the system's path.
@@ -151,54 +470,758 @@ class Data:
         if self._dryrun:
             r = command
         else:
+            if driver is None:
+                from cloudmesh.common.Shell import Shell
+                driver = Shell.run
             r = driver(command)
         return r
 
+    async def _run_async(self, command, driver=run_pipeline_async):
+        """Awaitable variant of `_run` for drivers that are coroutines"""
+        if self._dryrun:
+            return command
+        return await driver(command)
+
     @staticmethod
     def get_info(source, binary=False):
         """
-        prints out information about the directory and if available the
-        compressed file all types will be probed (xz, gz, bzip2)
+        returns the size of a file or directory like du -sh or du -sb
 
         :param source: file or directory
-        :type source:
-        :param binary:
-        :type binary:
-        :return:
+        :type source: str
+        :param binary: the size in bytes instead of a human readable size
+        :type binary: bool
+        :return: the size
         :rtype: str
         """
-        if not binary:
-            return Shell.run(f"du -sh {source}").strip().split()[0]
+        size, _ = walk(source)
+        return str(size) if binary else human_size(size)
+
+    def info(self, source: str) -> dict:
+        """Returns the sizes of a file, directory or archive
+
+        Directories are walked with os.scandir, in parallel if the instance
+        has several workers. The uncompressed size of an archive is read
+        from its metadata, the member table of a plain tar from its headers.
+        Nothing is decompressed.
+
+        Args:
+            source(str): The file, directory or archive
+
+        Returns:
+            dict: source, type, algorithm, size, files, uncompressed size,
+                ratio and the tar members. Values that are not recorded in
+                the archive are None.
+        """
+        algorithm = None if os.path.isdir(source) else CompressExtensions.detect(source)
+        result = dict(source=source, type='directory' if os.path.isdir(source) else 'file',
+                      algorithm=algorithm, members=None, ratio=None)
+        if algorithm is None:
+            result['size'], result['files'] = walk(source, self._workers)
+            result['uncompressed'] = result['size']
+            return result
+        result['type'] = 'archive'
+        result['size'] = os.path.getsize(source)
+        result['files'] = 1
+        codec = CompressExtensions.codec(algorithm)
+        if codec is None:
+            result['uncompressed'] = result['size']
+            result['members'], _ = tar_members(source)
         else:
-            return Shell.run(f"du -sb {source}").strip().split()[0]
+            result['uncompressed'] = uncompressed_size(source, codec)
+        if result['uncompressed']:
+            result['ratio'] = round(result['size'] / result['uncompressed'], 4)
+        return result
+
+    def info_many(self,
+                  sources: typing.List[str],
+                  jobs: int = None) -> typing.List[dict]:
+        """Returns the sizes of many files, directories or archives
+
+        Args:
+            sources(list): the files, directories or archives
+            jobs(int): the number of sources inspected at the same time,
+                by default one per cpu
+
+        Returns:
+            list: the result of info per source with status and error
+        """
+        jobs = cpu_limit() if jobs is None else jobs
+        return run_pool(self.info, [dict(source=source) for source in sources], jobs=jobs)
+
+    def verify(self, source: str) -> dict:
+        """Checks an archive by decompressing it into a null sink
+
+        The codec checks its CRCs while the data is decompressed, tar
+        archives are read member by member, which checks the header
+        checksums. If the archive has a sidecar digest, it is computed on
+        the compressed bytes as they are read and compared. Archives with
+        several independent blocks are decompressed on the workers.
+
+        Args:
+            source(str): The archive
+
+        Returns:
+            dict: source, algorithm, digest, size, uncompressed size of a
+                single file and the number of members of a tar archive
+
+        Raises:
+            RuntimeError: if the archive is corrupted or does not match its
+                digest
+        """
+        algorithm = CompressExtensions.detect(source)
+        if algorithm is None:
+            raise RuntimeError(f"{source} is not an archive")
+        codec = CompressExtensions.codec(algorithm)
+        expected = read_digest(source)
+        result = dict(source=source, algorithm=algorithm, digest=None if expected is None else expected[0],
+                      size=os.path.getsize(source), uncompressed=None, members=None)
+        with self._archive_file(source, 'rb') as archive:
+            reader = None
+            if codec in BLOCK_CODECS and self._workers > 1:
+                reader = open_blocks(archive, codec, workers=self._workers)
+            if reader is None and codec is not None:
+                reader = open_codec(archive, codec, 'rb', workers=self._workers, long=self._long)
+            if reader is None:
+                reader = archive
+            with reader:
+                if algorithm.startswith('tar'):
+                    with tarfile.open(fileobj=reader, mode='r|') as tar:
+                        result['members'] = sum(1 for _ in tar)
+                size = 0
+                buffer = memoryview(bytearray(MB))
+                while True:
+                    n = reader.readinto(buffer)
+                    if not n:
+                        break
+                    size += n
+                if not algorithm.startswith('tar'):
+                    result['uncompressed'] = size
+        return result
+
+    def verify_many(self,
+                    sources: typing.List[str],
+                    jobs: int = None) -> typing.List[dict]:
+        """Checks many archives on a pool
+
+        Args:
+            sources(list): the archives
+            jobs(int): the number of archives checked at the same time, by
+                default one per cpu
+
+        Returns:
+            list: the result of verify per archive with status and error
+        """
+        jobs = cpu_limit() if jobs is None else jobs
+        return run_pool(self.verify, [dict(source=source) for source in sources], jobs=jobs)
+
+    def estimate(self,
+                 source: str,
+                 algorithms: typing.List[str] = None,
+                 level: int = 5) -> typing.List[dict]:
+        """Estimates the compressed size and the time before compressing
 
-    def compress(self, source: str, destination: str = None, level: int = 5):
+        Compresses a few evenly spread samples of the file or directory in
+        memory and extrapolates the ratio and time to the full size.
+
+        Args:
+            source(str): The file or directory
+            algorithms(list): The algorithms to estimate, by default all
+                that are available.
+            level(int): The level of compression.
+
+        Returns:
+            list: one dict per algorithm with the keys algorithm, level,
+                size, estimate, ratio, seconds and throughput.
+        """
+        if algorithms is not None:
+            algorithms = [CompressExtensions.codec(algorithm) for algorithm in algorithms]
+        return estimate(source,
+                        algorithms=algorithms,
+                        level=5 if level is None else int(level),
+                        workers=self._workers)
+
+    def compress(self,
+                 source: str,
+                 destination: str = None,
+                 level: int = 5,
+                 store_incompressible: bool = False,
+                 seekable: bool = False,
+                 volume_size: typing.Union[str, int] = None,
+                 per_member: bool = False):
         """
         Public mechanism to compress a directory or single file using the
         instance configured algorithm in set in self.config['algorithm'].
 
+        If store_incompressible is set, the compressibility is estimated
+        first, and a source that would not shrink is written uncompressed
+        into a valid gz or xz container instead of spending CPU on it.
+
+        If seekable is set, a directory is written as independently
+        compressed blocks with a sidecar index DESTINATION.idx, so that
+        single members can be extracted without decompressing the rest.
+
+        If volume_size is set, the archive is written as numbered parts
+        DESTINATION.001, DESTINATION.002, ... of at most volume_size bytes
+        with a sidecar DESTINATION.volumes, see cloudmesh.data.volume.
+        Every part can be decompressed on its own. Both backends write
+        the parts with the block-parallel writer, which supports gz, bz2
+        and xz.
+
+        If per_member is set, every member of a directory is classified by
+        its extension, magic bytes or the entropy of a sample, see
+        cloudmesh.data.classify. Members that are already compressed are
+        stored in the gz or xz container, the others are compressed. The
+        archive is a regular tar.gz or tar.xz that any tool extracts.
+
+        A source of - compresses stdin with compress_stream, a destination
+        of - writes the archive to stdout.
+
+        With a memory limit, the threads and if needed the level are
+        lowered to fit it, see limits.
+
         :param source:
         :type source:
         :param destination:
         :type destination:
         :param level:
         :type level:
+        :param store_incompressible: store inputs that do not compress
+        :type store_incompressible: bool
+        :param seekable: write a block archive with a sidecar index
+        :type seekable: bool
+        :param volume_size: the largest size of a part, e.g. 2G
+        :type volume_size: str
+        :param per_member: store members that are already compressed
+        :type per_member: bool
         :return:
         :rtype:
         """
+        worker, level = self._limited('compress', level)
+        if worker is not self:
+            return worker.compress(source, destination, level=level,
+                                   store_incompressible=store_incompressible,
+                                   seekable=seekable,
+                                   volume_size=volume_size,
+                                   per_member=per_member)
+        if source == STREAM:
+            return self.compress_stream(STREAM, destination or STREAM, level=level)
+        if (seekable or volume_size) and not _is_path(destination):
+            raise RuntimeError("A seekable or split archive needs a path for its sidecar")
+
         # select native method
         if os.path.isdir(source):
             compress_type = "directory"
         else:
             compress_type = "file"
 
-        compress_level = 5 if level is None else level
-        args = dict(source=source,
-                    destination=destination,
-                    level=compress_level,
-                    type_=compress_type)
+        compress_level = 5 if level is None else int(level)
+        codec = CompressExtensions.codec(self._algo)
+        if volume_size and codec not in BLOCK_CODECS:
+            raise RuntimeError(f"Volumes are written for {', '.join(BLOCK_CODECS)}, not {codec}")
+        if per_member and codec not in STORE_CODECS:
+            raise RuntimeError(f"Per-member codecs need {', '.join(STORE_CODECS)} to store members, not {codec}")
+        if seekable and self._dryrun:
+            print(f"write seekable {codec} archive {destination} with index {index_path(destination)}")
+            return
+        if volume_size and self._dryrun:
+            print(f"write {codec} archive {destination} in volumes of {volume_size}")
+            return
+        if per_member and self._dryrun:
+            print(f"write {codec} archive {destination} storing the members that are already compressed")
+            return
+
+        with self._measure("compress", source, destination, level=compress_level):
+            if seekable:
+                write_archive(source, destination, codec=codec, level=compress_level, workers=self._workers)
+                return
+
+            if volume_size or per_member:
+                self._compress_parallel(source, destination, compress_type, codec,
+                                        level=compress_level, volume_size=volume_size,
+                                        per_member=per_member)
+                return
+
+            if store_incompressible and codec in STORE_CODECS and not self._dryrun:
+                ratio = self.estimate(source, algorithms=[codec], level=compress_level)[0]['ratio']
+                if ratio >= INCOMPRESSIBLE:
+                    self._compress_parallel(source, destination, compress_type, codec, store=True)
+                    return
+
+            args = dict(source=source,
+                        destination=destination,
+                        level=compress_level,
+                        type_=compress_type)
+
+            self._compress(**args)
+
+    def compress_stream(self,
+                        reader: typing.Union[str, typing.BinaryIO] = STREAM,
+                        writer: typing.Union[str, typing.BinaryIO] = STREAM,
+                        level: int = 5):
+        """Compresses a stream, e.g. the output of a database dump
+
+        The stream is compressed with the codec of the algorithm, for the
+        tar variants it is expected to be a tar stream such as the output
+        of tar -cf -. It is read and written in pieces, so the memory does
+        not depend on its size and nothing is written to a temporary file.
+
+        Args:
+            reader: the binary file object that is compressed, - is stdin
+            writer: the binary file object or the path of the archive, - is
+                stdout
+            level(int): The level of compression to apply.
+        """
+        worker, level = self._limited('compress', level)
+        if worker is not self:
+            return worker.compress_stream(reader, writer, level=level)
+        with self._measure("compress", reader, writer, level=level):
+            source = sys.stdin.buffer if reader == STREAM else reader
+            self._compress(source=timed(source, 'read', close=False),
+                           destination=writer,
+                           level=5 if level is None else int(level),
+                           type_="stream")
+
+    def compress_incremental(self,
+                             source: str,
+                             destination: str,
+                             base: str = None,
+                             level: int = 5,
+                             digest: bool = False) -> dict:
+        """Writes a full or delta tar archive of a directory with a manifest
+
+        The manifest DESTINATION.manifest records path, type, size, mtime
+        and optionally the sha256 of every path. With a base archive, only
+        the paths that are new or changed compared to its manifest are
+        archived and the deleted paths are recorded as tombstones, so the
+        work is proportional to the churn. uncompress replays a delta on
+        top of its base and the deltas before it.
+
+        Args:
+            source(str): The directory
+            destination(str): The archive, written next to the base
+            base(str): The previous full or delta archive, None writes a
+                full archive.
+            level(int): The level of compression to apply.
+            digest(bool): record sha256 digests, files whose mtime changed
+                but not their content are then not archived again.
+
+        Returns:
+            dict: archive, parent, the number of archived, unchanged and
+                deleted paths.
+        """
+        codec = CompressExtensions.codec(self._algo)
+        if self._dryrun:
+            print(f"write incremental archive {destination} of {source} against {base}")
+            return {}
+        with self._measure("compress", source, destination):
+            manifest = write_incremental(source, destination, codec,
+                                         base=base,
+                                         level=5 if level is None else int(level),
+                                         workers=self._workers,
+                                         long=self._long,
+                                         digest=digest)
+        return dict(archive=destination,
+                    parent=manifest['parent'],
+                    archived=len(manifest['members']),
+                    unchanged=len(manifest['files']) - len(manifest['members']),
+                    deleted=len(manifest['deleted']))
+
+    def _compress_parallel(self,
+                           source: str,
+                           destination: str,
+                           type_: str,
+                           codec: str,
+                           level: typing.Union[str, int] = None,
+                           store: bool = False,
+                           volume_size: typing.Union[str, int] = None,
+                           per_member: bool = False) -> str:
+        """Block-parallel compression on `self._workers` threads
+
+        The input, either the file or the tar stream of the directory, is cut
+        into independent blocks that are compressed concurrently.  The result
+        is a standard multi-member gzip, a concatenation of bz2 streams or an
+        xz file with one block per input block and a proper index.
+
+        Args:
+            source(str): The file or directory to compress, a binary file
+                object for a stream
+            destination(str): the path to write the archive destination to.
+            type_(str): One of "directory", "file" or "stream".
+            codec(str): the stream codec, one of gz, bz2, xz
+            level(int): The level of compression to apply.
+            store(bool): write the data uncompressed into the gz or xz
+                container.
+            volume_size: write the archive as parts of at most this size
+            per_member(bool): store the members that are already compressed
+
+        Returns:
+            str: the path to the compressed file.
+        """
+        mode = 'xb' if type_ == "directory" else 'wb'
+        remainder('read')
+        if volume_size:
+            writer = VolumeWriter(destination, volume_size, codec=codec, level=level,
+                                  workers=self._workers, kind=type_)
+            try:
+                with timed(writer, 'compress') as zf:
+                    self._write_input(source, zf, type_, writer.switch if per_member else None)
+            except BaseException:
+                writer.discard()
+                raise
+            return destination
+        with self._archive_file(destination, mode) as out:
+            writer = BlockWriter(out, codec=codec, level=level, workers=self._workers, store=store)
+            with timed(writer, 'compress') as zf:
+                self._write_input(source, zf, type_, writer.switch if per_member else None)
+        return destination
+
+    @staticmethod
+    def _write_input(source,
+                     writer: typing.BinaryIO,
+                     type_: str,
+                     switch: typing.Callable[[bool], None] = None):
+        """Writes a file, the tar stream of a directory or a stream
+
+        With switch, the files that are already compressed are stored. It
+        is called with True before such a file and with False before the
+        others, files below MEMBER_SIZE stay compressed.
+        """
+        if type_ == "directory":
+            def classify(path, status, data):
+                switch(status.st_size >= MEMBER_SIZE and is_compressed(path, data))
+
+            on_file = None if switch is None else classify
+            with tarfile.open(fileobj=writer, mode='w|') as tf:
+                add_tree(tf, source, on_file=on_file)
+        elif type_ == "file":
+            if switch is not None:
+                switch(is_compressed(source))
+            copy_file(source, writer)
+        elif type_ == "stream":
+            copy_stream(source, writer)
+        else:
+            raise RuntimeError(f"Invalid path type {type_}")
+
+    def _clone(self, algorithm: str, workers: int = None) -> "Data":
+        """Returns an instance of the same class for another algorithm or number of workers"""
+        algorithm = CompressExtensions.normalize(algorithm)
+        workers = self._workers if workers is None else workers
+        if algorithm == self._algo and workers == self._workers:
+            return self
+        return type(self)(algorithm=algorithm,
+                          dryrun=self._dryrun,
+                          force=self._force,
+                          tag=self._tag.strip(),
+                          workers=workers,
+                          long=self._long,
+                          digest=self._digest,
+                          metrics=self._metrics,
+                          profile=self._profile,
+                          memlimit=self._memlimit)
+
+    def compress_many(self,
+                      sources: typing.List[str],
+                      destination: str = None,
+                      level: int = 5,
+                      jobs: int = None,
+                      store_incompressible: bool = False,
+                      seekable: bool = False,
+                      volume_size: typing.Union[str, int] = None,
+                      per_member: bool = False) -> typing.List[dict]:
+        """Compresses many files or directories on a pool
+
+        Every source is compressed into its own archive. Directories are
+        archived with tar even if the instance algorithm is a plain codec.
+        The pool size is derived from the cpus, the cgroup cpu quota and
+        the available memory unless `jobs` is given, a memory limit is
+        shared by all jobs.  A failing item does not stop the others.
+
+        Args:
+            sources(list): the files or directories to compress
+            destination(str): the directory the archives are written to,
+                by default the archive is written next to its source.
+            level(int): The level of compression to apply.
+            jobs(int): the number of concurrent jobs
+            store_incompressible(bool): store inputs that do not compress
+            seekable(bool): write directories as block archives with an index
+            volume_size: write every archive as parts of at most this size
+            per_member(bool): store the members that are already compressed
+
+        Returns:
+            list: a result per source with source, destination, algorithm,
+                status, error, seconds, input and output bytes.
+        """
+        codec = CompressExtensions.codec(self._algo)
+        items = []
+        for source in sources:
+            algorithm = self._algo
+            if os.path.isdir(source) and not algorithm.startswith('tar'):
+                algorithm = f"tar{codec}"
+            extension = CompressExtensions.extension(algorithm)
+            if destination is None:
+                target = os.path.normpath(source) + extension
+            else:
+                target = os.path.join(destination, os.path.basename(os.path.normpath(source)) + extension)
+            items.append(dict(source=source, destination=target, algorithm=algorithm))
+        if destination is not None and not self._dryrun:
+            os.makedirs(destination, exist_ok=True)
+        if jobs is None:
+            limits = self.limits('compress', level)
+            jobs = pool_size(codec, limits['level'], action='compress', threads=limits['threads'],
+                             items=len(items), long=self._long, memlimit=self._memlimit)
+
+        def run(source, destination, algorithm):
+            self._clone(algorithm).compress(source, destination, level=level,
+                                            store_incompressible=store_incompressible,
+                                            seekable=seekable and os.path.isdir(source),
+                                            volume_size=volume_size,
+                                            per_member=per_member)
+            if self._dryrun:
+                return {}
+            return {'input': sum(size for _, size in files(source)),
+                    'output': archive_size(destination)}
+
+        return run_pool(run, items, jobs=jobs)
+
+    def uncompress_many(self,
+                        sources: typing.List[str],
+                        destination: str = None,
+                        jobs: int = None,
+                        force: bool = False) -> typing.List[dict]:
+        """Uncompresses many archives on a pool
+
+        The algorithm of every archive is detected from its extension.
+        Directory archives are expanded into `destination`, single files
+        are written into it without their compression extension.
+
+        Args:
+            sources(list): the archives
+            destination(str): the directory to expand into, by default the
+                directory of each archive.
+            jobs(int): the number of concurrent jobs
+            force(bool): disables FileExistsError if path already exists.
+
+        Returns:
+            list: a result per archive with source, destination, algorithm,
+                status, error, seconds, input and output bytes, the output
+                bytes are only given for single files.
+        """
+        items = []
+        for source in sources:
+            algorithm = CompressExtensions.detect(source) or self._algo
+            directory = destination or os.path.dirname(source) or "."
+            if algorithm.startswith('tar'):
+                target = directory
+            else:
+                target = os.path.join(directory, os.path.basename(CompressExtensions.strip(source)))
+            items.append(dict(source=source, destination=target, algorithm=algorithm))
+        if destination is not None and not self._dryrun:
+            os.makedirs(destination, exist_ok=True)
+        if jobs is None:
+            jobs = pool_size(CompressExtensions.codec(self._algo), 9, action='uncompress',
+                             threads=self.limits('uncompress')['threads'], items=len(items),
+                             long=self._long, memlimit=self._memlimit)
+
+        def run(source, destination, algorithm):
+            if os.path.abspath(source) == os.path.abspath(destination):
+                raise RuntimeError(f"Can not derive the destination of {source}")
+            self._clone(algorithm).uncompress(source, destination, force=force)
+            output = os.path.getsize(destination) if os.path.isfile(destination) else None
+            return {'input': archive_size(source), 'output': output}
+
+        return run_pool(run, items, jobs=jobs)
+
+    def _target(self, source: str) -> str:
+        """The algorithm an archive is transcoded into, a tar archive stays a tar archive"""
+        algorithm = CompressExtensions.detect(source)
+        if algorithm is None:
+            raise RuntimeError(f"Can not detect the algorithm of {source}")
+        codec = CompressExtensions.codec(self._algo)
+        if algorithm.startswith('tar'):
+            return f"tar{codec or ''}"
+        if codec is None:
+            raise RuntimeError(f"{source} is not a tar archive and can not be transcoded into {self._algo}")
+        return codec
+
+    def transcode(self,
+                  source: str,
+                  destination: str = None,
+                  level: int = 5) -> str:
+        """Converts an archive into the algorithm of the instance
+
+        The archive is decompressed and compressed again in one pass. The
+        decompressed stream goes from the decoder to the encoder in memory,
+        only the new archive is written to disk. The python backend
+        encodes gz, bz2 and xz with the block-parallel writer if it has
+        more than one worker, the native backend connects the decompressor
+        and the compressor with a pipe.
+
+        A tar archive stays a tar archive, a tar.gz transcoded by an
+        instance for xz is written as tar.xz. The sidecars of the source,
+        an index or a manifest, describe its blocks and are not carried
+        over. A volume set is read as a whole.
+
+        With a memory limit, the threads and if needed the level of the
+        encoder are lowered to fit it, see limits.
+
+        Args:
+            source(str): The archive, its algorithm is detected from its
+                extension.
+            destination(str): The new archive, by default the source with
+                the extension of the algorithm.
+            level(int): The level of compression to apply.
+
+        Returns:
+            str: the path of the new archive.
+
+        Raises:
+            RuntimeError: if the algorithm of the source can not be detected
+                or the destination is the source.
+        """
+        target = self._target(source)
+        if target != self._algo:
+            return self._clone(target).transcode(source, destination, level=level)
+        worker, level = self._limited('compress', level)
+        if worker is not self:
+            return worker.transcode(source, destination, level=level)
+        algorithm = CompressExtensions.detect(source)
+        if destination is None:
+            destination = CompressExtensions.strip(source) + CompressExtensions.extension(target)
+        if os.path.abspath(destination) in (os.path.abspath(source), os.path.abspath(base(source))):
+            raise RuntimeError(f"Can not transcode {source} into itself")
+        if self._dryrun:
+            print(f"transcode {source} from {algorithm} to {target} into {destination}")
+            return destination
+        with self._measure("transcode", source, destination, level=level):
+            self._transcode(source, destination, algorithm, 5 if level is None else int(level))
+        return destination
+
+    def _transcode(self, source: str, destination: str, algorithm: str, level: int):
+        """Decodes the archive in python and compresses the stream with _compress
+
+        Args:
+            source(str): The archive
+            destination(str): The new archive
+            algorithm(str): The algorithm of the source
+            level(int): The level of compression to apply.
+        """
+        codec = CompressExtensions.codec(algorithm)
+        volumes = read_volumes(source)
+        with contextlib.ExitStack() as stack:
+            if volumes is not None:
+                reader = open_volumes(volumes, workers=self._workers)
+            else:
+                archive = stack.enter_context(self._archive_file(source, 'rb'))
+                reader = None
+                # the blocks of an archive can only be found if it can seek
+                if self._workers > 1 and codec in BLOCK_CODECS and archive.seekable():
+                    reader = open_blocks(archive, codec, workers=self._workers)
+                if reader is None and codec is not None:
+                    reader = open_codec(archive, codec, 'rb', workers=self._workers, long=self._long)
+                elif reader is None:
+                    reader = archive
+            reader = stack.enter_context(timed(reader, 'uncompress'))
+            self._compress(source=reader, destination=destination, type_="stream", level=level)
+
+    def transcode_many(self,
+                       sources: typing.List[str],
+                       destination: str = None,
+                       level: int = 5,
+                       jobs: int = None) -> typing.List[dict]:
+        """Transcodes many archives on a pool
+
+        Every archive is transcoded like by transcode, the pool size is
+        derived like for compress_many. A failing item does not stop the
+        others.
+
+        Args:
+            sources(list): the archives
+            destination(str): the directory the new archives are written
+                to, by default the new archive is written next to its source.
+            level(int): The level of compression to apply.
+            jobs(int): the number of concurrent jobs
+
+        Returns:
+            list: a result per archive with source, destination, algorithm,
+                status, error, seconds, input and output bytes.
+        """
+        items = []
+        for source in sources:
+            try:
+                algorithm = self._target(source)
+            except RuntimeError:
+                # the job of the source reports the error
+                algorithm = self._algo
+            name = CompressExtensions.strip(source) + CompressExtensions.extension(algorithm)
+            target = name if destination is None else os.path.join(destination, os.path.basename(name))
+            items.append(dict(source=source, destination=target, algorithm=algorithm))
+        if destination is not None and not self._dryrun:
+            os.makedirs(destination, exist_ok=True)
+        if jobs is None:
+            limits = self.limits('compress', level)
+            jobs = pool_size(CompressExtensions.codec(self._algo), limits['level'], action='compress',
+                             threads=limits['threads'], items=len(items), long=self._long,
+                             memlimit=self._memlimit)
+
+        def run(source, destination, algorithm):
+            self.transcode(source, destination, level=level)
+            if self._dryrun:
+                return {}
+            return {'input': archive_size(source), 'output': os.path.getsize(destination)}
+
+        return run_pool(run, items, jobs=jobs)
+
+    async def compress_async(self,
+                             source: str,
+                             destination: str = None,
+                             level: int = 5,
+                             store_incompressible: bool = False,
+                             seekable: bool = False,
+                             volume_size: typing.Union[str, int] = None,
+                             per_member: bool = False):
+        """Compresses like compress without blocking the event loop
+
+        The job runs on the default executor of the loop, the codecs
+        release the GIL while they work, so many jobs can run at the same
+        time. Cancelling the awaiting task stops the job at its next write
+        and removes the partial archive.
+
+        Args:
+            source(str): The file or directory
+            destination(str): The archive
+            level(int): The level of compression to apply.
+            store_incompressible(bool): store inputs that do not compress
+            seekable(bool): write a block archive with a sidecar index
+            volume_size: write the archive as parts of at most this size
+            per_member(bool): store the members that are already compressed
+        """
+        return await offload(self.compress, source, destination,
+                             level=level,
+                             store_incompressible=store_incompressible,
+                             seekable=seekable,
+                             volume_size=volume_size,
+                             per_member=per_member,
+                             output=destination)
+
+    async def uncompress_async(self,
+                               source: str,
+                               destination: str = None,
+                               force: bool = False) -> str:
+        """Uncompresses like uncompress without blocking the event loop
+
+        Cancelling the awaiting task stops the job at its next read of the
+        archive and removes the destination if the job created it.
+
+        Args:
+            source(str): The archive
+            destination(str): The path to expand the archive into.
+            force(bool): disables FileExistsError if path already exists.
 
-        self._compress(**args)
+        Returns:
+            str: the path to where the archive was expanded.
+        """
+        return await offload(self.uncompress, source, destination, force=force, output=destination)
 
     def _compress(self, *args, **kwargs):
         """Compress method to be inherited with alternate implementations
@@ -226,7 +1249,17 @@ class Data:
         """General purpose decompression command
 
         Decompresses a compressed tar source using the instance's specified
-        algorithm.
+        algorithm. A delta archive written by compress_incremental is
+        restored together with its base and the deltas before it.
+
+        A source of - reads the archive from stdin, a destination of -
+        writes the uncompressed stream to stdout with uncompress_stream.
+
+        With a memory limit, the threads are lowered to fit it.
+
+        An archive written in volumes is given as the archive, its sidecar
+        or one of its parts. The parts are checked to be complete and
+        their blocks are decompressed on the workers.
 
         Args:
             source(str): The path to the compressed archive file
@@ -238,16 +1271,215 @@ class Data:
             str: the path to where the archive was expanded.
 
         """
-        type_ = "directory" if source.endswith('.tar') else "file"
+        worker, _ = self._limited('uncompress')
+        if worker is not self:
+            return worker.uncompress(source, destination, force=force)
+        volumes = read_volumes(source) if _is_path(source) else None
+        if volumes is not None:
+            return self._uncompress_volumes(source, volumes, destination)
+        if destination == STREAM:
+            return self.uncompress_stream(source, destination)
+        manifest = read_manifest(source) if _is_path(source) else None
+        if manifest is not None and manifest['parent'] is not None:
+            destination = destination or '.'
+            if self._dryrun:
+                print(f"restore {' '.join(archive for archive, _ in chain(source))} into {destination}")
+                return destination
+            with self._measure("uncompress", source, destination):
+                restore(chain(source), destination, self._open_tar)
+            return destination
+
+        if (_is_path(source) and source.endswith('.tar')) or self._algo.startswith('tar'):
+            type_ = "directory"
+        else:
+            type_ = "file"
 
         command = dict(source=source,
                        destination=destination,
                        type_=type_,
                        force=force)
 
-        self._uncompress(**command)
+        with self._measure("uncompress", source, destination):
+            self._uncompress(**command)
+        return destination
+
+    def _uncompress_volumes(self, source: str, volumes: dict, destination: str = None) -> str:
+        """Restores an archive written in volumes
+
+        Args:
+            source(str): the archive, its sidecar or one of its parts
+            volumes(dict): the sidecar as returned by read_volumes
+            destination(str): the directory a directory is expanded into,
+                the file a file is written to, - writes to stdout
+
+        Returns:
+            str: the path to where the archive was expanded.
+        """
+        directory = volumes['type'] == 'directory' and destination != STREAM
+        if destination is None:
+            destination = '.' if directory else CompressExtensions.strip(base(source))
+        if self._dryrun:
+            print(f"restore {len(volumes['parts'])} volumes of {base(source)} into {destination}")
+            return destination
+        with self._measure("uncompress", source, destination):
+            remainder('write')
+            with timed(open_volumes(volumes, workers=self._workers), 'uncompress') as reader:
+                if directory:
+                    with tarfile.open(fileobj=reader, mode='r|') as tf:
+                        extract_tar(tf, destination)
+                else:
+                    with _output_file(destination) as out:
+                        copy_stream(reader, out)
         return destination
 
+    def uncompress_stream(self,
+                          reader: typing.Union[str, typing.BinaryIO] = STREAM,
+                          writer: typing.Union[str, typing.BinaryIO] = STREAM):
+        """Uncompresses an archive into a stream
+
+        The archive is decompressed with the codec of the algorithm, for
+        the tar variants the result is the tar stream, which is not
+        extracted. It is read and written in pieces, so the memory does not
+        depend on its size.
+
+        Args:
+            reader: the binary file object or the path of the archive, - is
+                stdin
+            writer: the binary file object or the path the uncompressed
+                stream is written to, - is stdout
+
+        Returns:
+            the writer
+        """
+        worker, _ = self._limited('uncompress')
+        if worker is not self:
+            return worker.uncompress_stream(reader, writer)
+        with self._measure("uncompress", reader, writer):
+            self._uncompress(source=reader, destination=writer, type_="stream", force=False)
+        return writer
+
+    @contextlib.contextmanager
+    def _archive_file(self, path: str, mode: str = 'rb') -> typing.Iterator[typing.BinaryIO]:
+        """Opens the archive file that is written or read
+
+        When an archive is written with a digest configured, or read while
+        it has a sidecar digest, the file is a DigestFile that hashes the
+        bytes as they pass. The sidecar is written when the archive is
+        complete, a read archive that does not match it raises an error
+        once it has been read. A partial archive is removed if writing
+        fails. In a job run by compress_async or uncompress_async the file
+        raises once the job is cancelled. Its reads and writes are timed
+        as the read or write phase of the metrics.
+
+        A path of - is stdin or stdout and a file object is used as it is,
+        neither is closed and they have no digest.
+
+        Args:
+            path(str): the archive
+            mode(str): 'rb' to read, 'wb' or 'xb' to write
+
+        Returns:
+            file object: the binary file object
+        """
+        reading = mode.startswith('r')
+        if not _is_path(path):
+            if path == STREAM and reading:
+                path = sys.stdin.buffer
+            elif path == STREAM:
+                sys.stdout.flush()
+                path = sys.stdout.buffer
+            yield cancellable(timed(path, 'read' if reading else 'write', close=False))
+            if not reading:
+                path.flush()
+            return
+        expected = read_digest(path) if reading else None
+        if reading:
+            algorithm = None if expected is None else expected[0]
+        else:
+            algorithm = self._digest
+        f = open(path, mode) if algorithm is None else DigestFile(path, mode, algorithm)
+        try:
+            with f:
+                yield cancellable(timed(f, 'read' if reading else 'write', close=False))
+        except BaseException:
+            # a partial archive is removed
+            if not reading and os.path.isfile(path):
+                os.remove(path)
+            raise
+        if algorithm is None:
+            return
+        value = f.hexdigest()
+        if not reading:
+            write_digest(path, algorithm, value)
+        elif value != expected[1]:
+            raise RuntimeError(f"{path} does not match its digest {digest_path(path, algorithm)}")
+
+    @contextlib.contextmanager
+    def _open_tar(self, source: str) -> typing.Iterator[tarfile.TarFile]:
+        """Opens a tar archive of any algorithm as a stream"""
+        codec = CompressExtensions.codec(CompressExtensions.detect(source) or self._algo)
+        if codec is None:
+            f = open(source, 'rb')
+        else:
+            f = open_codec(source, codec, 'rb', workers=self._workers)
+        with f, tarfile.open(fileobj=f, mode='r|') as tar:
+            yield tar
+
+    def list(self, source: str) -> typing.List[dict]:
+        """Lists the members of a tar archive
+
+        The members of a seekable archive are read from its sidecar index,
+        other archives are decompressed to read the member headers.
+
+        Args:
+            source(str): The archive
+
+        Returns:
+            list: a dict per member with name, type and size
+        """
+        index = read_index(source)
+        if index is not None:
+            return [dict(name=member['name'], type=member['type'], size=member['size'])
+                    for member in index['members']]
+        with self._open_tar(source) as tar:
+            return [dict(name=member.name, type=TYPES.get(member.type, 'other'), size=member.size)
+                    for member in tar]
+
+    def extract(self,
+                source: str,
+                members: typing.List[str],
+                destination: str = None) -> typing.List[str]:
+        """Extracts members of a tar archive
+
+        A seekable archive only decompresses the blocks that hold the
+        members, other archives are decompressed up to the last member.
+
+        Args:
+            source(str): The archive
+            members(list): the paths of the members as listed, a directory
+                selects its content
+            destination(str): the directory to extract into, by default the
+                current directory
+
+        Returns:
+            list: the names of the extracted members
+        """
+        destination = destination or '.'
+        if read_index(source) is not None:
+            return extract_members(source, members, destination=destination, workers=self._workers)
+        names = [name.rstrip('/') for name in members]
+        extracted = []
+        with self._open_tar(source) as tar:
+            for member in tar:
+                if any(member.name == name or member.name.startswith(name + '/') for name in names):
+                    extract_member(tar, member, destination)
+                    extracted.append(member.name)
+        missing = [name for name in names
+                   if not any(found == name or found.startswith(name + '/') for found in extracted)]
+        if missing:
+            raise RuntimeError(f"Members not found: {', '.join(missing)}")
+        return extracted
+
     def _uncompress(self, *args, **kwargs):
         """Uncompress method to be inherited with alternate implementations
 
@@ -269,44 +1501,57 @@ class Data:
 
 
 class NativeData(Data):
+    # codec: the stream compressor, found with pipeline.find_tool
+    # tar: whether the source is archived with tar before compression
     cmds: typing.Final = {
         'gz': {
-            'cmds': 'gzip zcat'.split(),
-            'compress': 'gzip -{LEVEL} {SOURCE} -c > {DESTINATION}',
-            'uncompress': 'zcat {SOURCE} > {DESTINATION}',
+            'codec': 'gz',
+            'tar': False,
             'level': 7
         },
         'bz2': {
-            'cmds': 'bzip2 bzcat'.split(),
-            'compress': 'bzip2 -{LEVEL} {SOURCE} -c > {DESTINATION}',
-            'uncompress': 'bzcat {SOURCE} > {DESTINATION}',
+            'codec': 'bz2',
+            'tar': False,
             'level': 5
         },
         'xz': {
-            'cmds': 'xz xzcat'.split(),
-            'compress': 'xz {SOURCE} -c > {DESTINATION}',
-            'uncompress': 'xzcat {SOURCE} > {DESTINATION}',
+            'codec': 'xz',
+            'tar': False,
             'level': 5
         },
         "tar": {
-            'cmds': ('tar',),
-            'compress': 'tar -cf {DESTINATION} {SOURCE}',
-            'uncompress': 'tar -xf {SOURCE} -C {DESTINATION}',
+            'codec': None,
+            'tar': True,
         },
         'targz': {
-            'cmds': ('tar',),
-            'compress': 'tar -zcf {DESTINATION} {SOURCE}',
-            'uncompress': 'tar -zxf {SOURCE} -C {DESTINATION}',
+            'codec': 'gz',
+            'tar': True,
         },
         'tarbz2': {
-            'cmds': ('tar',),
-            'compress': 'tar -jcf {DESTINATION} {SOURCE}',
-            'uncompress': 'tar -jxf {SOURCE} -C {DESTINATION}',
+            'codec': 'bz2',
+            'tar': True,
         },
         'tarxz': {
-            'cmds': ('tar',),
-            'compress': 'tar -Jcf {DESTINATION} {SOURCE}',
-            'uncompress': 'tar -Jxf {SOURCE} -C {DESTINATION}',
+            'codec': 'xz',
+            'tar': True,
+        },
+        'zst': {
+            'codec': 'zst',
+            'tar': False,
+            'level': 3
+        },
+        'lz4': {
+            'codec': 'lz4',
+            'tar': False,
+            'level': 1
+        },
+        'tarzst': {
+            'codec': 'zst',
+            'tar': True,
+        },
+        'tarlz4': {
+            'codec': 'lz4',
+            'tar': True,
         }
     }
 
@@ -319,13 +1564,93 @@ class NativeData(Data):
         that detects if the necessary tools are present on the system path, and
         if they are not, will raise a `RuntimeError`.
 
+        The tools are connected with pipes without a shell.  The parallel
+        compressors pigz, pbzip2, lbzip2 and pixz are preferred over gzip,
+        bzip2 and xz when they are on the path, and all of them are given
+        the number of workers as thread count.
+
         """
-        cli_tools = self.cmds[kwargs['algorithm']]['cmds']
-        for tool in cli_tools:
-            if not shutil.which(tool):
-                raise RuntimeError(f"Missing native command toolchain {tool}")
+        algorithm = CompressExtensions.normalize(kwargs.get('algorithm', 'xz'))
+        reason = self.missing(algorithm)
+        if reason is not None:
+            raise RuntimeError(reason)
+        codec = self.cmds[algorithm]['codec']
+        self._tool = None if codec is None else find_tool(codec)
         super().__init__(*args, **kwargs)
 
+    @classmethod
+    def missing(cls, algorithm: str) -> typing.Optional[str]:
+        """Checks if the tools of an algorithm are installed
+
+        The tools are looked up in the capability registry, so only the
+        first check on a PATH runs them.
+
+        Args:
+            algorithm(str): the algorithm name, e.g. xz or tar.gz
+
+        Returns:
+            str: the reason the algorithm can not be used, None if it can
+        """
+        algorithm = CompressExtensions.normalize(algorithm or 'xz')
+        if algorithm not in cls.cmds:
+            return f"Unsupported algorithm {algorithm}"
+        spec = cls.cmds[algorithm]
+        if spec['tar'] and registry().tool('tar') is None:
+            return "Missing native command toolchain tar"
+        if spec['codec'] is not None and find_tool(spec['codec']) is None:
+            names = " or ".join(tool.name for tool in TOOLS[spec['codec']])
+            return f"Missing native command toolchain {names}"
+        return None
+
+    def _pipeline(self,
+                  action: str,
+                  source: str,
+                  destination: str,
+                  level: typing.Union[str, int] = 5,
+                  stream: bool = False) -> Pipeline:
+        """Creates the pipeline for an action
+
+        Args:
+            action(str): compress or uncompress
+            source: the file or directory to read, the archive may be an
+                open file object
+            destination: the file or directory to write, the archive may
+                be an open file object
+            level(typing.Union[str,int]): the compression level
+            stream(bool): only run the compressor, the source and the
+                destination are streams, e.g. of a tar archive
+
+        Returns:
+            Pipeline: the pipeline, e.g. tar -cf - SOURCE | pigz > DESTINATION
+        """
+        spec = self.cmds[self._algo]
+        tool = None
+        if self._tool is not None:
+            tool = tool_command(self._tool, action,
+                                level=5 if level is None else level,
+                                threads=self._workers,
+                                codec=spec['codec'],
+                                long=self._long,
+                                memlimit=self._memlimit)
+            if action == 'compress' and spec['codec'] == 'zst' and isinstance(source, str) \
+                    and os.path.isfile(source):
+                # zstd reads stdin, with the size its frame records it for info
+                tool.insert(1, f'--stream-size={os.path.getsize(source)}')
+        if not spec['tar'] or stream:
+            # an uncompressed tar stream is copied as it is
+            return Pipeline(tool or ['cat'], stdin=source, stdout=destination)
+        if action == 'compress':
+            if tool is None and isinstance(destination, str):
+                return Pipeline(['tar', '-cf', destination, source])
+            elif tool is None:
+                return Pipeline(['tar', '-cf', '-', source], stdout=destination)
+            return Pipeline(['tar', '-cf', '-', source], tool, stdout=destination)
+        if tool is None and isinstance(source, str):
+            return Pipeline(['tar', '-xf', source, '-C', destination])
+        elif tool is None:
+            return Pipeline(['tar', '-xf', '-', '-C', destination], stdin=source)
+        return Pipeline(tool, ['tar', '-xf', '-', '-C', destination], stdin=source)
+
     def _compress(self,
                   source: str,
                   destination: str,
@@ -338,27 +1663,23 @@ class NativeData(Data):
 
         Args:
             source(str): The directory to scan for files to archive and
-                compress
+                compress, a binary file object for a stream
             destination(str): The path to write the compressed archive to.
-            type_(str): Does nothing in this implementation, but is made
-                available to match inheriting signature.
+            type_(str): "stream" only runs the compressor on the source,
+                otherwise it does nothing in this implementation.
             level(typing.Union[str,int]): Specifies the level of compression
                 to apply (more accurately, it sets the block size used when
                 building the compression dictionary).
 
         Returns:
             str: The path to the archive file.
-        """
-        name = source.replace("/", "-") if destination is None else destination
 
-        command = self.cmds[self._algo]['compress'].format(
-            SOURCE=source,
-            DESTINATION=destination,
-            LEVEL=level
-        )
-        self._start("compress", name, self._tag)
-        self._run(command)
-        self._stop("compress", name, self._tag, )
+        Raises:
+            RuntimeError: if one of the native tools fails.
+        """
+        with self._native_file(destination, 'wb') as out:
+            command = self._pipeline('compress', source, out, level, stream=type_ == "stream")
+            self._run(command, driver=run_pipeline)
         return destination
 
     def _uncompress(self,
@@ -374,8 +1695,9 @@ class NativeData(Data):
         Args:
             source(str): The source to decompress and expand.
             destination(str): The path to expand the archive into.
-            type_(str): Does nothing in this implementation.  Parameter provided
-                to match the calling signature
+            type_(str): "stream" only runs the decompressor and writes its
+                output to the destination, otherwise it does nothing in this
+                implementation.
             force(bool): If True, the uncompress method will override any
                 existing files.  If False, if the destination already exists,
                 it will raise an exception.  NOT IMPLEMENTED.
@@ -384,20 +1706,146 @@ class NativeData(Data):
             str: the path that the archive was expanded into.
 
         Raises:
-
+            RuntimeError: if one of the native tools fails.
         """
-        if not self._algo == 'xz':
+        if type_ == "stream":
+            out = destination
+            if out == STREAM:
+                sys.stdout.flush()
+                out = sys.stdout.buffer
+            with self._native_file(source, 'rb') as f:
+                command = self._pipeline('uncompress', f, out, stream=True)
+                self._run(command, driver=run_pipeline)
+            return destination
+        if self.cmds[self._algo]['tar'] and not self._dryrun:
             os.makedirs(destination, exist_ok=True)
-        command = self.cmds[self._algo]['uncompress'].format(
-            SOURCE=source,
-            DESTINATION=destination
-        )
-        self._run(command)
+        with self._native_file(source, 'rb') as f:
+            command = self._pipeline('uncompress', f, destination)
+            self._run(command, driver=run_pipeline)
+        return destination
+
+    def _transcode(self, source: str, destination: str, algorithm: str, level: int):
+        """Connects the decompressor of the source and the compressor with a pipe
+
+        A volume set and a source whose decompressor is not installed are
+        decoded in python.
+
+        Args:
+            source(str): The archive
+            destination(str): The new archive
+            algorithm(str): The algorithm of the source
+            level(int): The level of compression to apply.
+        """
+        codec = CompressExtensions.codec(algorithm)
+        decoder = None if codec is None else find_tool(codec)
+        if (codec is not None and decoder is None) or read_volumes(source) is not None:
+            return super()._transcode(source, destination, algorithm, level)
+        commands = []
+        if decoder is not None:
+            commands.append(tool_command(decoder, 'uncompress', threads=self._workers, codec=codec,
+                                         long=self._long))
+        if self._tool is not None:
+            commands.append(tool_command(self._tool, 'compress',
+                                         level=level,
+                                         threads=self._workers,
+                                         codec=self.cmds[self._algo]['codec'],
+                                         long=self._long,
+                                         memlimit=self._memlimit))
+        with self._archive_file(source, 'rb') as f, self._archive_file(destination, 'wb') as out:
+            self._run(Pipeline(*(commands or [['cat']]), stdin=f, stdout=out), driver=run_pipeline)
+
+    def _native_file(self, path: str, mode: str) -> typing.ContextManager:
+        """The archive as a path for a dry run, otherwise as open file"""
+        if self._dryrun:
+            return contextlib.nullcontext(path)
+        return self._archive_file(path, mode)
+
+    async def compress_async(self,
+                             source: str,
+                             destination: str = None,
+                             level: int = 5,
+                             store_incompressible: bool = False,
+                             seekable: bool = False,
+                             volume_size: typing.Union[str, int] = None,
+                             per_member: bool = False):
+        """Compresses with asyncio subprocesses
+
+        The tools run as asyncio subprocesses connected with pipes, the
+        event loop only waits for them. Cancelling the awaiting task kills
+        the tools and removes the partial archive. Seekable archives,
+        volumes, per-member codecs and stored incompressible data are
+        written in python on the executor.
+
+        Args:
+            source(str): The file or directory
+            destination(str): The archive
+            level(int): The level of compression to apply.
+            store_incompressible(bool): store inputs that do not compress
+            seekable(bool): write a block archive with a sidecar index
+            volume_size: write the archive as parts of at most this size
+            per_member(bool): store the members that are already compressed
+        """
+        worker, level = self._limited('compress', level)
+        if worker is not self:
+            return await worker.compress_async(source, destination, level=level,
+                                               store_incompressible=store_incompressible,
+                                               seekable=seekable,
+                                               volume_size=volume_size,
+                                               per_member=per_member)
+        if seekable or store_incompressible or volume_size or per_member:
+            return await super().compress_async(source, destination, level=level,
+                                                store_incompressible=store_incompressible,
+                                                seekable=seekable,
+                                                volume_size=volume_size,
+                                                per_member=per_member)
+        with self._measure("compress", source, destination, level=level):
+            with self._native_file(destination, 'wb') as out:
+                command = self._pipeline('compress', source, out, 5 if level is None else level)
+                await self._run_async(command)
+
+    async def uncompress_async(self,
+                               source: str,
+                               destination: str = None,
+                               force: bool = False) -> str:
+        """Uncompresses with asyncio subprocesses
+
+        Cancelling the awaiting task kills the tools and removes the
+        destination if it was created by the job. Delta archives are
+        restored in python on the executor.
+
+        Args:
+            source(str): The archive
+            destination(str): The path to expand the archive into.
+            force(bool): disables FileExistsError if path already exists.
+
+        Returns:
+            str: the path to where the archive was expanded.
+        """
+        worker, _ = self._limited('uncompress')
+        if worker is not self:
+            return await worker.uncompress_async(source, destination, force=force)
+        manifest = read_manifest(source)
+        if manifest is not None and manifest['parent'] is not None:
+            return await super().uncompress_async(source, destination, force=force)
+        existed = os.path.lexists(destination)
+        try:
+            if self.cmds[self._algo]['tar'] and not self._dryrun:
+                os.makedirs(destination, exist_ok=True)
+            with self._measure("uncompress", source, destination):
+                with self._native_file(source, 'rb') as f:
+                    command = self._pipeline('uncompress', f, destination)
+                    await self._run_async(command)
+        except BaseException:
+            if not existed and not self._dryrun:
+                remove(destination)
+            raise
         return destination
 
 
 class PythonData(Data):
 
+    _profiled = True
+
     def __init__(self, *args, **kwargs):
         """Python compression implementation that uses python libraries part of the standard lib.
 
@@ -415,7 +1863,10 @@ class PythonData(Data):
         """Uses python's modules for decompression tools
 
         Uncompresses and expands archive to the specified path using pythons
-        internal module tooling.
+        internal module tooling.  With more than one worker, archives that
+        consist of several independent blocks (xz blocks, gzip members, bz2
+        streams) are decompressed in parallel, all other archives are read
+        sequentially.
 
         Args:
             source(str): The source to decompress and expand.
@@ -423,31 +1874,47 @@ class PythonData(Data):
             force(bool): If True, then if the destination exists the file will
                 be overridden. (NOT IMPLEMENTED).
             type_(str): Specifies the final type of the destination parameter.
-                 One of "directory" or "file".
+                 One of "directory", "file" or "stream". A stream is only
+                 decompressed, also for the tar variants.
 
         Returns:
             str: the path that the archive was expanded into.
         """
-        if type_ == "directory":
-            taropts = self._tarfile_bootstrap(
-
-                extract=True
-            )
-            with tarfile.open(source, **taropts) as tf:
-                tf.extractall(destination)
-        else:
-            if self._algo == "lzma":
-                with lzma.open(f"{source}", "rb") as f:
-                    with open(destination, 'wb') as out:
-                        shutil.copyfileobj(f, out)
-            elif self._algo == 'gz':
-                with gzip.open(f"{source}", "rb") as f:
-                    with open(destination, 'wb') as out:
-                        shutil.copyfileobj(f, out)
-            elif self._algo == 'bz2':
-                with bz2.open(f"{source}", "rb") as f:
-                    with open(destination, 'wb') as out:
-                        shutil.copyfileobj(f, out)
+        codec = CompressExtensions.codec(self._algo)
+        remainder('write')
+        with self._archive_file(source, 'rb') as archive:
+            reader = None
+            # the blocks of an archive can only be found if it can seek
+            if self._workers > 1 and codec is not None and archive.seekable():
+                reader = open_blocks(archive, codec, workers=self._workers)
+            if reader is not None:
+                with timed(reader, 'uncompress') as reader:
+                    if type_ == "directory":
+                        with tarfile.open(fileobj=reader, mode='r|') as tf:
+                            extract_tar(tf, destination)
+                    else:
+                        with _output_file(destination) as out:
+                            copy_stream(reader, out)
+            elif type_ == "directory" and codec is not None:
+                with timed(self._open_codec(archive, codec, 'rb'), 'uncompress') as f:
+                    with tarfile.open(fileobj=f, mode='r|') as tf:
+                        extract_tar(tf, destination)
+            elif type_ == "directory":
+                taropts = self._tarfile_bootstrap(
+
+                    extract=True
+                )
+                if not archive.seekable():
+                    taropts['mode'] = 'r|'
+                with KernelTarFile.open(fileobj=archive, **taropts) as tf:
+                    extract_tar(tf, destination)
+            elif codec is None:
+                with _output_file(destination) as out:
+                    copy_stream(archive, out)
+            else:
+                with timed(self._open_codec(archive, codec, 'rb'), 'uncompress') as f:
+                    with _output_file(destination) as out:
+                        copy_stream(f, out)
         return destination
 
     def _compress(self,
@@ -461,43 +1928,69 @@ class PythonData(Data):
         into an archive.
 
         Args:
-            source(str): The path to scan for files to include in the archive
+            source(str): The path to scan for files to include in the archive,
+                a binary file object for a stream
             destination(str): the path to write the archive destination to.
             type_(str): Specifies the final type of the source parameter.
-                 One of "directory" or "file".
+                 One of "directory", "file" or "stream".
             level(int): The level of compression to apply.  From 0 to 9, where
                 0 is no compression and 9 is extreme compression.
 
         Returns:
             str: the path to the compressed file.
         """
-        name = source.replace("/", "-") if destination is None else destination
-        if type_ == "directory":
+        codec = CompressExtensions.codec(self._algo)
+        remainder('read')
+        if self._workers > 1 and codec in BLOCK_CODECS:
+            self._compress_parallel(source, destination, type_, codec, level)
+        elif type_ == "directory" and codec is not None:
+            with self._archive_file(destination, 'xb') as out:
+                with timed(self._open_codec(out, codec, 'xb', level), 'compress') as zf:
+                    with tarfile.open(fileobj=zf, mode='w|') as tf:
+                        add_tree(tf, source)
+        elif type_ == "directory":
             taropts = self._tarfile_bootstrap(
                 extract=False,
                 level=level
             )
-            self._start("compress", name, self._tag)
-            with tarfile.open(destination, **taropts) as tf:
-                tf.add(source, recursive=True)
-            self._stop("compress", name, self._tag, )
+            with self._archive_file(destination, 'xb') as out, KernelTarFile.open(fileobj=out, **taropts) as tf:
+                add_tree(tf, source)
         elif type_ == "file":
-            self._start("compress", name, self._tag)
-            with open(source, 'rb') as f:
-                if self._algo == "lzma":
-                    with lzma.open(f"{destination}", "wb") as zf:
-                        shutil.copyfileobj(f, zf)
-                elif self._algo == 'gz':
-                    with gzip.open(f"{destination}", "wb") as zf:
-                        shutil.copyfileobj(f, zf)
-                elif self._algo == 'bz2':
-                    with bz2.open(f"{destination}", "wb") as zf:
-                        shutil.copyfileobj(f, zf)
-            self._stop("compress", name, self._tag)
+            with self._archive_file(destination, 'wb') as out:
+                with timed(self._open_codec(out, codec, 'wb', level), 'compress') as zf:
+                    copy_file(source, zf)
+        elif type_ == "stream" and codec is None:
+            with self._archive_file(destination, 'wb') as out:
+                copy_stream(source, out)
+        elif type_ == "stream":
+            with self._archive_file(destination, 'wb') as out:
+                with timed(self._open_codec(out, codec, 'wb', level), 'compress') as zf:
+                    copy_stream(source, zf)
         else:
             raise RuntimeError(f"Invalid path type {type_}")
         return destination
 
+    def _open_codec(self,
+                    path: typing.Union[str, typing.BinaryIO],
+                    codec: str,
+                    mode: str = 'rb',
+                    level: typing.Union[str, int] = None) -> typing.BinaryIO:
+        """Opens a compressed file with the instance configuration
+
+        Args:
+            path: the compressed file or its open file object
+            codec(str): one of gz, bz2, xz, zst, lz4
+            mode(str): 'rb' to read, 'wb' or 'xb' to write
+            level(int): The level of compression to apply.
+
+        Returns:
+            file object: the binary file object
+        """
+        return open_codec(path, codec, mode,
+                          level=level,
+                          workers=self._workers,
+                          long=self._long)
+
     def _tarfile_bootstrap(self,
                            extract: bool = False,
                            level: int = None, ) -> typing.Dict[str, typing.Union[str, int]]:
@@ -538,6 +2031,123 @@ class PythonData(Data):
                 tarops.update(dict(compresslevel=compress))
             elif self._algo == 'tarxz':
                 tarops.update(dict(preset=compress))
-            else:
+            elif self._algo != 'tar':
                 raise RuntimeError(f"Unsupported algorithm {self._algo}")
         return tarops
+
+
+class DedupData(Data):
+
+    _profiled = True
+
+    def __init__(self, *args, store: str = None, **kwargs):
+        """Deduplicating implementation that stores content-defined chunks.
+
+        This is an implementation of `cloudmesh.data.Data` that cuts the
+        files of the source into content-defined chunks and stores every
+        unique chunk once, compressed with the codec of the algorithm, in
+        a chunk store directory. The archive is a small JSON recipe that
+        lists the paths and the digests of their chunks. Chunks that are
+        already in the store are neither compressed nor written again, so
+        near-copies of a directory cost only their differences.
+
+        Args:
+            store(str): the chunk store directory, by default .chunks next
+                to the recipe
+        """
+        super().__init__(*args, **kwargs)
+        self._store: typing.Final = store
+        self.config['store'] = store
+
+    def _codec(self) -> str:
+        return CompressExtensions.codec(self._algo) or 'xz'
+
+    def _compress(self,
+                  source: str,
+                  destination: str,
+                  type_: str,
+                  level: typing.Union[str, int] = None) -> str:
+        """Stores the new chunks of the source and writes its recipe
+
+        Args:
+            source(str): The file or directory
+            destination(str): The recipe, by default SOURCE.dedup
+            type_(str): Does nothing in this implementation, but is made
+                available to match inheriting signature.
+            level(typing.Union[str,int]): The level of compression of the
+                chunks.
+
+        Returns:
+            str: The path to the recipe.
+        """
+        if type_ == "stream":
+            raise RuntimeError("A recipe is written of files and directories, not of a stream")
+        if destination is None:
+            destination = os.path.normpath(source) + RECIPE_EXTENSION
+        store = self._store or os.path.join(os.path.dirname(destination), DEFAULT_STORE)
+        if self._dryrun:
+            print(f"write recipe {destination} of {source} with chunks in {store}")
+            return destination
+        write_recipe(source, destination,
+                     ChunkStore(store, codec=self._codec(), level=5 if level is None else int(level)),
+                     workers=self._workers)
+        return destination
+
+    def _uncompress(self,
+                    source: str,
+                    destination: str = None,
+                    type_: str = None,
+                    force: bool = False) -> str:
+        """Restores a recipe from its chunk store
+
+        Args:
+            source(str): The recipe
+            destination(str): The directory to restore a directory into, or
+                the file to restore a file as. By default the current
+                directory or the recipe without its extension.
+            type_(str): Does nothing in this implementation.
+            force(bool): Does nothing in this implementation.
+
+        Returns:
+            str: the path that the recipe was restored into.
+        """
+        if type_ == "stream" or not _is_path(source):
+            raise RuntimeError("A recipe is restored into files and directories, not into a stream")
+        recipe = read_recipe(source)
+        if destination is None:
+            destination = '.' if recipe['type'] == 'directory' else source[:-len(RECIPE_EXTENSION)]
+        if self._dryrun:
+            print(f"restore {source} from {recipe['store']} into {destination}")
+            return destination
+        restore_recipe(recipe, destination, workers=self._workers)
+        return destination
+
+    def info(self, source: str) -> dict:
+        """Returns the sizes of a recipe or of a file, directory or archive
+
+        The size of a recipe is its own size plus the compressed size of
+        the chunks it references, chunks shared with other recipes are
+        counted for each of them.
+
+        Args:
+            source(str): The recipe, file, directory or archive
+
+        Returns:
+            dict: the keys of Data.info, for a recipe also the number of
+                chunks and unique chunks.
+        """
+        if not source.endswith(RECIPE_EXTENSION) or not os.path.isfile(source):
+            return super().info(source)
+        recipe = read_recipe(source)
+        sizes = recipe_info(recipe)
+        size = os.path.getsize(source) + sizes['stored']
+        return dict(source=source,
+                    type='recipe',
+                    algorithm=recipe['codec'],
+                    size=size,
+                    files=sizes['files'],
+                    uncompressed=sizes['uncompressed'],
+                    ratio=round(size / sizes['uncompressed'], 4) if sizes['uncompressed'] else None,
+                    members=len(recipe['entries']),
+                    chunks=sizes['chunks'],
+                    unique=sizes['unique'])
@@ -0,0 +1,372 @@
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import random
+import re
+import stat
+import tempfile
+import typing
+
+from cloudmesh.data.block import KB
+from cloudmesh.data.block import MB
+from cloudmesh.data.codec import compress_buffer
+from cloudmesh.data.codec import decompress_buffer
+from cloudmesh.data.extract import inside
+from cloudmesh.data.extract import member_path
+from cloudmesh.data.metrics import count_bytes
+
+"""
+Content-defined chunking and a content addressed chunk store.
+
+Files are cut where the content of the preceding WINDOW bytes hashes to a
+boundary, so an insertion only moves the boundaries next to it and the
+chunks of near-copies are the same. The rolling hash is computed for a
+whole segment at once with a single multiplication of big integers: the
+bytes are mapped by a random permutation and read as one little endian
+integer, multiplying it by a random WINDOW byte constant gives in byte i a
+mix of the bytes i - WINDOW + 1 to i. Two constants give two independent
+lanes, a position is a boundary if the first lane is zero and the second
+lane is below a threshold that sets the average chunk size. All of this
+runs in C, a pure python rolling hash would be ten times slower.
+
+Every unique chunk is stored once, compressed, as STORE/ab/<sha256>.<codec>.
+A recipe lists the paths of an archive with their metadata and the
+digests of their chunks.
+"""
+
+WINDOW = 16
+
+MIN_CHUNK = 16 * KB
+AVERAGE_CHUNK = 64 * KB
+MAX_CHUNK = 256 * KB
+
+# the size of the pieces of a file the boundaries are computed for at once
+SEGMENT = 8 * MB
+
+RECIPE_EXTENSION = '.dedup'
+
+RECIPE_VERSION = 1
+
+# the chunk store used when none is given, next to the recipe
+DEFAULT_STORE = '.chunks'
+
+_random = random.Random(0x636d)
+PERMUTATION = bytes(_random.sample(range(256), 256))
+LANES = (_random.getrandbits(8 * WINDOW) | 1, _random.getrandbits(8 * WINDOW) | 1)
+
+
+def candidates(data: bytes, threshold: int) -> typing.List[int]:
+    """The positions of a buffer that end a chunk
+
+    Args:
+        data(bytes): the buffer
+        threshold(int): the second lane must be below it, 1 to 256
+
+    Returns:
+        list: the positions i, a chunk ends after byte i
+    """
+    n = len(data)
+    value = int.from_bytes(data.translate(PERMUTATION), 'little')
+    first = (value * LANES[0]).to_bytes(n + WINDOW + 1, 'little')
+    second = (value * LANES[1]).to_bytes(n + WINDOW + 1, 'little')
+    return [i for i in (match.start() for match in re.finditer(b'\x00', first[:n]))
+            if second[i] < threshold and i >= WINDOW - 1]
+
+
+def chunks(f: typing.BinaryIO,
+           minimum: int = MIN_CHUNK,
+           average: int = AVERAGE_CHUNK,
+           maximum: int = MAX_CHUNK) -> typing.Iterator[bytes]:
+    """Cuts a file into content-defined chunks
+
+    Args:
+        f: the binary file object
+        minimum(int): the smallest chunk, except for the last one
+        average(int): the average chunk size
+        maximum(int): the largest chunk
+
+    Returns:
+        iterator: the chunks
+    """
+    threshold = min(max(round(65536 / max(average - minimum, 1)), 1), 256)
+    buffer = b''
+    eof = False
+    while not eof or buffer:
+        if not eof and len(buffer) < maximum:
+            data = f.read(SEGMENT)
+            eof = len(data) < SEGMENT
+            buffer += data
+        positions = candidates(buffer, threshold) if buffer else []
+        start = 0
+        for position in positions:
+            end = position + 1
+            if end - start < minimum:
+                continue
+            while end - start > maximum:
+                yield buffer[start:start + maximum]
+                start += maximum
+            if end - start >= minimum:
+                yield buffer[start:end]
+                start = end
+        while len(buffer) - start > maximum:
+            yield buffer[start:start + maximum]
+            start += maximum
+        buffer = buffer[start:]
+        if eof and buffer:
+            yield buffer
+            buffer = b''
+        elif not eof and start == 0 and len(buffer) >= maximum:
+            yield buffer[:maximum]
+            buffer = buffer[maximum:]
+
+
+class ChunkStore:
+
+    def __init__(self, path: str, codec: str = 'xz', level: int = 5):
+        """A directory of compressed chunks addressed by their sha256
+
+        Args:
+            path(str): the directory of the store
+            codec(str): one of gz, bz2, xz, zst, lz4
+            level(int): the compression level
+        """
+        self.path = path
+        self.codec = codec
+        self.level = level
+        self._known = set()
+
+    def location(self, digest: str) -> str:
+        return os.path.join(self.path, digest[:2], f"{digest}.{self.codec}")
+
+    def __contains__(self, digest: str) -> bool:
+        if digest in self._known:
+            return True
+        if os.path.exists(self.location(digest)):
+            self._known.add(digest)
+            return True
+        return False
+
+    def put(self, digest: str, data: bytes) -> int:
+        """Compresses and stores a chunk that is not in the store
+
+        The chunk is written to a temporary file and renamed, so readers and
+        concurrent writers never see a partial chunk.
+
+        Returns:
+            int: the compressed size
+        """
+        path = self.location(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = compress_buffer(data, self.codec, self.level)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.chunk-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(compressed)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self._known.add(digest)
+        return len(compressed)
+
+    def get(self, digest: str) -> bytes:
+        """Reads, decompresses and verifies a chunk"""
+        with open(self.location(digest), 'rb') as f:
+            data = decompress_buffer(f.read(), self.codec)
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise RuntimeError(f"Chunk {digest} in {self.path} is corrupted")
+        return data
+
+    def size(self, digest: str) -> int:
+        return os.path.getsize(self.location(digest))
+
+
+def _entries(source: str) -> typing.Iterator[typing.Tuple[str, str, os.stat_result]]:
+    """The paths of a file or directory in tar order with their tar names"""
+    source = os.path.normpath(source)
+    # a stack, the next path is at its end
+    pending = [source]
+    while pending:
+        path = pending.pop()
+        st = os.lstat(path)
+        yield path, path.replace(os.sep, '/').lstrip('/'), st
+        if stat.S_ISDIR(st.st_mode):
+            with os.scandir(path) as found:
+                names = sorted(entry.path for entry in found)
+            pending.extend(reversed(names))
+
+
+def write_recipe(source: str,
+                 destination: str,
+                 store: ChunkStore,
+                 workers: int = 1) -> dict:
+    """Stores the chunks of a file or directory and writes its recipe
+
+    Args:
+        source(str): the file or directory
+        destination(str): the recipe
+        store(ChunkStore): the chunk store
+        workers(int): the threads compressing new chunks
+
+    Returns:
+        dict: the statistics with the size of the source, the number of
+            chunks, the new chunks and their compressed size
+    """
+    statistics = dict(size=0, chunks=0, new=0, stored=0)
+    entries = []
+    pending = collections.deque()
+    queued = set()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+
+        def drain(limit):
+            while len(pending) > limit:
+                statistics['stored'] += pending.popleft().result()
+
+        for path, name, st in _entries(source):
+            entry = dict(name=name, mode=stat.S_IMODE(st.st_mode), mtime=st.st_mtime)
+            if stat.S_ISDIR(st.st_mode):
+                entry['type'] = 'directory'
+            elif stat.S_ISLNK(st.st_mode):
+                entry['type'] = 'symlink'
+                entry['target'] = os.readlink(path)
+            elif stat.S_ISREG(st.st_mode):
+                entry['type'] = 'file'
+                entry['size'] = st.st_size
+                digests = []
+                with open(path, 'rb') as f:
+                    for chunk in chunks(f):
+                        digest = hashlib.sha256(chunk).hexdigest()
+                        digests.append(digest)
+                        statistics['chunks'] += 1
+                        if digest not in queued and digest not in store:
+                            queued.add(digest)
+                            statistics['new'] += 1
+                            pending.append(executor.submit(store.put, digest, chunk))
+                            drain(2 * max(workers, 1))
+                entry['chunks'] = digests
+                statistics['size'] += st.st_size
+            else:
+                continue
+            entries.append(entry)
+        drain(0)
+    count_bytes('walk', statistics['size'])
+
+    recipe = dict(version=RECIPE_VERSION,
+                  type='directory' if os.path.isdir(source) else 'file',
+                  codec=store.codec,
+                  store=os.path.relpath(store.path, os.path.dirname(os.path.abspath(destination))),
+                  entries=entries)
+    with open(destination, 'x') as f:
+        json.dump(recipe, f)
+    return statistics
+
+
+def read_recipe(path: str) -> dict:
+    """Reads a recipe
+
+    Args:
+        path(str): the recipe
+
+    Returns:
+        dict: the recipe with the absolute path of its store in 'store'
+    """
+    with open(path) as f:
+        recipe = json.load(f)
+    if recipe.get('version') != RECIPE_VERSION:
+        raise RuntimeError(f"{path} is not a recipe of version {RECIPE_VERSION}")
+    recipe['store'] = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(path)), recipe['store']))
+    return recipe
+
+
+def restore_recipe(recipe: dict, destination: str, workers: int = 1) -> str:
+    """Restores the paths of a recipe from its chunk store
+
+    A directory recipe is restored into the directory `destination` with
+    the names of the archive, a file recipe is restored as `destination`.
+    Names are checked like the members of a tar archive: absolute names,
+    .. and parents that resolve outside of the destination through a
+    symbolic link raise. An existing symbolic link is replaced, not
+    followed.
+
+    Args:
+        recipe(dict): the result of read_recipe
+        destination(str): the directory or file
+        workers(int): the threads decompressing chunks
+
+    Returns:
+        str: the destination
+
+    Raises:
+        RuntimeError: if an entry would be written outside of the destination
+    """
+    store = ChunkStore(recipe['store'], codec=recipe['codec'])
+    directories = []
+    if recipe['type'] != 'file':
+        os.makedirs(destination, exist_ok=True)
+    root = os.path.realpath(destination)
+    resolved = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for entry in recipe['entries']:
+            if recipe['type'] == 'file':
+                path = destination
+            else:
+                path = member_path(destination, entry['name'])
+                inside(root, entry['name'], path, resolved)
+                if os.path.islink(path):
+                    os.remove(path)
+                    resolved.clear()
+            if entry['type'] == 'directory':
+                os.makedirs(path, exist_ok=True)
+                directories.append((path, entry))
+                continue
+            parent = os.path.dirname(path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            if entry['type'] == 'symlink':
+                if os.path.lexists(path):
+                    os.remove(path)
+                os.symlink(entry['target'], path)
+                resolved.clear()
+                continue
+            with open(path, 'wb') as f:
+                pending = collections.deque()
+                for digest in entry['chunks']:
+                    pending.append(executor.submit(store.get, digest))
+                    while len(pending) > 2 * max(workers, 1):
+                        f.write(pending.popleft().result())
+                while pending:
+                    f.write(pending.popleft().result())
+            os.chmod(path, entry['mode'])
+            os.utime(path, (entry['mtime'], entry['mtime']))
+    # the directories last, writing their content changes their mtime
+    for path, entry in reversed(directories):
+        os.chmod(path, entry['mode'])
+        os.utime(path, (entry['mtime'], entry['mtime']))
+    return destination
+
+
+def recipe_info(recipe: dict) -> dict:
+    """The sizes of a recipe
+
+    Returns:
+        dict: files, uncompressed size, chunks, unique chunks and their
+            compressed size in the store
+    """
+    store = ChunkStore(recipe['store'], codec=recipe['codec'])
+    unique = set()
+    count = 0
+    uncompressed = 0
+    files = 0
+    for entry in recipe['entries']:
+        if entry['type'] == 'file':
+            files += 1
+            uncompressed += entry['size']
+            count += len(entry['chunks'])
+            unique.update(entry['chunks'])
+    return dict(files=files,
+                uncompressed=uncompressed,
+                chunks=count,
+                unique=len(unique),
+                stored=sum(store.size(digest) for digest in unique))
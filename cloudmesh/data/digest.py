@@ -0,0 +1,188 @@
+import hashlib
+import io
+import os
+import typing
+
+from cloudmesh.data.block import MB
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+"""
+Digests of archives computed on the bytes that are written or read anyway.
+
+DigestFile wraps the raw archive file. Written bytes are hashed as they
+pass, read bytes are hashed as long as they continue the bytes hashed so
+far. Readers that seek, like the parallel block reader that reads the xz
+index first, leave gaps; a small gap is read and hashed when a later read
+starts behind it, and whatever follows the hashed prefix is read and
+hashed when the digest is taken. Only headers, indexes and trailers are read a
+second time.
+
+The digest is stored next to the archive in ARCHIVE.sha256, ARCHIVE.xxh64
+or ARCHIVE.xxh3 in the format of sha256sum and xxhsum, so it can also be
+checked with sha256sum -c.
+"""
+
+DIGESTS = ('sha256', 'xxh64', 'xxh3')
+
+# reads that start at most GAP bytes behind the hashed prefix hash the gap
+# right away, reads further behind, like the trailer read first by scan,
+# are left for the end
+GAP = MB
+
+
+def new_digest(algorithm: str):
+    """Creates a hash object
+
+    Args:
+        algorithm(str): one of sha256, xxh64, xxh3
+
+    Returns:
+        the hash object with update and hexdigest
+    """
+    if algorithm == 'sha256':
+        return hashlib.sha256()
+    if algorithm in ('xxh64', 'xxh3'):
+        if xxhash is None:
+            raise RuntimeError(f"The digest {algorithm} needs the xxhash package")
+        return xxhash.xxh64() if algorithm == 'xxh64' else xxhash.xxh3_64()
+    raise RuntimeError(f"Unsupported digest {algorithm}, use one of {', '.join(DIGESTS)}")
+
+
+def digest_path(archive: str, algorithm: str) -> str:
+    """The path of the sidecar digest of an archive"""
+    return f"{archive}.{algorithm}"
+
+
+def write_digest(archive: str, algorithm: str, value: str) -> str:
+    """Writes the sidecar digest of an archive
+
+    Returns:
+        str: the path of the sidecar
+    """
+    path = digest_path(archive, algorithm)
+    with open(path, 'w') as f:
+        f.write(f"{value}  {os.path.basename(archive)}\n")
+    return path
+
+
+def read_digest(archive: str) -> typing.Optional[typing.Tuple[str, str]]:
+    """Reads the sidecar digest of an archive
+
+    Args:
+        archive(str): the archive
+
+    Returns:
+        tuple: (algorithm, hex digest), None if the archive has no sidecar
+    """
+    for algorithm in DIGESTS:
+        path = digest_path(archive, algorithm)
+        if os.path.isfile(path):
+            with open(path) as f:
+                return algorithm, f.read().split()[0]
+    return None
+
+
+def file_digest(path: str, algorithm: str = 'sha256') -> str:
+    """The digest of a file read in pieces"""
+    digest = new_digest(algorithm)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(MB)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DigestFile(io.RawIOBase):
+
+    def __init__(self, path: str, mode: str = 'rb', algorithm: str = 'sha256'):
+        """Raw file that computes the digest of its bytes while they pass
+
+        The object has no fileno, so pipelines and tools copy the data
+        through it instead of bypassing it.
+
+        Args:
+            path(str): the archive
+            mode(str): 'rb' to read, 'wb' or 'xb' to write
+            algorithm(str): one of sha256, xxh64, xxh3
+        """
+        super().__init__()
+        self.name = path
+        self.mode = mode
+        self.algorithm = algorithm
+        self._file = open(path, mode)
+        self._digest = new_digest(algorithm)
+        self._hashed = 0
+
+    def readable(self):
+        return self.mode.startswith('r')
+
+    def writable(self):
+        return not self.mode.startswith('r')
+
+    def seekable(self):
+        return self.readable()
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if not self.readable():
+            raise io.UnsupportedOperation("seek")
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def _catch_up(self, end: int):
+        """Hashes the bytes from the hashed prefix up to `end`"""
+        position = self._file.tell()
+        self._file.seek(self._hashed)
+        while self._hashed < end:
+            chunk = self._file.read(min(MB, end - self._hashed))
+            if not chunk:
+                break
+            self._digest.update(chunk)
+            self._hashed += len(chunk)
+        self._file.seek(position)
+
+    def readinto(self, b) -> int:
+        start = self._file.tell()
+        if self._hashed < start <= self._hashed + GAP:
+            self._catch_up(start)
+        size = self._file.readinto(b)
+        end = start + size
+        if start <= self._hashed < end:
+            with memoryview(b) as view:
+                self._digest.update(view[self._hashed - start:size])
+            self._hashed = end
+        return size
+
+    def write(self, b) -> int:
+        size = self._file.write(b)
+        with memoryview(b) as view:
+            self._digest.update(view[:size])
+        self._hashed += size
+        return size
+
+    def _finish(self):
+        if self.readable():
+            self._catch_up(os.fstat(self._file.fileno()).st_size)
+
+    def hexdigest(self) -> str:
+        """The digest of the whole file, bytes that were not read are read
+        now. It can be taken after the file was closed."""
+        if not self.closed:
+            self._finish()
+        return self._digest.hexdigest()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._finish()
+            self._file.close()
+        finally:
+            super().close()
@@ -0,0 +1,130 @@
+import bisect
+import os
+import time
+import typing
+
+from cloudmesh.data.block import KB
+from cloudmesh.data.codec import ALL_CODECS
+from cloudmesh.data.codec import available
+from cloudmesh.data.codec import compress_buffer
+
+"""
+Pre-flight compressibility estimate.
+
+A few chunks spread evenly over the file, or over the files of a
+directory tree, are read and compressed in memory. The ratio and the time
+of the sample are extrapolated to the full size. Sampling 16 chunks of
+64 KB takes a fraction of a second even for xz at high levels.
+"""
+
+# an estimated ratio above this is treated as no gain
+INCOMPRESSIBLE = 0.98
+
+
+def files(source: str) -> typing.List[typing.Tuple[str, int]]:
+    """Lists the regular files of a file or directory with their sizes
+
+    Args:
+        source(str): a file or directory
+
+    Returns:
+        list: (path, size) of every regular file, symbolic links are skipped
+    """
+    if not os.path.isdir(source):
+        return [(source, os.path.getsize(source))]
+    found = []
+    for root, _, names in os.walk(source):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                found.append((path, os.path.getsize(path)))
+    return found
+
+
+def sample(source: str,
+           samples: int = 16,
+           size: int = 64 * KB) -> typing.Tuple[int, bytes]:
+    """Reads evenly spread chunks of a file or directory
+
+    The files are treated as one stream in directory order, the chunks are
+    taken at equal distances in that stream.
+
+    Args:
+        source(str): a file or directory
+        samples(int): the number of chunks
+        size(int): the size of a chunk
+
+    Returns:
+        tuple: (total size of the source, the sampled bytes)
+    """
+    entries = files(source)
+    total = sum(length for _, length in entries)
+    if total <= samples * size:
+        positions = [0]
+        size = total
+    else:
+        step = total / samples
+        positions = [int(i * step + (step - size) / 2) for i in range(samples)]
+
+    starts = []
+    offset = 0
+    for _, length in entries:
+        starts.append(offset)
+        offset += length
+
+    chunks = []
+    for position in positions:
+        wanted = size
+        i = max(bisect.bisect_right(starts, position) - 1, 0)
+        while wanted > 0 and i < len(entries):
+            path, length = entries[i]
+            start = max(position - starts[i], 0)
+            if start < length:
+                with open(path, 'rb') as f:
+                    f.seek(start)
+                    chunk = f.read(min(wanted, length - start))
+                chunks.append(chunk)
+                wanted -= len(chunk)
+            i += 1
+    return total, b''.join(chunks)
+
+
+def estimate(source: str,
+             algorithms: typing.List[str] = None,
+             level: typing.Union[str, int] = 5,
+             workers: int = 1,
+             samples: int = 16,
+             size: int = 64 * KB) -> typing.List[dict]:
+    """Estimates size and time of compressing a file or directory
+
+    Args:
+        source(str): a file or directory
+        algorithms(list): the codecs to estimate, by default all available
+        level(int): the compression level
+        workers(int): the number of workers the time is divided by
+        samples(int): the number of chunks
+        size(int): the size of a chunk
+
+    Returns:
+        list: a dict per algorithm with the algorithm, level, size of the
+            source, estimated size, ratio, estimated seconds and MB/s
+    """
+    total, data = sample(source, samples=samples, size=size)
+    algorithms = algorithms or [codec for codec in ALL_CODECS if available(codec)]
+    results = []
+    for codec in algorithms:
+        start = time.perf_counter()
+        compressed = compress_buffer(data, codec, level)
+        elapsed = time.perf_counter() - start
+        ratio = len(compressed) / len(data) if data else 1.0
+        seconds = elapsed * total / len(data) / max(workers, 1) if data else 0.0
+        results.append({
+            'algorithm': codec,
+            'level': level,
+            'size': total,
+            'estimate': int(total * ratio),
+            'ratio': round(ratio, 4),
+            'seconds': round(seconds, 3),
+            'throughput': round(total / seconds / KB ** 2, 1) if seconds else None,
+        })
+    return results
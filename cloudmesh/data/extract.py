@@ -0,0 +1,247 @@
+import collections
+import concurrent.futures
+import copy
+import errno
+import os
+import tarfile
+
+from cloudmesh.data.block import MB
+
+"""
+Extraction of tar streams with a pool of writer threads.
+
+tarfile.extractall creates one file after the other, so archives of many
+small files are bound by the open, write, chmod, utime and close calls of
+every file and not by the decompression. extract_tar reads the stream
+sequentially in the calling thread, but hands every small file with its
+data to a pool of writer threads that create it, allocate and write it
+and set its metadata. The number of bytes read ahead of the writers is
+bounded.
+
+Directories are created in the calling thread before anything is written
+into them and stay writable for their owner; their mode and mtime are set
+at the end, deepest first, since writing their content changes their
+mtime.
+Large files, links and special files are extracted in the calling thread
+by tarfile, after the writes they depend on have finished.
+
+A member is only written if its path stays in the destination: absolute
+names and .. are refused, and so is a parent directory that resolves
+outside of the destination through a symbolic link extracted before it.
+tarfile extracts with its data filter, which also refuses links that
+point outside of the destination. The files and directories written here
+get the same metadata as with that filter: no owner, no setuid, setgid
+and sticky bits, no write permission for group and others, and the
+default mode for directories.
+"""
+
+# the number of writer threads
+WRITERS = 8
+
+# regular files up to this size are read in the calling thread and
+# written by a writer thread
+SMALL_FILE = 1 * MB
+
+# the number of small files handed to a writer at once
+BATCH = 64
+
+# the bytes read ahead of the writers
+READ_AHEAD = 64 * MB
+
+# files of at least this size are allocated before they are written
+FALLOCATE = 256 * 1024
+
+FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_CLOEXEC', 0)
+
+
+def member_path(destination: str, name: str) -> str:
+    """The path of a member, members that would leave the destination raise"""
+    parts = name.split('/')
+    if os.path.isabs(name) or '..' in parts:
+        raise RuntimeError(f"The member {name} is outside of the destination")
+    return os.path.join(destination, *[part for part in parts if part])
+
+
+def inside(root: str, name: str, path: str, resolved: dict = None):
+    """Checks that the parent of a path does not resolve outside of the root
+
+    Args:
+        root(str): the real path of the destination
+        name(str): the name of the member, for the error
+        path(str): the path of the member in the destination
+        resolved(dict): the real paths of the parents checked before, it
+            has to be cleared when a symbolic link is created
+
+    Raises:
+        RuntimeError: if a symbolic link leads the parent outside of the root
+    """
+    parent = os.path.dirname(path)
+    real = None if resolved is None else resolved.get(parent)
+    if real is None:
+        real = os.path.realpath(parent)
+        if resolved is not None:
+            resolved[parent] = real
+    if real != root and not real.startswith(root.rstrip(os.sep) + os.sep):
+        raise RuntimeError(f"The member {name} is outside of the destination")
+
+
+def extract_member(tar: tarfile.TarFile, member: tarfile.TarInfo, destination: str):
+    """Extracts a member with tarfile and its data filter if python has it
+
+    Raises:
+        RuntimeError: if the filter refuses the member, e.g. a link that
+            points outside of the destination
+    """
+    if not hasattr(tarfile, 'data_filter'):
+        inside(os.path.realpath(destination), member.name, member_path(destination, member.name))
+        tar.extract(member, destination)
+        return
+    try:
+        tar.extract(member, destination, filter='data')
+    except tarfile.FilterError as e:
+        raise RuntimeError(f"The member {member.name} can not be extracted safely: {e}") from e
+
+
+def _filtered(member: tarfile.TarInfo) -> tarfile.TarInfo:
+    """A regular file or directory with the metadata the data filter allows"""
+    member = copy.copy(member)
+    member.uid = member.gid = member.uname = member.gname = None
+    if member.isdir():
+        member.mode = None
+    else:
+        member.mode &= 0o755
+        if not member.mode & 0o100:
+            member.mode &= ~0o111
+        member.mode |= 0o600
+    return member
+
+
+def _directory(path: str, created: set, mode: int = 0o777):
+    if path not in created:
+        os.makedirs(path, mode=mode, exist_ok=True)
+        created.add(path)
+
+
+def _write(tar: tarfile.TarFile, member: tarfile.TarInfo, path: str, data: bytes):
+    """Creates a file with its data and metadata in a writer thread"""
+    try:
+        fd = os.open(path, FLAGS, 0o600)
+    except OSError as e:
+        # an existing symbolic link is replaced, not followed
+        if e.errno != errno.ELOOP:
+            raise
+        os.remove(path)
+        fd = os.open(path, FLAGS, 0o600)
+    try:
+        if len(data) >= FALLOCATE and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(fd, 0, len(data))
+            except OSError:
+                pass
+        with memoryview(data) as view:
+            written = 0
+            while written < len(view):
+                written += os.write(fd, view[written:])
+        os.chmod(fd, member.mode)
+        os.utime(fd, (member.mtime, member.mtime))
+    finally:
+        os.close(fd)
+
+
+def _write_batch(tar: tarfile.TarFile, batch: list):
+    for member, path, data in batch:
+        _write(tar, member, path, data)
+
+
+def extract_tar(tar: tarfile.TarFile,
+                destination: str = None,
+                writers: int = WRITERS) -> int:
+    """Extracts all members of a tar archive
+
+    Args:
+        tar(tarfile.TarFile): the archive, also a stream opened with 'r|'
+        destination(str): the directory, by default the current directory
+        writers(int): the number of writer threads
+
+    Returns:
+        int: the number of extracted members
+
+    Raises:
+        RuntimeError: if a member would be written outside of the destination
+    """
+    destination = destination or '.'
+    os.makedirs(destination, exist_ok=True)
+    root = os.path.realpath(destination)
+    resolved = {}
+    # directories without a mode get the default one of os.makedirs
+    umask = os.umask(0o022)
+    os.umask(umask)
+    created = {destination}
+    directories = []
+    # the small files are handed to the writers in batches, pending holds
+    # the unfinished batch of every path, queue the batches in order
+    batch = []
+    batched = 0
+    pending = {}
+    queue = collections.deque()
+    queued = 0
+    count = 0
+
+    def submit():
+        nonlocal batch, batched, queued
+        if not batch:
+            return
+        future = executor.submit(_write_batch, tar, batch)
+        for _, path, _ in batch:
+            pending[path] = future
+        queue.append((batch, future, batched))
+        queued += batched
+        batch, batched = [], 0
+        while queued > READ_AHEAD or len(queue) > 4 * max(writers, 1):
+            done, future, size = queue.popleft()
+            future.result()
+            queued -= size
+            for _, path, _ in done:
+                if pending.get(path) is future:
+                    del pending[path]
+
+    def wait(path):
+        if any(name == path for _, name, _ in batch):
+            submit()
+        future = pending.pop(path, None)
+        if future is not None:
+            future.result()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(writers, 1)) as executor:
+        for member in tar:
+            path = member_path(destination, member.name)
+            inside(root, member.name, path, resolved)
+            _directory(os.path.dirname(path), created)
+            if member.isdir():
+                # writable until its own mode is set at the end
+                _directory(path, created, 0o700)
+                directories.append((_filtered(member), path))
+            elif member.isreg() and member.size <= SMALL_FILE and member.sparse is None:
+                if path in pending:
+                    wait(path)
+                batch.append((_filtered(member), path, tar.extractfile(member).read()))
+                batched += member.size
+                if len(batch) >= BATCH or batched >= SMALL_FILE:
+                    submit()
+            else:
+                wait(path)
+                if member.islnk():
+                    wait(member_path(destination, member.linkname))
+                extract_member(tar, member, destination)
+                if member.issym():
+                    resolved.clear()
+            count += 1
+        submit()
+        for _, future, _ in queue:
+            future.result()
+
+    # the directories last and deepest first
+    for member, path in sorted(directories, key=lambda item: item[0].name, reverse=True):
+        tar.utime(member, path)
+        os.chmod(path, 0o777 & ~umask)
+    return count
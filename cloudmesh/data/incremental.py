@@ -0,0 +1,324 @@
+import concurrent.futures
+import contextlib
+import json
+import os
+import shutil
+import stat
+import tarfile
+import time
+import typing
+
+from cloudmesh.data.block import CODECS as BLOCK_CODECS
+from cloudmesh.data.block import BlockWriter
+from cloudmesh.data.block import resolve_workers
+from cloudmesh.data.codec import open_codec
+from cloudmesh.data.digest import file_digest
+from cloudmesh.data.extract import extract_member
+from cloudmesh.data.extract import inside
+from cloudmesh.data.extract import member_path
+from cloudmesh.data.metrics import count_bytes
+from cloudmesh.data.metrics import phase_of
+
+"""
+Incremental archives driven by a change manifest.
+
+Next to every archive, ARCHIVE.manifest records the state of the source
+directory when the archive was written: for every path its type, size,
+mtime and optionally its sha256. A delta archive only contains the paths
+that are new or changed compared to the manifest of its parent, the paths
+that disappeared are recorded as tombstones in its manifest. The
+manifest of a delta again records the complete state, so the next delta
+only needs the latest manifest.
+
+    {"version": 1, "source": "data", "parent": "data.tar.xz",
+     "created": 1700000000.0,
+     "files": {"data/a": ["file", 12, 1700000000000000000, "9f86..."], ...},
+     "members": ["data/a", ...],
+     "deleted": ["data/b", ...]}
+
+parent is the file name of the parent archive in the same directory, None
+for a full archive. Restoring a delta extracts every path from the newest
+archive of the chain that contains it, so each file is written once.
+"""
+
+MANIFEST_EXTENSION = '.manifest'
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(archive: str) -> str:
+    """The path of the manifest of an archive"""
+    return archive + MANIFEST_EXTENSION
+
+
+def read_manifest(archive: str) -> typing.Optional[dict]:
+    """Reads the manifest of an archive
+
+    Args:
+        archive(str): the archive
+
+    Returns:
+        dict: the manifest, None if the archive has none
+    """
+    path = manifest_path(archive)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise RuntimeError(f"Unsupported manifest version {manifest.get('version')} in {path}")
+    return manifest
+
+
+def scan(source: str) -> typing.Dict[str, typing.Tuple[str, str, int, int]]:
+    """Lists a directory tree with the names tarfile gives its members
+
+    Args:
+        source(str): the directory
+
+    Returns:
+        dict: name -> (path, type, size, mtime in ns), type is one of
+            directory, file, symlink or other
+    """
+    source = os.path.normpath(source)
+    entries = {}
+
+    def add(path, st):
+        if stat.S_ISDIR(st.st_mode):
+            kind = 'directory'
+        elif stat.S_ISREG(st.st_mode):
+            kind = 'file'
+        elif stat.S_ISLNK(st.st_mode):
+            kind = 'symlink'
+        else:
+            kind = 'other'
+        name = path.replace(os.sep, '/').lstrip('/')
+        entries[name] = (path, kind, 0 if kind == 'directory' else st.st_size, st.st_mtime_ns)
+
+    add(source, os.lstat(source))
+    pending = [source]
+    while pending:
+        with os.scandir(pending.pop()) as found:
+            for entry in found:
+                add(entry.path, entry.stat(follow_symlinks=False))
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+    return entries
+
+
+def changes(entries: dict,
+            previous: typing.Optional[dict],
+            digest: bool = False,
+            workers: int = 1) -> typing.Tuple[dict, typing.List[str], typing.List[str]]:
+    """Compares a scanned tree with the files of a manifest
+
+    A file is changed if its type, size or mtime differ. With digest, the
+    sha256 of files whose mtime changed but not their size is compared as
+    well, so files that were only touched are not archived again.
+
+    Args:
+        entries(dict): the result of scan
+        previous(dict): the files of the parent manifest, None for a full
+            archive
+        digest(bool): record and compare sha256 digests
+        workers(int): the threads computing digests
+
+    Returns:
+        tuple: (the files of the new manifest, the names to archive, the
+            names that were deleted)
+    """
+    previous = previous or {}
+    files = {}
+    members = []
+    hashes = {}
+    for name, (path, kind, size, mtime) in entries.items():
+        old = previous.get(name)
+        if old is not None and old[0] == kind and old[1] == size and (kind == 'directory' or old[2] == mtime):
+            files[name] = old
+            continue
+        files[name] = [kind, size, mtime, None]
+        if kind == 'file' and digest:
+            hashes[name] = path
+        if old is None or old[0] != kind or old[1] != size or not digest or kind != 'file':
+            members.append(name)
+        else:
+            # only the mtime changed, the digest decides
+            members.append((name, old[3]))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=resolve_workers(workers)) as executor:
+        digests = dict(zip(hashes, executor.map(lambda path: file_digest(path, 'sha256'), hashes.values())))
+    for name, value in digests.items():
+        files[name][3] = value
+
+    archived = []
+    for member in members:
+        if isinstance(member, tuple):
+            name, old = member
+            if old is not None and old == files[name][3]:
+                continue
+            member = name
+        archived.append(member)
+    deleted = sorted(name for name in previous if name not in entries)
+    return files, sorted(archived), deleted
+
+
+@contextlib.contextmanager
+def open_writer(destination: str,
+                codec: typing.Optional[str],
+                level: int = 5,
+                workers: int = 1,
+                long: int = 0) -> typing.Iterator[typing.BinaryIO]:
+    """Opens an archive for writing a tar stream
+
+    Args:
+        destination(str): the archive, it must not exist
+        codec(str): one of gz, bz2, xz, zst, lz4, None for a plain tar
+        level(int): the compression level
+        workers(int): the threads, gz, bz2 and xz use the block writer
+        long(int): the window log of zstd long distance matching
+    """
+    if codec is None:
+        with open(destination, 'xb') as f:
+            yield f
+    elif workers > 1 and codec in BLOCK_CODECS:
+        with open(destination, 'xb') as f, BlockWriter(f, codec=codec, level=level, workers=workers) as zf:
+            yield zf
+    else:
+        with open_codec(destination, codec, 'xb', level=level, workers=workers, long=long) as zf:
+            yield zf
+
+
+def write_incremental(source: str,
+                      destination: str,
+                      codec: typing.Optional[str],
+                      base: str = None,
+                      level: int = 5,
+                      workers: int = 1,
+                      long: int = 0,
+                      digest: bool = False) -> dict:
+    """Writes a full or delta archive of a directory and its manifest
+
+    Args:
+        source(str): the directory
+        destination(str): the archive
+        codec(str): one of gz, bz2, xz, zst, lz4, None for a plain tar
+        base(str): the parent archive, its manifest is compared with the
+            directory. None writes a full archive.
+        level(int): the compression level
+        workers(int): the threads compressing and computing digests
+        long(int): the window log of zstd long distance matching
+        digest(bool): record sha256 digests and compare them for files
+            whose mtime changed
+
+    Returns:
+        dict: the manifest that was written
+    """
+    if not os.path.isdir(source):
+        raise RuntimeError(f"Incremental archives are written for directories, {source} is not one")
+    previous = None
+    if base is not None:
+        previous = read_manifest(base)
+        if previous is None:
+            raise RuntimeError(f"{base} has no manifest {manifest_path(base)}")
+        if os.path.dirname(os.path.abspath(base)) != os.path.dirname(os.path.abspath(destination)):
+            raise RuntimeError("A delta archive must be written next to its parent")
+    with phase_of('walk'):
+        entries = scan(source)
+    count_bytes('walk', sum(size for _, kind, size, _ in entries.values() if kind == 'file'))
+    files, members, deleted = changes(entries, None if previous is None else previous['files'],
+                                      digest=digest, workers=workers)
+    with open_writer(destination, codec, level=level, workers=workers, long=long) as f:
+        with tarfile.open(fileobj=f, mode='w|') as tar:
+            for name in members:
+                tar.add(entries[name][0], arcname=name, recursive=False)
+    manifest = dict(version=MANIFEST_VERSION,
+                    source=os.path.normpath(source).replace(os.sep, '/').lstrip('/'),
+                    parent=None if base is None else os.path.basename(base),
+                    created=time.time(),
+                    files=files,
+                    members=members,
+                    deleted=deleted)
+    with open(manifest_path(destination), 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def chain(archive: str) -> typing.List[typing.Tuple[str, dict]]:
+    """The archives a delta depends on
+
+    Args:
+        archive(str): the newest archive
+
+    Returns:
+        list: (archive, manifest) from the full archive to `archive`
+    """
+    archives = []
+    seen = set()
+    while archive is not None:
+        manifest = read_manifest(archive)
+        if manifest is None:
+            raise RuntimeError(f"{archive} has no manifest {manifest_path(archive)}")
+        if archive in seen:
+            raise RuntimeError(f"The manifests of {archive} form a cycle")
+        seen.add(archive)
+        archives.insert(0, (archive, manifest))
+        parent = manifest['parent']
+        archive = None if parent is None else os.path.join(os.path.dirname(archive), parent)
+    return archives
+
+
+def restore(archives: typing.List[typing.Tuple[str, dict]],
+            destination: str,
+            open_tar: typing.Callable) -> typing.List[str]:
+    """Replays a full archive and its deltas into a directory
+
+    Every path is extracted from the newest archive that contains it.
+    Paths that are deleted in the final state are removed from the
+    destination if they exist there.
+
+    Args:
+        archives(list): the result of chain
+        destination(str): the directory to restore into
+        open_tar: a context manager opening an archive as a tar stream
+
+    Returns:
+        list: the archives that were read
+
+    Raises:
+        RuntimeError: if a deleted path is outside of the destination
+    """
+    final = archives[-1][1]['files']
+    owner = {}
+    for archive, manifest in archives:
+        for name in manifest['members']:
+            owner[name] = archive
+    os.makedirs(destination, exist_ok=True)
+    # all deleted paths are checked before anything is removed
+    root = os.path.realpath(destination)
+    resolved = {}
+    deleted = []
+    for archive, manifest in archives:
+        for name in manifest['deleted']:
+            path = member_path(destination, name)
+            inside(root, name, path, resolved)
+            if os.path.normpath(path) == os.path.normpath(destination):
+                raise RuntimeError(f"The member {name} is outside of the destination")
+            if name not in final:
+                deleted.append(path)
+    for path in deleted:
+        if os.path.lexists(path):
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+    used = []
+    for archive, manifest in archives:
+        wanted = {name for name in manifest['members'] if owner.get(name) == archive and name in final}
+        if not wanted:
+            continue
+        used.append(archive)
+        with open_tar(archive) as tar:
+            for member in tar:
+                if member.name in wanted:
+                    extract_member(tar, member, destination)
+    return used
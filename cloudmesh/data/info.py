@@ -0,0 +1,264 @@
+import concurrent.futures
+import os
+import struct
+import tarfile
+import typing
+
+from cloudmesh.data.block import GZ_MAGIC
+from cloudmesh.data.block import resolve_workers
+from cloudmesh.data.block import scan_gz
+from cloudmesh.data.block import scan_xz
+
+"""
+Sizes of files, directories and archives without external commands.
+
+Directory trees are walked with os.scandir, the directories are scanned in
+parallel on a thread pool. The uncompressed size of an archive is read from
+its metadata without decompressing it: the index of xz, the ISIZE trailer
+of gzip members, the frame content size of zstd and lz4 and the member
+headers of a plain tar. bz2 does not record the size, neither do zstd and
+lz4 frames written from a stream of unknown length, e.g. a tar archive.
+"""
+
+ZSTD_MAGIC = 0xFD2FB528
+LZ4_MAGIC = 0x184D2204
+
+# zstd and lz4 share the range of skippable frames
+SKIPPABLE_MAGIC = 0x184D2A50
+
+
+def _scan_directory(path: str) -> typing.Tuple[int, int, typing.List[str]]:
+    size = 0
+    count = 0
+    directories = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                    else:
+                        size += entry.stat(follow_symlinks=False).st_size
+                        count += 1
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    return size, count, directories
+
+
+def walk(source: str, workers: int = 0) -> typing.Tuple[int, int]:
+    """Adds up the sizes of the files of a directory tree
+
+    Symbolic links are counted with their own size and not followed.
+    Directories that can not be read are skipped.
+
+    Args:
+        source(str): a file or directory
+        workers(int): the threads scanning directories, 0 uses one per cpu
+
+    Returns:
+        tuple: (the size in bytes, the number of files)
+    """
+    if not os.path.isdir(source):
+        return os.lstat(source).st_size, 1
+    workers = resolve_workers(workers)
+    if workers == 1:
+        size = 0
+        count = 0
+        pending = [source]
+        while pending:
+            s, c, directories = _scan_directory(pending.pop())
+            size += s
+            count += c
+            pending.extend(directories)
+        return size, count
+
+    size = 0
+    count = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_scan_directory, source)}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                s, c, directories = future.result()
+                size += s
+                count += c
+                pending.update(executor.submit(_scan_directory, directory) for directory in directories)
+    return size, count
+
+
+def xz_size(fileobj: typing.BinaryIO, size: int) -> typing.Optional[int]:
+    """The uncompressed size recorded in the indexes of an xz file"""
+    segments = scan_xz(fileobj, size)
+    if segments is None:
+        return None
+    return sum(segment.info[2] for segment in segments)
+
+
+def gz_size(fileobj: typing.BinaryIO, size: int) -> typing.Optional[int]:
+    """The uncompressed size recorded in the ISIZE trailer of a gzip file
+
+    The members written by BlockWriter record their length, so the ISIZE of
+    every member is added up. For other files only the last member can be
+    found without inflating, like gzip -l its ISIZE is reported, which is
+    the size modulo 4 GB.
+    """
+    fileobj.seek(0)
+    if size < 18 or fileobj.read(2) != GZ_MAGIC:
+        return None
+    segments = scan_gz(fileobj, size) or [None]
+    total = 0
+    for segment in segments:
+        end = size if segment is None else segment.offset + segment.length
+        fileobj.seek(end - 4)
+        total += struct.unpack('<I', fileobj.read(4))[0]
+    return total
+
+
+def _frames(fileobj: typing.BinaryIO, size: int, frame: typing.Callable) -> typing.Optional[int]:
+    """Adds up the content sizes of the frames of a zstd or lz4 file"""
+    total = 0
+    offset = 0
+    while offset < size:
+        fileobj.seek(offset)
+        header = fileobj.read(8)
+        if len(header) < 8:
+            return None
+        magic, length = struct.unpack('<II', header)
+        if magic & 0xFFFFFFF0 == SKIPPABLE_MAGIC:
+            offset += 8 + length
+            continue
+        content, offset = frame(fileobj, offset, magic)
+        if content is None:
+            return None
+        total += content
+    return total
+
+
+def _zstd_frame(fileobj: typing.BinaryIO, offset: int, magic: int) -> typing.Tuple[typing.Optional[int], int]:
+    if magic != ZSTD_MAGIC:
+        return None, offset
+    fileobj.seek(offset + 4)
+    descriptor = fileobj.read(1)[0]
+    fcs_flag = descriptor >> 6
+    single_segment = (descriptor >> 5) & 1
+    checksum = (descriptor >> 2) & 1
+    dictionary = (0, 1, 2, 4)[descriptor & 3]
+    window = 0 if single_segment else 1
+    fcs = (1 if single_segment else 0, 2, 4, 8)[fcs_flag]
+    fileobj.seek(offset + 5 + window + dictionary)
+    field = fileobj.read(fcs)
+    if fcs == 0:
+        content = None
+    elif fcs == 2:
+        content = struct.unpack('<H', field)[0] + 256
+    else:
+        content = int.from_bytes(field, 'little')
+    position = offset + 5 + window + dictionary + fcs
+    while True:
+        fileobj.seek(position)
+        block = int.from_bytes(fileobj.read(3), 'little')
+        kind = (block >> 1) & 3
+        # an RLE block stores its byte once
+        position += 3 + (1 if kind == 1 else block >> 3)
+        if block & 1:
+            break
+    return content, position + 4 * checksum
+
+
+def _lz4_frame(fileobj: typing.BinaryIO, offset: int, magic: int) -> typing.Tuple[typing.Optional[int], int]:
+    if magic != LZ4_MAGIC:
+        return None, offset
+    fileobj.seek(offset + 4)
+    flags = fileobj.read(1)[0]
+    block_checksum = (flags >> 4) & 1
+    content_size = (flags >> 3) & 1
+    content_checksum = (flags >> 2) & 1
+    dictionary = flags & 1
+    content = None
+    if content_size:
+        fileobj.seek(offset + 6)
+        content = struct.unpack('<Q', fileobj.read(8))[0]
+    position = offset + 6 + 8 * content_size + 4 * dictionary + 1
+    while True:
+        fileobj.seek(position)
+        block = struct.unpack('<I', fileobj.read(4))[0]
+        position += 4
+        if block == 0:
+            break
+        position += (block & 0x7FFFFFFF) + 4 * block_checksum
+    return content, position + 4 * content_checksum
+
+
+def zst_size(fileobj: typing.BinaryIO, size: int) -> typing.Optional[int]:
+    """The uncompressed size recorded in the frame headers of a zstd file
+
+    The zstd command only records it when the input is a regular file.
+    """
+    return _frames(fileobj, size, _zstd_frame)
+
+
+def lz4_size(fileobj: typing.BinaryIO, size: int) -> typing.Optional[int]:
+    """The uncompressed size recorded in the frame descriptors of an lz4 file"""
+    return _frames(fileobj, size, _lz4_frame)
+
+
+SIZES = {
+    'xz': xz_size,
+    'gz': gz_size,
+    'zst': zst_size,
+    'lz4': lz4_size,
+}
+
+
+def uncompressed_size(path: str, codec: str) -> typing.Optional[int]:
+    """Reads the uncompressed size of a compressed file from its metadata
+
+    Args:
+        path(str): the compressed file
+        codec(str): one of gz, bz2, xz, zst, lz4
+
+    Returns:
+        int: the size in bytes, None if the file does not record it
+    """
+    if codec not in SIZES:
+        return None
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        try:
+            return SIZES[codec](f, size)
+        except (IndexError, ValueError, struct.error):
+            return None
+
+
+def tar_members(path: str) -> typing.Tuple[int, int]:
+    """Reads the member table of a plain tar without reading the content
+
+    Args:
+        path(str): the tar file
+
+    Returns:
+        tuple: (the number of members, the size of their content)
+    """
+    count = 0
+    content = 0
+    with tarfile.open(path, 'r:') as tar:
+        for member in tar:
+            count += 1
+            content += member.size
+    return count, content
+
+
+def human_size(size: typing.Optional[int]) -> str:
+    """Formats a size like du -h, e.g. 4.7G or 70M"""
+    if size is None:
+        return ''
+    value = float(size)
+    for unit in ('', 'K', 'M', 'G', 'T', 'P'):
+        if value < 1024 or unit == 'P':
+            break
+        value /= 1024
+    if unit == '':
+        return str(size)
+    return f"{value:.1f}{unit}" if value < 10 else f"{value:.0f}{unit}"
@@ -0,0 +1,377 @@
+import contextlib
+import contextvars
+import io
+import json
+import os
+import sys
+import threading
+import time
+import typing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+"""
+Per operation metrics of Data.
+
+Every compress and uncompress records a Metrics object with the bytes in
+and out, the throughput of the uncompressed side, the CPU time, the peak
+RSS and the split of the wall time across the phases walk, read,
+compress or uncompress and write.
+
+The walk phase is the listing of a directory by the compress itself, it
+counts the bytes of the regular files it found as the bytes in. A native
+tar lists the directory in its own process, so neither is known then.
+
+Phases are timed where the data passes through a file object: the codec
+object is wrapped with timed(f, 'compress') and the archive file with
+timed(f, 'write'). Phases nest and are exclusive, the time a codec spends
+in the write of the archive file counts as write, not as compress. The
+time that is not covered by a timed file object, e.g. tarfile reading the
+source files or native tools doing all of the work in other processes,
+is given to the remainder phase of the operation.
+
+The CPU time is the getrusage time of the process and its waited children
+during the operation, concurrent operations in the same process are
+included. The peak RSS is the peak of the process and of its largest
+child so far.
+"""
+
+# the metrics of the operation running in this context
+CURRENT: contextvars.ContextVar = contextvars.ContextVar('metrics', default=None)
+
+# the number of functions of a profile recorded in the metrics
+PROFILE_ENTRIES = 20
+
+_lock = threading.Lock()
+
+
+def rusage() -> typing.Optional[dict]:
+    """The CPU time of the process and its children and the peak RSS
+
+    Returns:
+        dict: user and sys CPU seconds and the peak rss in bytes, None if
+            the resource module is not available
+    """
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        'user': own.ru_utime + children.ru_utime,
+        'sys': own.ru_stime + children.ru_stime,
+        # ru_maxrss is in KB on linux
+        'rss': max(own.ru_maxrss, children.ru_maxrss) * 1024,
+    }
+
+
+class Phase:
+
+    def __init__(self, metrics: "Metrics", name: str):
+        """Times a phase of an operation, exclusive of the phases nested in it"""
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._metrics._stack().append([time.perf_counter(), 0.0])
+        return self
+
+    def __exit__(self, *exc):
+        stack = self._metrics._stack()
+        start, nested = stack.pop()
+        elapsed = time.perf_counter() - start
+        if stack:
+            stack[-1][1] += elapsed
+        self._metrics.add(self._name, elapsed - nested)
+        return False
+
+
+class Metrics:
+
+    def __init__(self,
+                 operation: str,
+                 backend: str,
+                 algorithm: str,
+                 source: str,
+                 destination: str,
+                 remainder: str = None):
+        """The metrics of one compress or uncompress
+
+        Args:
+            operation(str): compress, uncompress or transcode
+            backend(str): native, python or dedup
+            algorithm(str): the algorithm
+            source(str): the file, directory or archive that is read
+            destination(str): the file, directory or archive that is written
+            remainder(str): the phase that is given the time not covered
+                by other phases, by default the operation
+        """
+        self.operation = operation
+        self.backend = backend
+        self.algorithm = algorithm
+        self.source = source
+        self.destination = destination
+        self.remainder = remainder or operation
+        self.bytes_in = None
+        self.bytes_out = None
+        self.seconds = None
+        self.cpu_user = None
+        self.cpu_system = None
+        self.peak_rss = None
+        self.phases = {}
+        self.status = None
+        self.error = None
+        self.profile = None
+        # the memory limit and the memory the operation planned with
+        self.memlimit = None
+        self.memory = None
+        self.transferred = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._start = None
+        self._usage = None
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def phase(self, name: str) -> Phase:
+        """A context manager that times a phase"""
+        return Phase(self, name)
+
+    def add(self, name: str, seconds: float):
+        """Adds seconds to a phase"""
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name: str, size: int):
+        """Adds bytes that passed through a phase"""
+        with self._lock:
+            self.transferred[name] = self.transferred.get(name, 0) + size
+
+    def start(self):
+        self._usage = rusage()
+        self._start = time.perf_counter()
+
+    def stop(self, error: BaseException = None):
+        """Completes the record after the operation finished or failed"""
+        self.seconds = time.perf_counter() - self._start
+        usage = rusage()
+        if usage is not None:
+            self.cpu_user = usage['user'] - self._usage['user']
+            self.cpu_system = usage['sys'] - self._usage['sys']
+            self.peak_rss = usage['rss']
+        covered = sum(self.phases.values())
+        self.add(self.remainder, max(self.seconds - covered, 0.0))
+        self.status = 'ok' if error is None else 'failed'
+        self.error = None if error is None else str(error) or type(error).__name__
+
+    @property
+    def throughput(self) -> typing.Optional[float]:
+        """MB/s of the uncompressed side"""
+        if self.operation == 'transcode':
+            size = self.transferred.get('uncompress')
+        else:
+            size = self.bytes_in if self.operation == 'compress' else self.bytes_out
+        if size is None or not self.seconds:
+            return None
+        return round(size / self.seconds / 1024 ** 2, 3)
+
+    def to_dict(self) -> dict:
+        """The record as it is emitted"""
+        record = dict(operation=self.operation,
+                      backend=self.backend,
+                      algorithm=self.algorithm,
+                      source=self.source,
+                      destination=self.destination,
+                      status=self.status,
+                      error=self.error,
+                      bytes_in=self.bytes_in,
+                      bytes_out=self.bytes_out,
+                      seconds=None if self.seconds is None else round(self.seconds, 6),
+                      throughput=self.throughput,
+                      cpu_user=self.cpu_user,
+                      cpu_system=self.cpu_system,
+                      peak_rss=self.peak_rss,
+                      phases={name: round(seconds, 6) for name, seconds in self.phases.items()})
+        if self.memlimit is not None:
+            record['memlimit'] = self.memlimit
+            record['memory'] = self.memory
+        if self.profile is not None:
+            record['profile'] = self.profile
+        return record
+
+
+class TimedFile(io.RawIOBase):
+
+    def __init__(self, fileobj: typing.BinaryIO, metrics: Metrics, phase: str, close: bool = True):
+        """File object that times its reads and writes as a phase
+
+        Closing it closes the wrapped file object, the time of the close,
+        e.g. a codec flushing its last block, belongs to the phase too.
+
+        Args:
+            fileobj: the wrapped binary file object
+            metrics(Metrics): the metrics of the operation
+            phase(str): the phase
+            close(bool): close the wrapped file object with this one
+        """
+        super().__init__()
+        self._fileobj = fileobj
+        self._metrics = metrics
+        self._phase = phase
+        self._close = close
+        self.name = getattr(fileobj, 'name', None)
+        self.mode = getattr(fileobj, 'mode', None)
+
+    def readable(self):
+        return self._fileobj.readable()
+
+    def writable(self):
+        return self._fileobj.writable()
+
+    def seekable(self):
+        return self._fileobj.seekable()
+
+    def fileno(self) -> int:
+        return self._fileobj.fileno()
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._fileobj.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._fileobj.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        with self._metrics.phase(self._phase):
+            data = self._fileobj.read(size)
+        self._metrics.count(self._phase, len(data))
+        return data
+
+    def readinto(self, b) -> int:
+        with self._metrics.phase(self._phase):
+            if hasattr(self._fileobj, 'readinto'):
+                size = self._fileobj.readinto(b)
+            else:
+                data = self._fileobj.read(len(b))
+                size = len(data)
+                b[:size] = data
+        self._metrics.count(self._phase, size or 0)
+        return size
+
+    def write(self, b) -> int:
+        with self._metrics.phase(self._phase):
+            size = self._fileobj.write(b)
+        self._metrics.count(self._phase, len(b) if size is None else size)
+        return size
+
+    def flush(self):
+        if not self._fileobj.closed:
+            with self._metrics.phase(self._phase):
+                self._fileobj.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._close:
+                with self._metrics.phase(self._phase):
+                    self._fileobj.close()
+        finally:
+            super().close()
+
+
+def timed(fileobj: typing.BinaryIO, phase: str, close: bool = True) -> typing.BinaryIO:
+    """Wraps a file object if the calling operation records metrics
+
+    Args:
+        fileobj: the binary file object
+        phase(str): the phase its reads and writes belong to
+        close(bool): close the file object with the wrapper
+
+    Returns:
+        file object: the wrapper or the file object itself
+    """
+    metrics = CURRENT.get()
+    return fileobj if metrics is None else TimedFile(fileobj, metrics, phase, close=close)
+
+
+def phase_of(name: str) -> typing.ContextManager:
+    """Times a phase of the calling operation if it records metrics"""
+    metrics = CURRENT.get()
+    return contextlib.nullcontext() if metrics is None else metrics.phase(name)
+
+
+def count_bytes(name: str, size: int):
+    """Adds bytes that passed through a phase of the calling operation"""
+    metrics = CURRENT.get()
+    if metrics is not None:
+        metrics.count(name, size)
+
+
+def remainder(phase: str):
+    """Sets the phase that is given the time not covered by other phases"""
+    metrics = CURRENT.get()
+    if metrics is not None:
+        metrics.remainder = phase
+
+
+@contextlib.contextmanager
+def profiled(metrics: Metrics, entries: int = PROFILE_ENTRIES) -> typing.Iterator[None]:
+    """Profiles the calling thread with cProfile
+
+    The functions with the largest cumulative time are recorded in
+    metrics.profile. If another profiler is active in the process the
+    operation runs without a profile.
+
+    Args:
+        metrics(Metrics): the metrics of the operation
+        entries(int): the number of functions recorded
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        stats = pstats.Stats(profiler).sort_stats('cumulative')
+        metrics.profile = []
+        for function in stats.fcn_list[:entries]:
+            _, calls, tottime, cumtime, _ = stats.stats[function]
+            filename, line, name = function
+            metrics.profile.append(dict(function=f"{os.path.basename(filename)}:{line}({name})",
+                                        calls=calls,
+                                        tottime=round(tottime, 6),
+                                        cumtime=round(cumtime, 6)))
+
+
+def emit(record: dict, sink: typing.Union[str, typing.Callable[[dict], typing.Any]]):
+    """Hands the record of an operation to a sink
+
+    Args:
+        record(dict): the record of Metrics.to_dict
+        sink: a callable that is called with the record, or the path of a
+            file the record is appended to as a JSON line, - writes to
+            stdout
+    """
+    if callable(sink):
+        sink(record)
+        return
+    line = json.dumps(record) + "\n"
+    with _lock:
+        if sink == '-':
+            sys.stdout.write(line)
+            sys.stdout.flush()
+        else:
+            with open(sink, 'a') as f:
+                f.write(line)
@@ -0,0 +1,507 @@
+import collections
+import io
+import os
+import shlex
+import signal
+import subprocess
+import tempfile
+import threading
+import typing
+
+from cloudmesh.data.aio import drain
+from cloudmesh.data.aio import feed
+from cloudmesh.data.capabilities import registry
+
+"""
+Shell free pipelines of native tools.
+
+A pipeline such as
+
+    tar -cf - DIR | pigz -p 8 -5 > DIR.tar.gz
+
+is started as one process per command that are connected with real pipes.
+No shell is involved and the exit code of every command is checked.
+
+The compressors are probed on the PATH in the order of preference given in
+TOOLS, the parallel implementations come first. The results are kept in
+the capability registry, a tool whose help does not list its thread
+option is run without it.
+
+stdin and stdout are paths or file objects. File objects without a file
+descriptor, such as a DigestFile that has to see the data, are copied
+through a pipe by a thread.
+"""
+
+# the size of the pieces copied between file objects and pipes
+PUMP_SIZE = 1024 * 1024
+
+# a native compressor, the argument lists are templates for str.format with
+# LEVEL and THREADS, both read stdin and write stdout
+Tool = collections.namedtuple('Tool', 'name compress uncompress')
+
+TOOLS = {
+    'gz': (
+        Tool('pigz', ['pigz', '-p', '{THREADS}', '-{LEVEL}', '-c'], ['pigz', '-d', '-p', '{THREADS}', '-c']),
+        Tool('gzip', ['gzip', '-{LEVEL}', '-c'], ['gzip', '-d', '-c']),
+    ),
+    'bz2': (
+        Tool('pbzip2', ['pbzip2', '-p{THREADS}', '-{LEVEL}', '-c'], ['pbzip2', '-d', '-p{THREADS}', '-c']),
+        Tool('lbzip2', ['lbzip2', '-n', '{THREADS}', '-{LEVEL}', '-c'], ['lbzip2', '-d', '-n', '{THREADS}', '-c']),
+        Tool('bzip2', ['bzip2', '-{LEVEL}', '-c'], ['bzip2', '-d', '-c']),
+    ),
+    'xz': (
+        Tool('pixz', ['pixz', '-p', '{THREADS}', '-{LEVEL}'], ['pixz', '-d', '-p', '{THREADS}']),
+        Tool('xz', ['xz', '-T{THREADS}', '-{LEVEL}', '-c'], ['xz', '-d', '-T{THREADS}', '-c']),
+    ),
+    'zst': (
+        Tool('zstd', ['zstd', '-q', '-T{THREADS}', '-{LEVEL}', '-c'], ['zstd', '-q', '-d', '-c']),
+    ),
+    'lz4': (
+        Tool('lz4', ['lz4', '-q', '-{LEVEL}', '-c'], ['lz4', '-q', '-d', '-c']),
+    ),
+}
+
+# levels accepted by the tools
+LEVELS = {
+    'gz': (1, 9),
+    'bz2': (1, 9),
+    'xz': (0, 9),
+    'zst': (1, 22),
+    'lz4': (1, 12),
+}
+
+# the window log zstd uses for long distance matching when none is given
+ZSTD_LONG = 27
+
+# the options of the tools that limit their memory, for compress and
+# uncompress, with the limit in bytes as MEMLIMIT
+MEMLIMITS = {
+    'xz': ('--memlimit-compress={MEMLIMIT}', '--memlimit-decompress={MEMLIMIT}'),
+    'zstd': (None, '--memory={MEMLIMIT}'),
+}
+
+
+def pump(source: typing.BinaryIO, destination: typing.BinaryIO, close: bool = False):
+    """Copies a file object into another until the end of the source
+
+    A broken pipe ends the copy quietly, the exit code of the process that
+    closed it tells what went wrong.
+
+    Args:
+        source: the file object to read
+        destination: the file object to write
+        close(bool): closes the destination at the end, which a process
+            reading it sees as end of file
+    """
+    try:
+        while True:
+            chunk = source.read(PUMP_SIZE)
+            if not chunk:
+                break
+            destination.write(chunk)
+    except BrokenPipeError:
+        pass
+    finally:
+        if close:
+            try:
+                destination.close()
+            except BrokenPipeError:
+                pass
+
+
+def _pump_thread(source: typing.BinaryIO, destination: typing.BinaryIO) -> threading.Thread:
+    thread = threading.Thread(target=pump, args=(source, destination, True), daemon=True)
+    thread.start()
+    return thread
+
+
+def has_descriptor(file: typing.BinaryIO) -> bool:
+    """Checks if a file object can be handed to a process directly"""
+    try:
+        file.fileno()
+        return True
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+
+
+def _name(file: typing.Union[str, typing.BinaryIO]) -> str:
+    return file if isinstance(file, str) else getattr(file, 'name', repr(file))
+
+
+def thread_flag(template: typing.List[str]) -> typing.Optional[str]:
+    """The option of an argument template that sets the number of threads"""
+    for i, arg in enumerate(template):
+        if '{THREADS}' in arg:
+            flag = arg.replace('{THREADS}', '')
+            return flag if flag else template[i - 1]
+    return None
+
+
+def _single_threaded(template: typing.List[str]) -> typing.List[str]:
+    """An argument template without the thread option"""
+    flag = thread_flag(template)
+    result = []
+    for arg in template:
+        if '{THREADS}' in arg:
+            if result and result[-1] == flag:
+                result.pop()
+            continue
+        result.append(arg)
+    return result
+
+
+def find_tool(codec: str) -> typing.Optional[Tool]:
+    """Finds the preferred native compressor on the PATH
+
+    Args:
+        codec(str): one of gz, bz2, xz, zst, lz4
+
+    Returns:
+        Tool: the first tool of TOOLS[codec] that is installed, None if
+            none is installed. The thread option is removed if the
+            installed version does not support it.
+    """
+    for tool in TOOLS.get(codec, ()):
+        flag = thread_flag(tool.compress)
+        capability = registry().tool(tool.name, flag)
+        if capability is None:
+            continue
+        if flag and not capability.threads:
+            return Tool(tool.name, _single_threaded(tool.compress), _single_threaded(tool.uncompress))
+        return tool
+    return None
+
+
+def tool_command(tool: Tool,
+                 action: str,
+                 level: int = 5,
+                 threads: int = 1,
+                 codec: str = None,
+                 long: int = 0,
+                 memlimit: int = None) -> typing.List[str]:
+    """Creates the argument list of a compressor
+
+    Args:
+        tool(Tool): the tool as returned by find_tool
+        action(str): compress or uncompress
+        level(int): the compression level, clipped to the range of the codec
+        threads(int): the number of threads the tool may use
+        codec(str): the codec used to clip the level
+        long(int): the window log for zstd long distance matching, 0
+            disables it. Archives written with it need it to uncompress.
+        memlimit(int): the memory the tool may use in bytes, passed to the
+            tools that can limit it
+
+    Returns:
+        list: the argument list
+    """
+    if codec in LEVELS:
+        low, high = LEVELS[codec]
+        level = min(max(int(level), low), high)
+    template = tool.compress if action == 'compress' else tool.uncompress
+    command = [arg.format(LEVEL=level, THREADS=threads) for arg in template]
+    if codec == 'zst':
+        if action == 'compress' and level > 19:
+            command.insert(1, '--ultra')
+        if long:
+            command.append(f'--long={ZSTD_LONG if long is True else long}')
+    option = MEMLIMITS.get(tool.name, (None, None))[0 if action == 'compress' else 1]
+    if memlimit is not None and option is not None:
+        command.insert(1, option.format(MEMLIMIT=memlimit))
+    return command
+
+
+class Pipeline:
+
+    def __init__(self,
+                 *commands: typing.List[str],
+                 stdin: typing.Union[str, typing.BinaryIO] = None,
+                 stdout: typing.Union[str, typing.BinaryIO] = None):
+        """A chain of commands connected with pipes
+
+        Args:
+            *commands: the argument lists of the commands
+            stdin: the file or file object read by the first command, None
+                to inherit
+            stdout: the file or file object written by the last command,
+                None to capture the output
+        """
+        self.commands = [list(command) for command in commands]
+        self.stdin = stdin
+        self.stdout = stdout
+
+    def __str__(self):
+        line = " | ".join(shlex.join(command) for command in self.commands)
+        if self.stdin is not None:
+            line = f"{line} < {shlex.quote(_name(self.stdin))}"
+        if self.stdout is not None:
+            line = f"{line} > {shlex.quote(_name(self.stdout))}"
+        return line
+
+    def __repr__(self):
+        return f"Pipeline({self})"
+
+    def run(self) -> str:
+        """Runs the pipeline and waits for all commands
+
+        Returns:
+            str: the captured output of the last command, "" if the output
+                was written to `stdout`
+
+        Raises:
+            RuntimeError: if a command exits with a non zero code, the
+                partial output file is removed
+        """
+        stdin = open(self.stdin, 'rb') if isinstance(self.stdin, str) else self.stdin
+        stdout = open(self.stdout, 'wb') if isinstance(self.stdout, str) else self.stdout
+        processes = []
+        feeder = None
+        output = b''
+        try:
+            previous = stdin if stdin is None or has_descriptor(stdin) else subprocess.PIPE
+            target = stdout if stdout is not None and has_descriptor(stdout) else subprocess.PIPE
+            for i, command in enumerate(self.commands):
+                last = i == len(self.commands) - 1
+                errors = tempfile.TemporaryFile()
+                process = subprocess.Popen(command,
+                                           stdin=previous,
+                                           stdout=target if last else subprocess.PIPE,
+                                           stderr=errors)
+                if i == 0 and previous is subprocess.PIPE:
+                    feeder = _pump_thread(stdin, process.stdin)
+                if i > 0:
+                    # the child owns the read end now, closing ours lets
+                    # the writer see a broken pipe if the reader dies
+                    previous.close()
+                previous = process.stdout
+                processes.append((command, process, errors))
+            # communicate would close the stdin the feeder writes
+            if stdout is None:
+                output = processes[-1][1].stdout.read()
+            elif target is subprocess.PIPE:
+                pump(processes[-1][1].stdout, stdout)
+            if target is subprocess.PIPE:
+                processes[-1][1].stdout.close()
+            for _, process, _ in processes:
+                process.wait()
+        except BaseException:
+            # the commands that were started do not outlive a failure, a
+            # killed command also ends the feeder with a broken pipe
+            for _, process, _ in processes:
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+                if process.stdout is not None:
+                    process.stdout.close()
+            for _, _, errors in processes:
+                errors.close()
+            if isinstance(self.stdout, str):
+                stdout.close()
+                if os.path.isfile(self.stdout):
+                    os.remove(self.stdout)
+            raise
+        finally:
+            if feeder is not None:
+                feeder.join()
+            if isinstance(self.stdin, str):
+                stdin.close()
+            if isinstance(self.stdout, str):
+                stdout.close()
+
+        self._check(processes)
+        return output.decode(errors='replace')
+
+    async def run_async(self) -> str:
+        """Runs the pipeline with asyncio subprocesses
+
+        The commands are connected with os pipes like in run, file objects
+        without a descriptor are copied by tasks. Cancelling the awaiting
+        task kills the commands and removes the partial output file.
+
+        Returns:
+            str: the captured output of the last command, "" if the output
+                was written to `stdout`
+
+        Raises:
+            RuntimeError: if a command exits with a non zero code, the
+                partial output file is removed
+        """
+        import asyncio
+
+        stdin = open(self.stdin, 'rb') if isinstance(self.stdin, str) else self.stdin
+        stdout = open(self.stdout, 'wb') if isinstance(self.stdout, str) else self.stdout
+        processes = []
+        tasks = []
+        descriptors = []
+        output = b''
+        try:
+            previous = stdin if stdin is None or has_descriptor(stdin) else subprocess.PIPE
+            target = stdout if stdout is not None and has_descriptor(stdout) else subprocess.PIPE
+            for i, command in enumerate(self.commands):
+                last = i == len(self.commands) - 1
+                if last:
+                    read_end, write_end = None, target
+                else:
+                    read_end, write_end = os.pipe()
+                    descriptors.extend([read_end, write_end])
+                errors = tempfile.TemporaryFile()
+                process = await asyncio.create_subprocess_exec(*command,
+                                                               stdin=previous,
+                                                               stdout=write_end,
+                                                               stderr=errors)
+                processes.append((command, process, errors))
+                if i == 0 and previous is subprocess.PIPE:
+                    tasks.append(asyncio.ensure_future(feed(stdin, process.stdin, PUMP_SIZE)))
+                # the children own the pipe ends now
+                for descriptor in (previous, write_end):
+                    if descriptor in descriptors:
+                        os.close(descriptor)
+                        descriptors.remove(descriptor)
+                previous = read_end
+            if stdout is None:
+                output = await processes[-1][1].stdout.read()
+            elif target is subprocess.PIPE:
+                await drain(processes[-1][1].stdout, stdout, PUMP_SIZE)
+            await asyncio.gather(*tasks)
+            for _, process, _ in processes:
+                await process.wait()
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            for _, process, _ in processes:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+            for _, _, errors in processes:
+                errors.close()
+            if isinstance(self.stdout, str):
+                stdout.close()
+                if os.path.isfile(self.stdout):
+                    os.remove(self.stdout)
+            raise
+        finally:
+            for descriptor in descriptors:
+                os.close(descriptor)
+            if isinstance(self.stdin, str):
+                stdin.close()
+            if isinstance(self.stdout, str):
+                stdout.close()
+
+        self._check(processes)
+        return output.decode(errors='replace')
+
+    def _check(self, processes: typing.List[tuple]):
+        """Raises if a command of the pipeline failed
+
+        Args:
+            processes(list): (command, process, errors) of the commands
+
+        Raises:
+            RuntimeError: with the exit codes and messages, the partial
+                output file is removed
+        """
+        failures = []
+        for command, process, errors in processes:
+            errors.seek(0)
+            message = errors.read().decode(errors='replace').strip()
+            errors.close()
+            # a broken pipe is a consequence of a failure further down
+            if process.returncode not in (0, -signal.SIGPIPE):
+                failures.append(f"{command[0]} failed with exit code {process.returncode}: {message}")
+        if not failures and any(process.returncode for _, process, _ in processes):
+            failures.append(f"{self} failed with a broken pipe")
+        if failures:
+            if isinstance(self.stdout, str) and os.path.isfile(self.stdout):
+                os.remove(self.stdout)
+            raise RuntimeError("\n".join(failures))
+
+
+def run_pipeline(pipeline: Pipeline) -> str:
+    """Driver for Data._run that executes a Pipeline"""
+    return pipeline.run()
+
+
+async def run_pipeline_async(pipeline: Pipeline) -> str:
+    """Driver for Data._run_async that executes a Pipeline"""
+    return await pipeline.run_async()
+
+
+class ToolFile(io.RawIOBase):
+
+    def __init__(self,
+                 command: typing.List[str],
+                 path: typing.Union[str, typing.BinaryIO],
+                 mode: str = 'rb'):
+        """File object that streams through a native tool
+
+        In 'rb' mode the tool reads `path` and the object returns the output
+        of the tool. In 'wb' mode the data written to the object is fed to
+        the tool, which writes `path`. Closing the object waits for the tool
+        and checks its exit code.
+
+        Args:
+            command(list): the argument list of the tool, it has to read
+                stdin and write stdout
+            path: the file or file object the tool reads or writes
+            mode(str): 'rb' or 'wb'
+        """
+        super().__init__()
+        self._command = command
+        self._path = path
+        self._mode = mode
+        self._errors = tempfile.TemporaryFile()
+        self._thread = None
+        f = open(path, mode) if isinstance(path, str) else path
+        direct = has_descriptor(f)
+        try:
+            if mode.startswith('r'):
+                self._process = subprocess.Popen(command,
+                                                 stdin=f if direct else subprocess.PIPE,
+                                                 stdout=subprocess.PIPE,
+                                                 stderr=self._errors)
+                if not direct:
+                    self._thread = _pump_thread(f, self._process.stdin)
+                self._stream = self._process.stdout
+            else:
+                self._process = subprocess.Popen(command,
+                                                 stdin=subprocess.PIPE,
+                                                 stdout=f if direct else subprocess.PIPE,
+                                                 stderr=self._errors)
+                if not direct:
+                    self._thread = threading.Thread(target=pump, args=(self._process.stdout, f), daemon=True)
+                    self._thread.start()
+                self._stream = self._process.stdin
+        finally:
+            if isinstance(path, str):
+                f.close()
+
+    def readable(self):
+        return self._mode.startswith('r')
+
+    def writable(self):
+        return not self._mode.startswith('r')
+
+    def readinto(self, b) -> int:
+        return self._stream.readinto(b)
+
+    def write(self, b) -> int:
+        return self._stream.write(b)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._stream.close()
+            code = self._process.wait()
+            if self._thread is not None:
+                self._thread.join()
+            self._errors.seek(0)
+            message = self._errors.read().decode(errors='replace').strip()
+            self._errors.close()
+            # closing a reader early breaks the pipe of the tool
+            if code and not (code == -signal.SIGPIPE and self.readable()):
+                if self.writable() and isinstance(self._path, str) and os.path.isfile(self._path):
+                    os.remove(self._path)
+                raise RuntimeError(f"{self._command[0]} failed with exit code {code}: {message}")
+        finally:
+            super().close()
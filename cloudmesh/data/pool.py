@@ -0,0 +1,251 @@
+import concurrent.futures
+import os
+import time
+import typing
+
+from cloudmesh.data.block import CODECS as BLOCK_CODECS
+from cloudmesh.data.block import KB
+from cloudmesh.data.block import MB
+from cloudmesh.data.block import default_block_size
+from cloudmesh.data.pipeline import LEVELS
+
+"""
+Resource aware worker pool.
+
+The number of concurrent jobs is limited by the cpus this process may use
+(affinity and cgroup cpu quota) divided by the threads of a job, and by
+the available memory (MemAvailable and the cgroup memory limit) divided
+by the memory a job needs for its algorithm and level. xz at high presets
+needs hundreds of MB per job, so memory is often the tighter limit.
+
+A memory limit bounds a job or a pool of jobs further. The level of a
+job is only lowered if a single thread at the requested level does not
+fit, otherwise the threads are reduced, so the format and ratio stay what
+was asked for as long as possible.
+"""
+
+# the share of the available memory the pool plans to use
+MEMORY_FRACTION = 0.8
+
+# memory in MB per thread of xz by preset, from the xz manual
+XZ_COMPRESS_MEMORY = (3, 9, 17, 32, 48, 94, 94, 186, 370, 674)
+XZ_UNCOMPRESS_MEMORY = (1, 2, 3, 5, 5, 9, 9, 17, 33, 65)
+
+
+def _read(path: str) -> typing.Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit() -> int:
+    """The number of cpus this process may use
+
+    Takes the cpu affinity and the cgroup v1 or v2 cpu quota into account.
+
+    Returns:
+        int: the number of cpus, at least 1
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        count = len(os.sched_getaffinity(0))
+    else:
+        count = os.cpu_count() or 1
+    quota = None
+    limit = _read('/sys/fs/cgroup/cpu.max')
+    if limit is not None:
+        value, period = (limit.split() + ['100000'])[:2]
+        if value != 'max':
+            quota = int(value) / int(period)
+    else:
+        value = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        period = _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if value is not None and period is not None and int(value) > 0:
+            quota = int(value) / int(period)
+    if quota is not None:
+        count = min(count, int(quota))
+    return max(count, 1)
+
+
+def memory_available() -> int:
+    """The memory in bytes that can be used without swapping
+
+    Takes MemAvailable and the cgroup v1 or v2 memory limit into account.
+
+    Returns:
+        int: the available memory in bytes
+    """
+    available = None
+    meminfo = _read('/proc/meminfo')
+    if meminfo is not None:
+        for line in meminfo.splitlines():
+            if line.startswith('MemAvailable:'):
+                available = int(line.split()[1]) * KB
+    if available is None:
+        try:
+            available = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        except (ValueError, OSError, AttributeError):
+            available = 1024 * MB
+
+    limit = _read('/sys/fs/cgroup/memory.max')
+    usage = _read('/sys/fs/cgroup/memory.current')
+    if limit is None:
+        limit = _read('/sys/fs/cgroup/memory/memory.limit_in_bytes')
+        usage = _read('/sys/fs/cgroup/memory/memory.usage_in_bytes')
+    if limit is not None and limit.isdigit() and int(limit) < 2 ** 60:
+        available = min(available, int(limit) - int(usage or 0))
+    return max(available, 0)
+
+
+def job_memory(codec: str,
+               level: typing.Union[str, int] = 5,
+               action: str = 'compress',
+               threads: int = 1,
+               long: int = 0) -> int:
+    """Estimates the memory of one job
+
+    Args:
+        codec(str): one of gz, bz2, xz, zst, lz4, None for tar
+        level(int): the compression level
+        action(str): compress or uncompress
+        threads(int): the threads of the job
+        long(int): the window log of zstd long distance matching
+
+    Returns:
+        int: the memory in bytes
+    """
+    level = 5 if level is None else int(level)
+    threads = max(threads, 1)
+    compress = action == 'compress'
+    if codec == 'xz':
+        table = XZ_COMPRESS_MEMORY if compress else XZ_UNCOMPRESS_MEMORY
+        memory = table[min(max(level, 0), 9)] * MB
+    elif codec == 'bz2':
+        level = min(max(level, 1), 9)
+        memory = (400 * KB + 8 * level * 100 * KB) if compress else (100 * KB + 4 * level * 100 * KB)
+    elif codec == 'zst':
+        if compress:
+            memory = 16 * MB if level <= 5 else 48 * MB if level <= 12 else 128 * MB if level <= 19 else 512 * MB
+        else:
+            memory = 8 * MB
+        if long:
+            memory += 2 ** (27 if long is True else long) * (2 if compress else 1)
+    elif codec in ('gz', 'lz4'):
+        memory = 1 * MB
+    else:
+        memory = 1 * MB
+    if threads > 1 and codec in BLOCK_CODECS:
+        # every thread holds a block and its compressed form
+        memory += 2 * default_block_size(codec, level)
+    return memory * threads if compress or threads > 1 else memory
+
+
+def fit(codec: str,
+        level: typing.Union[str, int] = 5,
+        memlimit: int = None,
+        action: str = 'compress',
+        threads: int = 1,
+        long: int = 0) -> typing.Tuple[int, int]:
+    """The level and threads of a job that fit into a memory limit
+
+    The threads are reduced first, the level only if a single thread at
+    the requested level needs more than the limit. The memory of an
+    uncompress is given by the archive, only its threads are reduced.
+
+    Args:
+        codec(str): one of gz, bz2, xz, zst, lz4, None for tar
+        level(int): the requested compression level
+        memlimit(int): the memory limit in bytes, None for no limit
+        action(str): compress or uncompress
+        threads(int): the requested threads
+        long(int): the window log of zstd long distance matching
+
+    Returns:
+        tuple: the level and the threads
+
+    Raises:
+        RuntimeError: if a compress does not fit even at the lowest level
+    """
+    level = 5 if level is None else int(level)
+    threads = max(threads, 1)
+    if memlimit is None:
+        return level, threads
+    if action == 'compress':
+        low = LEVELS.get(codec, (level, level))[0]
+        while level > low and job_memory(codec, level, action, 1, long) > memlimit:
+            level -= 1
+        needed = job_memory(codec, level, action, 1, long)
+        if needed > memlimit:
+            raise RuntimeError(f"{codec} needs {needed} bytes at level {level}, "
+                               f"more than the memory limit of {memlimit} bytes")
+    while threads > 1 and job_memory(codec, level, action, threads, long) > memlimit:
+        threads -= 1
+    return level, threads
+
+
+def pool_size(codec: str,
+              level: typing.Union[str, int] = 5,
+              action: str = 'compress',
+              threads: int = 1,
+              items: int = None,
+              long: int = 0,
+              memlimit: int = None) -> int:
+    """The number of jobs that can run at the same time
+
+    Args:
+        codec(str): the codec of the jobs
+        level(int): the compression level
+        action(str): compress or uncompress
+        threads(int): the threads of each job
+        items(int): the number of items, the pool is not larger
+        long(int): the window log of zstd long distance matching
+        memlimit(int): the memory in bytes all jobs together may use
+
+    Returns:
+        int: the number of jobs, at least 1
+    """
+    jobs = cpu_limit() // max(threads, 1)
+    memory = job_memory(codec, level, action=action, threads=threads, long=long)
+    budget = int(memory_available() * MEMORY_FRACTION)
+    if memlimit is not None:
+        budget = min(budget, memlimit)
+    jobs = min(jobs, budget // memory)
+    if items is not None:
+        jobs = min(jobs, items)
+    return max(jobs, 1)
+
+
+def run_pool(function: typing.Callable[..., dict],
+             items: typing.List[dict],
+             jobs: int = 1) -> typing.List[dict]:
+    """Runs a function for every item on a thread pool
+
+    The jobs of both backends spend their time in native tools or in
+    codecs that release the GIL, so threads are sufficient.
+
+    Args:
+        function: called with the keys of an item as keyword arguments
+        items(list): the items
+        jobs(int): the number of concurrent jobs
+
+    Returns:
+        list: a result per item in the order of the items. It contains the
+            item, status 'ok' or 'failed', the error and the seconds.
+    """
+
+    def run(item):
+        start = time.perf_counter()
+        result = dict(item)
+        try:
+            result.update(function(**item) or {})
+            result['status'] = 'ok'
+            result['error'] = None
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        return result
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        return list(executor.map(run, items))
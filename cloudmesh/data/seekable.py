@@ -0,0 +1,217 @@
+import bisect
+import json
+import os
+import tarfile
+import typing
+
+from cloudmesh.data.block import CODECS
+from cloudmesh.data.block import MB
+from cloudmesh.data.block import BlockReader
+from cloudmesh.data.block import BlockWriter
+from cloudmesh.data.block import Segment
+from cloudmesh.data.block import XZ_CHECK_CRC32
+from cloudmesh.data.extract import extract_member
+from cloudmesh.data.metrics import count_bytes
+
+"""
+Seekable block archives with a sidecar index.
+
+A directory is written as a tar stream cut into independently compressed
+blocks, a valid multi-block xz, multi-member gzip or multi-stream bz2 file.
+Next to it, ARCHIVE.idx records for every block its compressed offset and
+length and its uncompressed size, and for every tar member its name, type,
+size and the offsets of its header and its end in the tar stream. A member
+is extracted by decompressing only the blocks that cover it.
+
+The index is JSON:
+
+    {"version": 1, "codec": "xz", "size": 10240,
+     "blocks": [[offset, length, size, unpadded], ...],
+     "members": [{"name": "a/b", "type": "file", "size": 12,
+                  "start": 0, "end": 1024}, ...]}
+
+unpadded is the unpadded size of an xz block, for gz and bz2 it is the
+length.
+"""
+
+INDEX_EXTENSION = '.idx'
+
+INDEX_VERSION = 1
+
+# small blocks keep the data decompressed for one member low
+SEEKABLE_BLOCK_SIZE = 4 * MB
+
+TYPES = {
+    tarfile.REGTYPE: 'file',
+    tarfile.AREGTYPE: 'file',
+    tarfile.DIRTYPE: 'directory',
+    tarfile.SYMTYPE: 'symlink',
+    tarfile.LNKTYPE: 'hardlink',
+}
+
+
+def index_path(archive: str) -> str:
+    """The path of the sidecar index of an archive"""
+    return archive + INDEX_EXTENSION
+
+
+def write_archive(source: str,
+                  destination: str,
+                  codec: str = 'xz',
+                  level: int = 5,
+                  workers: int = 1,
+                  block_size: int = None) -> str:
+    """Writes a directory as a seekable block archive with a sidecar index
+
+    Args:
+        source(str): the directory
+        destination(str): the archive, the index is written to
+            destination + .idx
+        codec(str): one of gz, bz2, xz
+        level(int): the compression level
+        workers(int): the threads compressing blocks
+        block_size(int): the uncompressed size of a block
+
+    Returns:
+        str: the path of the archive
+    """
+    if codec not in CODECS:
+        raise RuntimeError(f"Seekable archives support {', '.join(CODECS)}, not {codec}")
+    if not os.path.isdir(source):
+        raise RuntimeError(f"Seekable archives are written for directories, {source} is not one")
+    members = []
+    with open(destination, 'xb') as out:
+        writer = BlockWriter(out, codec=codec, level=level, workers=workers,
+                             block_size=block_size or SEEKABLE_BLOCK_SIZE)
+        with writer:
+            with tarfile.open(fileobj=writer, mode='w|') as tar:
+
+                def record(tarinfo):
+                    # called by add right before the header is written
+                    members.append(dict(name=tarinfo.name,
+                                        type=TYPES.get(tarinfo.type, 'other'),
+                                        size=tarinfo.size,
+                                        start=tar.offset))
+                    if tarinfo.isreg():
+                        count_bytes('walk', tarinfo.size)
+                    return tarinfo
+
+                tar.add(source, recursive=True, filter=record)
+                end = tar.offset
+    for member, following in zip(members, members[1:] + [None]):
+        member['end'] = end if following is None else following['start']
+    blocks = [[segment.offset, segment.length, size,
+               segment.length if segment.info is None else segment.info[1]]
+              for segment, size in zip(writer.segments, writer.sizes)]
+    index = dict(version=INDEX_VERSION, codec=codec, size=sum(writer.sizes),
+                 blocks=blocks, members=members)
+    with open(index_path(destination), 'w') as f:
+        json.dump(index, f)
+    return destination
+
+
+def read_index(archive: str) -> typing.Optional[dict]:
+    """Reads the sidecar index of an archive
+
+    Args:
+        archive(str): the archive
+
+    Returns:
+        dict: the index, None if the archive has none
+    """
+    path = index_path(archive)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        index = json.load(f)
+    if index.get('version') != INDEX_VERSION:
+        raise RuntimeError(f"Unsupported index version {index.get('version')} in {path}")
+    return index
+
+
+def select(index: dict, names: typing.List[str]) -> typing.List[dict]:
+    """The members that are named or are inside a named directory
+
+    Args:
+        index(dict): the index
+        names(list): the member paths as stored in the archive
+
+    Returns:
+        list: the members in archive order
+
+    Raises:
+        RuntimeError: if a name matches no member
+    """
+    names = [name.rstrip('/') for name in names]
+    selected = []
+    found = set()
+    for member in index['members']:
+        for name in names:
+            if member['name'] == name or member['name'].startswith(name + '/'):
+                selected.append(member)
+                found.add(name)
+                break
+    missing = [name for name in names if name not in found]
+    if missing:
+        raise RuntimeError(f"Members not found: {', '.join(missing)}")
+    return selected
+
+
+def _segments(index: dict, start: int, end: int) -> typing.Tuple[typing.List[Segment], int]:
+    """The blocks covering a range of the tar stream and the offset of the
+    range in the first of them"""
+    offsets = [0]
+    for block in index['blocks']:
+        offsets.append(offsets[-1] + block[2])
+    first = bisect.bisect_right(offsets, start) - 1
+    last = bisect.bisect_left(offsets, end)
+    flags = bytes([0, XZ_CHECK_CRC32])
+    segments = []
+    for offset, length, size, unpadded in index['blocks'][first:last]:
+        info = (flags, unpadded, size) if index['codec'] == 'xz' else None
+        segments.append(Segment(offset, length, info))
+    return segments, start - offsets[first]
+
+
+def extract_members(archive: str,
+                    names: typing.List[str],
+                    destination: str = '.',
+                    workers: int = 1) -> typing.List[str]:
+    """Extracts members from a seekable block archive
+
+    Only the blocks covering the selected members are read and
+    decompressed, on `workers` threads.
+
+    Args:
+        archive(str): the archive with a sidecar index
+        names(list): the member paths, a directory selects its content
+        destination(str): the directory the members are extracted into
+        workers(int): the threads decompressing blocks
+
+    Returns:
+        list: the names of the extracted members
+    """
+    index = read_index(archive)
+    if index is None:
+        raise RuntimeError(f"{archive} has no index {index_path(archive)}")
+    members = select(index, names)
+    os.makedirs(destination, exist_ok=True)
+    # neighbouring members are read in one run, so a block is decompressed once
+    runs = []
+    for member in members:
+        if runs and runs[-1][-1]['end'] == member['start']:
+            runs[-1].append(member)
+        else:
+            runs.append([member])
+    for run in runs:
+        segments, skip = _segments(index, run[0]['start'], run[-1]['end'])
+        with BlockReader(open(archive, 'rb'), index['codec'], segments, workers=workers) as reader:
+            while skip:
+                data = reader.read(min(skip, MB))
+                if not data:
+                    raise RuntimeError(f"{archive} is shorter than its index")
+                skip -= len(data)
+            with tarfile.open(fileobj=reader, mode='r|') as tar:
+                for _ in run:
+                    extract_member(tar, tar.next(), destination)
+    return [member['name'] for member in members]
@@ -0,0 +1,197 @@
+import copy
+import errno
+import mmap
+import os
+import stat
+import tarfile
+import typing
+
+from cloudmesh.data.block import MB
+
+"""
+Copies between files without allocating a bytes object per chunk.
+
+copy_stream reads into one reused buffer with readinto and writes memoryview
+slices of it. copy_file maps large input files with mmap, so the codec
+reads the page cache directly instead of a copy made by read. Between two
+regular files, copy_range lets the kernel move the data with
+copy_file_range or sendfile without passing it through python at all.
+
+KernelTarFile uses copy_range for the members of an uncompressed tar
+archive, both when they are added and when they are extracted. It falls
+back to the buffered copy of tarfile whenever one of the files has no
+descriptor, e.g. an archive whose digest is computed while it is written.
+"""
+
+# the buffer of copy_stream, large enough that the per call overhead of the
+# codecs does not matter and small enough to stay in the L2 cache
+COPY_BUFFER = 1 * MB
+
+# input files of at least this size are mapped instead of read
+MMAP_THRESHOLD = 64 * MB
+
+# the largest count passed to one copy_file_range or sendfile call
+KERNEL_CHUNK = 1 << 30
+
+
+def descriptor(fileobj: typing.BinaryIO) -> typing.Optional[int]:
+    """The descriptor of a file object that refers to a regular file
+
+    Returns:
+        int: the descriptor, None for pipes, sockets, wrappers without a
+            descriptor and files that are not seekable
+    """
+    try:
+        fd = fileobj.fileno()
+        if not fileobj.seekable():
+            return None
+        return fd if stat.S_ISREG(os.fstat(fd).st_mode) else None
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def copy_stream(source: typing.BinaryIO,
+                destination: typing.BinaryIO,
+                size: int = COPY_BUFFER) -> int:
+    """Copies a file object into another through one reused buffer
+
+    Args:
+        source: the binary file object to read from, objects without
+            readinto are read with read
+        destination: the binary file object to write to
+        size(int): the size of the buffer
+
+    Returns:
+        int: the number of bytes copied
+    """
+    if not hasattr(source, 'readinto'):
+        total = 0
+        while True:
+            chunk = source.read(size)
+            if not chunk:
+                return total
+            write_all(destination, chunk)
+            total += len(chunk)
+    total = 0
+    with memoryview(bytearray(size)) as buffer:
+        while True:
+            n = source.readinto(buffer)
+            if not n:
+                return total
+            with buffer[:n] as chunk:
+                write_all(destination, chunk)
+            total += n
+
+
+def write_all(destination: typing.BinaryIO, data) -> None:
+    """Writes all of a buffer, also to raw files that write only a part"""
+    with memoryview(data) as view:
+        written = destination.write(view)
+        while written is not None and written < view.nbytes:
+            with view[written:] as rest:
+                n = destination.write(rest)
+            written += n or 0
+
+
+def copy_file(path: str,
+              destination: typing.BinaryIO,
+              size: int = COPY_BUFFER,
+              threshold: int = MMAP_THRESHOLD) -> int:
+    """Copies a file into a file object, large files are mapped
+
+    Args:
+        path(str): the file
+        destination: the binary file object to write to, e.g. a codec
+        size(int): the size of the buffer or of the mapped slices
+        threshold(int): files of at least this size are mapped
+
+    Returns:
+        int: the number of bytes copied
+    """
+    with open(path, 'rb') as f:
+        length = os.fstat(f.fileno()).st_size
+        if length < max(threshold, 1):
+            return copy_stream(f, destination, size)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            for start in range(0, len(view), size):
+                with view[start:start + size] as chunk:
+                    write_all(destination, chunk)
+            return len(view)
+
+
+def copy_range(source: int,
+               destination: int,
+               count: int,
+               offset: int = 0) -> int:
+    """Copies bytes between two regular files in the kernel
+
+    The bytes are read from `offset` of the source without moving its
+    position and written at the position of the destination, which is
+    advanced. copy_file_range is tried first, then sendfile.
+
+    Args:
+        source(int): the descriptor to read from
+        destination(int): the descriptor to write to
+        count(int): the number of bytes
+        offset(int): the offset in the source
+
+    Returns:
+        int: the number of bytes copied, less than count at the end of
+            the source
+    """
+    copied = 0
+    use_range = hasattr(os, 'copy_file_range')
+    while copied < count:
+        wanted = min(count - copied, KERNEL_CHUNK)
+        n = None
+        if use_range:
+            try:
+                n = os.copy_file_range(source, destination, wanted, offset + copied)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                    raise
+                use_range = False
+        if n is None:
+            n = os.sendfile(destination, source, offset + copied, wanted)
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+class KernelTarFile(tarfile.TarFile):
+    """TarFile that copies the data of uncompressed archives in the kernel"""
+
+    def addfile(self, tarinfo, fileobj=None):
+        target = descriptor(self.fileobj)
+        source = None if fileobj is None else descriptor(fileobj)
+        if source is None or target is None or not tarinfo.isreg():
+            return super().addfile(tarinfo, fileobj)
+        self._check("awx")
+        tarinfo = copy.copy(tarinfo)
+        buf = tarinfo.tobuf(self.format, self.encoding, self.errors)
+        self.fileobj.write(buf)
+        self.offset += len(buf)
+        # the buffered header is written before the kernel appends the data
+        self.fileobj.flush()
+        position = self.fileobj.tell()
+        os.lseek(target, position, os.SEEK_SET)
+        if copy_range(source, target, tarinfo.size, fileobj.tell()) != tarinfo.size:
+            raise OSError("unexpected end of data")
+        self.fileobj.seek(position + tarinfo.size)
+        blocks, remainder = divmod(tarinfo.size, tarfile.BLOCKSIZE)
+        if remainder > 0:
+            self.fileobj.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+            blocks += 1
+        self.offset += blocks * tarfile.BLOCKSIZE
+        self.members.append(tarinfo)
+
+    def makefile(self, tarinfo, targetpath):
+        source = descriptor(self.fileobj)
+        if source is None or tarinfo.sparse is not None:
+            return super().makefile(tarinfo, targetpath)
+        with open(targetpath, 'wb') as target:
+            if copy_range(source, target.fileno(), tarinfo.size, tarinfo.offset_data) != tarinfo.size:
+                raise tarfile.ReadError("unexpected end of data")
@@ -0,0 +1,334 @@
+import bisect
+import io
+import json
+import os
+import re
+import typing
+
+from cloudmesh.data.aio import cancellable
+from cloudmesh.data.block import CODECS
+from cloudmesh.data.block import KB
+from cloudmesh.data.block import MB
+from cloudmesh.data.block import XZ_CHECK_CRC32
+from cloudmesh.data.block import BlockReader
+from cloudmesh.data.block import BlockWriter
+from cloudmesh.data.block import Segment
+from cloudmesh.data.block import default_block_size
+from cloudmesh.data.block import xz_index
+from cloudmesh.data.block import xz_stream_header
+from cloudmesh.data.metrics import timed
+
+"""
+Archives split into volumes of a maximal size.
+
+The compressed output is written directly as numbered parts ARCHIVE.001,
+ARCHIVE.002, ... instead of splitting the archive afterwards. The input is
+cut into blocks that are compressed in parallel like by the BlockWriter, a
+part is closed when the next block would make it larger than the volume
+size. Every part is a complete file of its own: a multi-member gzip, a
+concatenation of bz2 streams or an xz stream with its own index. A part
+decompresses on its own into its piece of the original, and the parts
+concatenated are a valid archive, so cat ARCHIVE.* | xz -d also works.
+
+Next to the parts, ARCHIVE.volumes records the parts and the blocks they
+hold. It is JSON:
+
+    {"version": 1, "codec": "xz", "type": "directory",
+     "volume_size": 2147483648, "size": 4000000000, "uncompressed": 9000000000,
+     "parts": [{"name": "a.tar.xz.001", "size": 2147480000,
+                "uncompressed": 4800000000}, ...],
+     "blocks": [[offset, length, size, unpadded], ...]}
+
+The offsets of the blocks are offsets in the concatenation of the parts.
+A restore first checks that every part is there with its recorded size,
+then decompresses the blocks of all parts on a thread pool.
+"""
+
+VOLUMES_EXTENSION = '.volumes'
+
+VOLUMES_VERSION = 1
+
+# smaller volumes would hold too few blocks to compress well
+MIN_VOLUME_SIZE = 1 * MB
+
+# the suffix of a part or of the sidecar of a volume set
+VOLUME_SUFFIX = re.compile(r'\.(\d{3,}|volumes)$')
+
+UNITS = {'': 1, 'K': KB, 'M': MB, 'G': KB ** 3, 'T': KB ** 4}
+
+
+def parse_size(size: typing.Union[str, int]) -> int:
+    """Translates a size such as 2G, 512MB or 1048576 into bytes
+
+    Args:
+        size: the size, an integer or a number with a unit K, M, G or T,
+            optionally followed by B
+
+    Returns:
+        int: the size in bytes
+
+    Raises:
+        RuntimeError: if the size can not be read
+    """
+    if isinstance(size, int):
+        return size
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', str(size), re.IGNORECASE)
+    if match is None:
+        raise RuntimeError(f"Invalid size {size}")
+    return int(float(match.group(1)) * UNITS[match.group(2).upper()])
+
+
+def volumes_path(archive: str) -> str:
+    """The path of the sidecar of a volume set"""
+    return archive + VOLUMES_EXTENSION
+
+
+def part_path(archive: str, number: int) -> str:
+    """The path of a part of a volume set, counted from 1"""
+    return f"{archive}.{number:03d}"
+
+
+def base(path: str) -> str:
+    """The archive of a part or a sidecar, e.g. a.tar.xz for a.tar.xz.001"""
+    return VOLUME_SUFFIX.sub('', path)
+
+
+class VolumeWriter(BlockWriter):
+
+    def __init__(self,
+                 destination: str,
+                 volume_size: typing.Union[str, int],
+                 codec: str = 'xz',
+                 level: int = 5,
+                 workers: int = 0,
+                 block_size: int = None,
+                 kind: str = 'file'):
+        """Write only file object that compresses into numbered parts
+
+        The blocks are compressed on a thread pool like by the BlockWriter,
+        so the blocks of several parts are compressed concurrently. The
+        sidecar DESTINATION.volumes is written when the object is closed.
+
+        Args:
+            destination(str): the archive, the parts are DESTINATION.001, ...
+            volume_size: the largest size of a part, e.g. 2G
+            codec(str): one of gz, bz2, xz
+            level(int): the compression level
+            workers(int): number of threads, 0 uses one thread per cpu
+            block_size(int): the uncompressed size of a block, by default
+                at most a quarter of the volume size
+            kind(str): what the parts hold, file or directory for a tar
+                stream, recorded in the sidecar
+        """
+        volume_size = parse_size(volume_size)
+        if volume_size < MIN_VOLUME_SIZE:
+            raise RuntimeError(f"The volume size must be at least {MIN_VOLUME_SIZE} bytes")
+        if codec not in CODECS:
+            raise RuntimeError(f"Volumes support {', '.join(CODECS)}, not {codec}")
+        self.destination = destination
+        self.volume_size = volume_size
+        self.kind = kind
+        # the parts written so far with their name, size and uncompressed size
+        self.parts = []
+        # where the current part starts in the output and what it holds
+        self._start = 0
+        self._count = 0
+        self._uncompressed = 0
+        if block_size is None:
+            block_size = min(default_block_size(codec, 5 if level is None else int(level)), volume_size // 4)
+        super().__init__(self._open(1), codec=codec, level=level,
+                         workers=workers, block_size=block_size)
+
+    def _open(self, number: int) -> typing.BinaryIO:
+        # in a job of compress_async a cancelled job stops at its next write
+        return cancellable(timed(open(part_path(self.destination, number), 'wb'), 'write'))
+
+    def _trailer(self, records: typing.List[tuple]) -> int:
+        """The bytes that end a part with these blocks"""
+        if self._codec != 'xz':
+            return 0
+        return len(xz_index(records)) + 12
+
+    def _part_size(self, data: bytes, info: typing.Optional[tuple]) -> int:
+        """The size of the current part if it ends with this block"""
+        records = self._records if info is None else self._records + [info[1:]]
+        return self.bytes_out - self._start + len(data) + self._trailer(records)
+
+    def _append(self, data: bytes, size: int, info: typing.Optional[tuple]):
+        if self._count and self._part_size(data, info) > self.volume_size:
+            self._next()
+        if self._part_size(data, info) > self.volume_size:
+            raise RuntimeError(f"A block of {len(data)} bytes does not fit into a volume of {self.volume_size} bytes")
+        super()._append(data, size, info)
+        self._count += 1
+        self._uncompressed += size
+
+    def _close_part(self):
+        self._finish()
+        self._fileobj.close()
+        self.parts.append(dict(name=os.path.basename(part_path(self.destination, len(self.parts) + 1)),
+                               size=self.bytes_out - self._start,
+                               uncompressed=self._uncompressed))
+
+    def _next(self):
+        """Ends the current part and starts the next one"""
+        self._close_part()
+        self._fileobj = self._open(len(self.parts) + 1)
+        self._records = []
+        self._start = self.bytes_out
+        self._count = 0
+        self._uncompressed = 0
+        if self._codec == 'xz':
+            self._emit(xz_stream_header())
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer or self._blocks == 0:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            self._drain(0)
+            self._close_part()
+            blocks = [[segment.offset, segment.length, size,
+                       segment.length if segment.info is None else segment.info[1]]
+                      for segment, size in zip(self.segments, self.sizes)]
+            sidecar = dict(version=VOLUMES_VERSION, codec=self._codec, type=self.kind,
+                           volume_size=self.volume_size, size=self.bytes_out,
+                           uncompressed=sum(self.sizes), parts=self.parts, blocks=blocks)
+            with open(volumes_path(self.destination), 'w') as f:
+                json.dump(sidecar, f)
+        finally:
+            self._fileobj.close()
+            self._executor.shutdown(wait=True)
+            super(BlockWriter, self).close()
+
+    def discard(self):
+        """Closes the object and removes the parts and the sidecar"""
+        try:
+            self.close()
+        finally:
+            for number in range(1, len(self.parts) + 2):
+                if os.path.exists(part_path(self.destination, number)):
+                    os.remove(part_path(self.destination, number))
+            if os.path.exists(volumes_path(self.destination)):
+                os.remove(volumes_path(self.destination))
+
+
+def read_volumes(source: str) -> typing.Optional[dict]:
+    """Reads the sidecar of a volume set and checks that it is complete
+
+    Args:
+        source(str): the archive, its sidecar or one of its parts
+
+    Returns:
+        dict: the sidecar with the paths of the parts in paths, None if
+            the source is not a volume set
+
+    Raises:
+        RuntimeError: if a part is missing or its size differs from the
+            recorded one
+    """
+    archive = source if os.path.isfile(volumes_path(source)) else base(source)
+    path = volumes_path(archive)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        volumes = json.load(f)
+    if volumes.get('version') != VOLUMES_VERSION:
+        raise RuntimeError(f"Unsupported volumes version {volumes.get('version')} in {path}")
+    directory = os.path.dirname(archive)
+    volumes['paths'] = [os.path.join(directory, part['name']) for part in volumes['parts']]
+    problems = []
+    for part, name in zip(volumes['parts'], volumes['paths']):
+        if not os.path.isfile(name):
+            problems.append(f"{name} is missing")
+        elif os.path.getsize(name) != part['size']:
+            problems.append(f"{name} has {os.path.getsize(name)} bytes instead of {part['size']}")
+    if problems:
+        raise RuntimeError(f"The volume set {archive} is incomplete: {', '.join(problems)}")
+    return volumes
+
+
+def archive_size(path: str) -> int:
+    """The size of an archive, of a volume set the size of all parts"""
+    volumes = read_volumes(path)
+    return os.path.getsize(path) if volumes is None else volumes['size']
+
+
+class Concatenation(io.RawIOBase):
+
+    def __init__(self, paths: typing.List[str], sizes: typing.List[int]):
+        """Read only seekable file object over several files one after another
+
+        Args:
+            paths(list): the files
+            sizes(list): their sizes
+        """
+        super().__init__()
+        self._paths = paths
+        self._starts = [0]
+        for size in sizes:
+            self._starts.append(self._starts[-1] + size)
+        self._position = 0
+        self._file = None
+        self._index = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._starts[-1]
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast('B')
+        done = 0
+        while done < len(view) and self._position < self._starts[-1]:
+            index = bisect.bisect_right(self._starts, self._position) - 1
+            if index != self._index:
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(self._paths[index], 'rb')
+                self._index = index
+            self._file.seek(self._position - self._starts[index])
+            size = min(len(view) - done, self._starts[index + 1] - self._position)
+            read = self._file.readinto(view[done:done + size])
+            if not read:
+                raise RuntimeError(f"{self._paths[index]} is shorter than recorded")
+            done += read
+            self._position += read
+        return done
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+
+def open_volumes(volumes: dict, workers: int = 0) -> BlockReader:
+    """Opens a volume set for parallel decompression
+
+    Args:
+        volumes(dict): the sidecar as returned by read_volumes
+        workers(int): number of threads, 0 uses one thread per cpu
+
+    Returns:
+        BlockReader: the uncompressed content of all parts in order
+    """
+    flags = bytes([0, XZ_CHECK_CRC32])
+    segments = [Segment(offset, length, (flags, unpadded, size) if volumes['codec'] == 'xz' else None)
+                for offset, length, size, unpadded in volumes['blocks']]
+    fileobj = Concatenation(volumes['paths'], [part['size'] for part in volumes['parts']])
+    return BlockReader(fileobj, volumes['codec'], segments, workers=workers)
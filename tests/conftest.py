@@ -0,0 +1,26 @@
+###############################################################
+# fixtures shared by the tests
+###############################################################
+
+import pytest
+from cloudmesh.data.data import NativeData
+
+
+@pytest.fixture
+def content():
+    """Reads the bytes of a file"""
+    def read(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+
+@pytest.fixture
+def native():
+    """Creates a NativeData, the test is skipped if its tools are missing"""
+    def factory(algorithm, **kwargs):
+        reason = NativeData.missing(algorithm)
+        if reason is not None:
+            pytest.skip(reason)
+        return NativeData(algorithm=algorithm, **kwargs)
+    return factory
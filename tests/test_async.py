@@ -0,0 +1,66 @@
+###############################################################
+# pytest -v --capture=no  tests/test_async.py
+# pytest -v tests/test_async.py
+###############################################################
+
+import asyncio
+import filecmp
+import os
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.data import PythonData
+
+
+async def cancel(job, seconds=0.5):
+    task = asyncio.ensure_future(job)
+    await asyncio.sleep(seconds)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.incremental
+class Test_async(object):
+
+    def test_001_concurrent(self, native):
+        HEADING()
+        create.tree("s_dir", "2MB", files=10, kind="log", seed=1, verbose=False)
+
+        async def run():
+            jobs = [native("tarxz").compress_async("s_dir", f"s_native_{i}.tar.xz") for i in range(8)]
+            jobs += [PythonData(algorithm="targz").compress_async("s_dir", f"s_python_{i}.tar.gz") for i in range(8)]
+            await asyncio.gather(*jobs)
+            await asyncio.gather(native("tarxz").uncompress_async("s_native_3.tar.xz", "s_out_native"),
+                                 PythonData(algorithm="targz").uncompress_async("s_python_5.tar.gz", "s_out_python"))
+
+        asyncio.run(run())
+        for name in ["s_out_native", "s_out_python"]:
+            files = os.listdir("s_dir/000")
+            assert not filecmp.cmpfiles("s_dir/000", f"{name}/s_dir/000", files, shallow=False)[1]
+
+    def test_002_cancel_native(self, native):
+        HEADING()
+        create.random_file("s_random.dat", "64MB", verbose=False)
+        asyncio.run(cancel(native("xz").compress_async("s_random.dat", "s_native.dat.xz", level=9)))
+        assert not os.path.exists("s_native.dat.xz")
+
+    def test_003_cancel_python(self):
+        HEADING()
+        asyncio.run(cancel(PythonData(algorithm="xz").compress_async("s_random.dat", "s_python.dat.xz", level=9)))
+        assert not os.path.exists("s_python.dat.xz")
+
+    def test_004_cancel_uncompress(self):
+        HEADING()
+        PythonData(algorithm="tarxz", workers=2).compress("s_dir", "s_dir.tar.xz", level=0)
+
+        async def run():
+            # cancelled before the first read of the archive
+            await cancel(PythonData(algorithm="tarxz").uncompress_async("s_dir.tar.xz", "s_cancelled"), 0)
+
+        asyncio.run(run())
+        assert not os.path.exists("s_cancelled")
+
+    def test_100_cleanup(self):
+        os.system("rm -rf s_dir s_out_native s_out_python s_random.dat s_*.tar.* s_*.dat.xz s_cancelled")
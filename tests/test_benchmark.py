@@ -0,0 +1,58 @@
+###############################################################
+# pytest -v --capture=no  tests/test_benchmark.py
+# pytest -v tests/test_benchmark.py
+###############################################################
+
+import csv
+import io
+import json
+import os
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import benchmark
+from cloudmesh.data.command.data import DataCommand
+
+
+@pytest.mark.incremental
+class Test_benchmark(object):
+
+    def test_001_matrix(self):
+        HEADING()
+        rows = benchmark.benchmark(algorithms=["gz", "xz"],
+                                   levels=[1],
+                                   backends=["python"],
+                                   corpora=["ascii", "tree"],
+                                   size="64KB")
+        print(rows)
+        assert [(row["corpus"], row["algorithm"], row["action"]) for row in rows] == [
+            ("ascii", "gz", "compress"),
+            ("ascii", "gz", "uncompress"),
+            ("ascii", "xz", "compress"),
+            ("ascii", "xz", "uncompress"),
+            ("tree", "targz", "compress"),
+            ("tree", "targz", "uncompress"),
+            ("tree", "tarxz", "compress"),
+            ("tree", "tarxz", "uncompress"),
+        ]
+        for row in rows:
+            assert row["status"] == "ok"
+            assert row["seconds"] > 0
+        assert rows[0]["ratio"] < 0.1
+
+        data = list(csv.DictReader(io.StringIO(benchmark.write(rows, output="csv"))))
+        assert len(data) == len(rows)
+        assert list(data[0]) == benchmark.ORDER
+        assert json.loads(benchmark.write(rows, output="json")) == rows
+
+    def test_002_command(self):
+        HEADING()
+        DataCommand().do_data("benchmark --algorithms=gz --levels=1 --backends=python"
+                              " --corpora=random --size=64KB --output=json"
+                              " --file=benchmark.json")
+        rows = json.load(open("benchmark.json"))
+        assert [row["action"] for row in rows] == ["compress", "uncompress"]
+
+    def test_100_cleanup(self):
+        HEADING()
+        os.remove("benchmark.json")
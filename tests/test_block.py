@@ -0,0 +1,109 @@
+###############################################################
+# pytest -v --capture=no  tests/test_block.py
+# pytest -v tests/test_block.py
+###############################################################
+
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tarfile
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data.block import BlockWriter
+from cloudmesh.data.block import open_blocks
+from cloudmesh.data.create import ascii_file
+from cloudmesh.data.create import random_file
+from cloudmesh.data.data import PythonData
+
+size = "200KB"
+block_size = 64 * 1024
+
+
+def content():
+    with open(f"b_r_{size}.txt", 'rb') as f:
+        r = f.read()
+    with open(f"b_a_{size}.txt", 'rb') as f:
+        a = f.read()
+    return r + a
+
+
+@pytest.mark.incremental
+class Test_block(object):
+
+    def test_001_create_files(self):
+        HEADING()
+        os.makedirs("b_dir", exist_ok=True)
+        ascii_file(f"b_a_{size}.txt", size)
+        random_file(f"b_r_{size}.txt", size)
+        shutil.copy(f"b_a_{size}.txt", "b_dir")
+        shutil.copy(f"b_r_{size}.txt", "b_dir")
+
+    @pytest.mark.parametrize("codec, module", [("xz", lzma),
+                                               ("gz", gzip),
+                                               ("bz2", bz2)])
+    def test_002_block_writer(self, codec, module):
+        HEADING()
+        data = content()
+        with open(f"b_blocks.{codec}", 'wb') as out:
+            with BlockWriter(out, codec=codec, level=1, workers=4, block_size=block_size) as zf:
+                zf.write(data)
+        with open(f"b_blocks.{codec}", 'rb') as f:
+            assert module.decompress(f.read()) == data
+
+    @pytest.mark.parametrize("algorithm, module", [("xz", lzma),
+                                                   ("gz", gzip),
+                                                   ("bz2", bz2)])
+    def test_003_python_parallel_file(self, algorithm, module):
+        HEADING()
+        data = PythonData(algorithm=algorithm, workers=4)
+        data.compress(source=f"b_r_{size}.txt",
+                      destination=f"b_r_{size}.txt.{algorithm}",
+                      level=1)
+        with module.open(f"b_r_{size}.txt.{algorithm}", 'rb') as f:
+            assert f.read() == open(f"b_r_{size}.txt", 'rb').read()
+
+    def test_004_python_parallel_directory(self):
+        HEADING()
+        data = PythonData(algorithm="tarxz", workers=4)
+        data.compress(source="b_dir", destination="b_dir.tar.xz", level=1)
+        with tarfile.open("b_dir.tar.xz", "r:xz") as tf:
+            names = tf.getnames()
+        assert f"b_dir/b_a_{size}.txt" in names
+        assert f"b_dir/b_r_{size}.txt" in names
+
+    @pytest.mark.parametrize("codec", ["xz", "gz", "bz2"])
+    def test_005_block_reader(self, codec):
+        HEADING()
+        reader = open_blocks(f"b_blocks.{codec}", codec, workers=4)
+        assert reader is not None
+        with reader:
+            assert reader.read() == content()
+
+    @pytest.mark.parametrize("codec, module", [("xz", lzma),
+                                               ("gz", gzip),
+                                               ("bz2", bz2)])
+    def test_006_single_block_fallback(self, codec, module):
+        HEADING()
+        with module.open(f"b_single.{codec}", 'wb') as f:
+            f.write(content())
+        assert open_blocks(f"b_single.{codec}", codec) is None
+
+    def test_007_python_parallel_uncompress(self):
+        HEADING()
+        data = PythonData(algorithm="bz2", workers=4)
+        data.uncompress(source=f"b_r_{size}.txt.bz2",
+                        destination=f"b_r_uncompressed_{size}.txt")
+        assert open(f"b_r_uncompressed_{size}.txt", 'rb').read() == open(f"b_r_{size}.txt", 'rb').read()
+
+        data = PythonData(algorithm="tarxz", workers=4)
+        data.uncompress(source="b_dir.tar.xz", destination="b_restored")
+        assert os.path.isfile(f"b_restored/b_dir/b_a_{size}.txt")
+
+    def test_100_cleanup(self):
+        HEADING()
+        shutil.rmtree("b_dir", ignore_errors=True)
+        shutil.rmtree("b_restored", ignore_errors=True)
+        os.system("rm -f b_*.txt b_*.txt.* b_blocks.* b_single.* b_dir.tar.*")
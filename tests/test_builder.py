@@ -0,0 +1,85 @@
+###############################################################
+# pytest -v --capture=no  tests/test_builder.py
+# pytest -v tests/test_builder.py
+###############################################################
+
+import os
+import tarfile
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.builder import add_tree
+from cloudmesh.data.builder import scan
+
+
+def members(archive):
+    """The members of an archive by name with their attributes and data"""
+    result = {}
+    with tarfile.open(archive) as tf:
+        for member in tf:
+            data = tf.extractfile(member).read() if member.isreg() else None
+            result[member.name] = (member.type, member.mode, member.size, member.mtime,
+                                   member.linkname, member.uname, member.gname, data)
+    return result
+
+
+@pytest.mark.incremental
+class Test_builder(object):
+
+    def test_001_scan(self):
+        HEADING()
+        create.tree("b_dir", "2MB", files=200, kind="mixed", seed=9, verbose=False)
+        create.random_file("b_dir/large.dat", "3MB", verbose=False)
+        os.makedirs("b_dir/a/b/c")
+        os.symlink("../large.dat", "b_dir/a/link")
+        os.link("b_dir/large.dat", "b_dir/a/b/hard.dat")
+        with open("b_dir/a/b/c/empty", "w"):
+            pass
+        names = [name for _, name, _ in scan("b_dir")]
+        assert names[0] == "b_dir"
+        assert names.index("b_dir/a") < names.index("b_dir/a/b") < names.index("b_dir/a/b/c/empty")
+        assert len(names) == len(set(names)) == 1 + sum(len(d) + len(f) for _, d, f in os.walk("b_dir"))
+
+    def test_002_add_tree(self):
+        HEADING()
+        with tarfile.open("b_plain.tar", "w") as tf:
+            tf.add("b_dir")
+        with tarfile.open("b_tree.tar", "w") as tf:
+            count = add_tree(tf, "b_dir", workers=4)
+        plain = members("b_plain.tar")
+        tree = members("b_tree.tar")
+        assert count == len(plain)
+        # one of the hard linked paths holds the data, the other links to it
+        hard = sorted(name for name in ["b_dir/large.dat", "b_dir/a/b/hard.dat"] if tree[name][0] == tarfile.LNKTYPE)
+        assert len(hard) == 1
+        for name in ["b_dir/large.dat", "b_dir/a/b/hard.dat"]:
+            del plain[name]
+            del tree[name]
+        assert tree == plain
+
+    def test_003_order(self):
+        HEADING()
+        with tarfile.open("b_tree.tar") as tf:
+            order = tf.getmembers()
+        kinds = [member.isreg() or member.islnk() for member in order]
+        # directories and symbolic links first, then the files
+        assert kinds == sorted(kinds)
+
+    def test_004_stream(self):
+        HEADING()
+        with open("b_stream.tar.gz", "xb") as f, tarfile.open(fileobj=f, mode="w|gz") as tf:
+            add_tree(tf, "b_dir")
+        assert members("b_stream.tar.gz") == members("b_tree.tar")
+
+    def test_005_self(self):
+        HEADING()
+        with tarfile.open("b_dir/b_self.tar", "w") as tf:
+            add_tree(tf, "b_dir")
+        with tarfile.open("b_dir/b_self.tar") as tf:
+            names = tf.getnames()
+        assert "b_dir/b_self.tar" not in names
+        assert "b_dir/000/file_000000.dat" in names
+
+    def test_100_cleanup(self):
+        os.system("rm -rf b_dir b_plain.tar b_tree.tar b_stream.tar.gz")
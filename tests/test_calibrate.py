@@ -0,0 +1,74 @@
+###############################################################
+# pytest -v --capture=no  tests/test_calibrate.py
+# pytest -v tests/test_calibrate.py
+###############################################################
+
+import json
+import os
+import platform
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data.calibrate import fingerprint
+from cloudmesh.data.calibrate import select
+
+CACHE = "c_calibration.json"
+
+
+def entry():
+    with open(CACHE) as f:
+        return json.load(f)[platform.node()]["gz:1:1"]
+
+
+def change(update):
+    with open(CACHE) as f:
+        content = json.load(f)
+    update(content[platform.node()]["gz:1:1"])
+    with open(CACHE, "w") as f:
+        json.dump(content, f)
+
+
+@pytest.mark.incremental
+class Test_calibrate(object):
+
+    def test_001_calibrate(self):
+        HEADING()
+        backend = select("gz", level=1, cache=CACHE, size="1MB")
+        calibration = entry()
+        print(calibration)
+        assert calibration["fingerprint"] == fingerprint("gz")
+        assert set(calibration["seconds"]["compress"]) == {"native", "python"}
+        assert backend == calibration["best"]["compress"]
+        assert calibration["best"]["uncompress"] in ["native", "python"]
+
+    def test_002_cached(self):
+        HEADING()
+
+        def slow_native(calibration):
+            calibration["best"] = {"compress": "python", "uncompress": "python"}
+
+        change(slow_native)
+        assert select("gz", level=1, cache=CACHE, size="1MB") == "python"
+        assert select("gzip", "uncompress", level="1", cache=CACHE, size="1MB") == "python"
+
+    def test_003_recalibrate(self):
+        HEADING()
+
+        def new_version(calibration):
+            calibration["fingerprint"]["python"] = "0.0.0"
+            calibration["seconds"] = None
+
+        change(new_version)
+        select("gz", level=1, cache=CACHE, size="1MB")
+        calibration = entry()
+        assert calibration["fingerprint"] == fingerprint("gz")
+        assert calibration["seconds"] is not None
+
+    def test_004_tar(self):
+        HEADING()
+        assert select("tar", cache=CACHE, size="1MB") in ["native", "python"]
+        with open(CACHE) as f:
+            assert "tar:5:1" in json.load(f)[platform.node()]
+
+    def test_100_cleanup(self):
+        os.system(f"rm -f {CACHE}")
@@ -0,0 +1,99 @@
+###############################################################
+# pytest -v --capture=no  tests/test_classify.py
+# pytest -v tests/test_classify.py
+###############################################################
+
+import asyncio
+import filecmp
+import gzip
+import os
+import subprocess
+import tarfile
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.block import MB
+from cloudmesh.data.classify import entropy
+from cloudmesh.data.classify import is_compressed
+from cloudmesh.data.data import NativeData
+from cloudmesh.data.data import PythonData
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+@pytest.mark.incremental
+class Test_classify(object):
+
+    def test_001_entropy(self):
+        HEADING()
+        assert entropy(b"") == 0
+        assert entropy(b"a" * 1000) == 0
+        assert entropy(bytes(range(256)) * 4) == 8
+        assert entropy(os.urandom(65536)) > 7.9
+
+    def test_002_is_compressed(self):
+        HEADING()
+        os.makedirs("k_dir/media", exist_ok=True)
+        create.text_file("k_dir/text.dat", "2MB", seed=9, verbose=False)
+        with open("k_dir/text.dat", "rb") as f:
+            text = f.read()
+        write("k_dir/media/photo.jpg", b"not really a photo")
+        write("k_dir/media/archive.bin", gzip.compress(text))
+        write("k_dir/media/random.bin", os.urandom(2 * MB))
+        assert is_compressed("k_dir/media/photo.jpg")
+        assert is_compressed("k_dir/media/archive.bin")
+        assert is_compressed("k_dir/media/random.bin")
+        assert not is_compressed("k_dir/text.dat")
+        assert is_compressed("movie.mov", b"\x00\x00\x00\x18ftypqt  ")
+
+    def test_003_compress(self):
+        HEADING()
+        # the random and the gzip file are stored, they do not shrink nor grow
+        stored = os.path.getsize("k_dir/media/random.bin") + os.path.getsize("k_dir/media/archive.bin")
+        for backend in [NativeData, PythonData]:
+            for codec in ["gz", "xz"]:
+                archive = f"k_{backend.__name__}.tar.{codec}"
+                backend(algorithm=f"tar{codec}", workers=2).compress("k_dir", archive, per_member=True)
+                backend(algorithm=f"tar{codec}", workers=2).compress("k_dir", f"k_all.tar.{codec}")
+                assert stored < os.path.getsize(archive) < os.path.getsize(f"k_all.tar.{codec}") * 1.01
+                os.remove(f"k_all.tar.{codec}")
+                with tarfile.open(archive) as tf:
+                    assert "k_dir/media/random.bin" in tf.getnames()
+
+    def test_004_uncompress(self):
+        HEADING()
+        for backend in [NativeData, PythonData]:
+            archive = f"k_{backend.__name__}.tar.xz"
+            destination = f"k_out_{backend.__name__}"
+            backend(algorithm="tarxz").uncompress(archive, destination)
+            comparison = filecmp.dircmp("k_dir/media", f"{destination}/k_dir/media")
+            assert not comparison.diff_files and not comparison.left_only
+            assert filecmp.cmp("k_dir/text.dat", f"{destination}/k_dir/text.dat", shallow=False)
+
+    def test_005_codec(self):
+        HEADING()
+        with pytest.raises(RuntimeError, match="Per-member"):
+            PythonData(algorithm="tarbz2").compress("k_dir", "k_dir.tar.bz2", per_member=True)
+
+    def test_006_cli(self):
+        HEADING()
+        subprocess.run("cms data compress --algorithm=tarxz --per-member --threads=2 "
+                       "--source=k_dir --destination=k_cli.tar.xz",
+                       shell=True, stdout=subprocess.DEVNULL, check=True)
+        subprocess.run("tar -xJf k_cli.tar.xz -C k_out_NativeData --transform=s/k_dir/k_cli/",
+                       shell=True, check=True)
+        assert filecmp.cmp("k_dir/media/random.bin", "k_out_NativeData/k_cli/media/random.bin", shallow=False)
+
+    def test_007_async(self):
+        HEADING()
+        for backend in [NativeData, PythonData]:
+            archive = f"k_async_{backend.__name__}.tar.xz"
+            asyncio.run(backend(algorithm="tarxz").compress_async("k_dir", archive, per_member=True))
+            assert os.path.getsize(archive) > os.path.getsize("k_dir/media/random.bin")
+
+    def test_100_cleanup(self):
+        os.system("rm -rf k_dir k_NativeData.tar.* k_PythonData.tar.* k_out_* k_cli.tar.xz k_dir.tar.bz2 k_async_*")
@@ -0,0 +1,60 @@
+###############################################################
+# pytest -v --capture=no  tests/test_create.py
+# pytest -v tests/test_create.py
+###############################################################
+
+import os
+import zlib
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+
+
+@pytest.mark.incremental
+class Test_create(object):
+
+    def test_001_sizes(self):
+        HEADING()
+        for kind, generate in create.GENERATORS.items():
+            generate(f"create_{kind}.dat", "100KB", verbose=False)
+            assert os.path.getsize(f"create_{kind}.dat") == 100 * 1024, kind
+        # larger than a chunk
+        create.entropy_file("create_large.dat", create.CHUNK + 12345, verbose=False)
+        assert os.path.getsize("create_large.dat") == create.CHUNK + 12345
+
+    def test_002_ascii(self):
+        HEADING()
+        create.ascii_file("create_x.dat", "1KB", c="x", verbose=False)
+        assert open("create_x.dat", "rb").read() == 1024 * b"x"
+
+    def test_003_entropy(self):
+        HEADING()
+        for ratio in (0.1, 0.5, 0.9):
+            create.entropy_file("create_entropy.dat", "1MB", ratio=ratio, verbose=False)
+            data = open("create_entropy.dat", "rb").read()
+            assert abs(len(zlib.compress(data)) / len(data) - ratio) < 0.03
+
+    def test_004_seed(self):
+        HEADING()
+        for kind in ("random", "text", "log", "columnar"):
+            create.GENERATORS[kind]("create_a.dat", "200KB", seed=7, verbose=False)
+            create.GENERATORS[kind]("create_b.dat", "200KB", seed=7, verbose=False)
+            assert open("create_a.dat", "rb").read() == open("create_b.dat", "rb").read(), kind
+
+    def test_005_tree(self):
+        HEADING()
+        for distribution in ("uniform", "lognormal", "pareto"):
+            sizes = create.file_sizes(10000, 50, distribution=distribution, seed=1)
+            assert len(sizes) == 50
+            assert sum(sizes) == 10000
+        create.tree("create_tree", "100KB", files=150, kind="text", distribution="lognormal",
+                    seed=1, verbose=False)
+        found = [os.path.join(root, name) for root, _, names in os.walk("create_tree") for name in names]
+        assert len(found) == 150
+        assert sum(os.path.getsize(path) for path in found) == 100 * 1024
+        assert sorted(os.listdir("create_tree")) == ["000", "001"]
+
+    def test_100_cleanup(self):
+        HEADING()
+        os.system("rm -rf create_tree create_*.dat")
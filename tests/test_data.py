@@ -5,14 +5,16 @@
 ###############################################################
 
 import os
+import lzma
 import pytest
-import hashlib
 from testfixtures import compare
 from cloudmesh.common.Shell import Shell
 from cloudmesh.common.util import HEADING
 from cloudmesh.data.create import ascii_file
 from cloudmesh.data.create import random_file
 from cloudmesh.data.command.data import DataCommand
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.digest import file_digest
 
 
 @pytest.mark.incremental
@@ -75,19 +77,47 @@ class Test_data(object):
 
     def test_005_integrity(self):
         HEADING()
-        def create_hash(file):
-            sha256 = hashlib.sha256()
-            with open(file, 'rb') as f:
-                buffer = f.read()
-                sha256.update(buffer)
-                return sha256.hexdigest()
-        ascii_original = create_hash(f"a_{self.size}.txt")
-        ascii_uncompressed = create_hash(f"a_uncompressed_{self.size}.txt")
-        random_original = create_hash(f"r_{self.size}.txt")
-        random_uncompressed = create_hash(f"r_uncompressed_{self.size}.txt")
+        ascii_original = file_digest(f"a_{self.size}.txt")
+        ascii_uncompressed = file_digest(f"a_uncompressed_{self.size}.txt")
+        random_original = file_digest(f"r_{self.size}.txt")
+        random_uncompressed = file_digest(f"r_uncompressed_{self.size}.txt")
         compare(ascii_original, ascii_uncompressed)
         compare(random_original, random_uncompressed)
 
+    def test_006_estimate(self):
+        HEADING()
+        data = PythonData(algorithm="xz")
+        results = data.estimate(f"r_{self.size}.txt", algorithms=["xz", "gz"])
+        print(results)
+        assert [result["algorithm"] for result in results] == ["xz", "gz"]
+        assert results[0]["ratio"] > 0.98
+
+        data.compress(source=f"r_{self.size}.txt",
+                      destination=f"r_stored_{self.size}.txt.xz",
+                      store_incompressible=True)
+        with lzma.open(f"r_stored_{self.size}.txt.xz") as f:
+            assert f.read() == open(f"r_{self.size}.txt", 'rb').read()
+
+    def test_007_batch(self):
+        HEADING()
+        data = PythonData(algorithm="xz")
+        results = data.compress_many([f"a_{self.size}.txt",
+                                      f"r_{self.size}.txt",
+                                      f"missing_{self.size}.txt"],
+                                     destination="batch_out",
+                                     jobs=2)
+        print(results)
+        assert [result["status"] for result in results] == ["ok", "ok", "failed"]
+        assert os.path.isfile(f"batch_out/a_{self.size}.txt.xz")
+
+        results = data.uncompress_many([f"batch_out/a_{self.size}.txt.xz",
+                                        f"batch_out/r_{self.size}.txt.xz"],
+                                       destination="batch_out/restored")
+        assert all(result["status"] == "ok" for result in results)
+        compare(open(f"batch_out/restored/a_{self.size}.txt", 'rb').read(),
+                open(f"a_{self.size}.txt", 'rb').read())
+
     def test_100_cleanup(self):
         HEADING()
+        os.system("rm -rf batch_out")
         os.system("rm *.txt *.txt.xz")
@@ -0,0 +1,115 @@
+###############################################################
+# pytest -v --capture=no  tests/test_dedup.py
+# pytest -v tests/test_dedup.py
+###############################################################
+
+import filecmp
+import io
+import os
+import shutil
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.command.data import DataCommand
+from cloudmesh.data.data import DedupData
+from cloudmesh.data.dedup import MAX_CHUNK
+from cloudmesh.data.dedup import MIN_CHUNK
+from cloudmesh.data.dedup import chunks
+from cloudmesh.data.dedup import read_recipe
+from cloudmesh.data.dedup import restore_recipe
+
+
+def same(left, right):
+    compared = filecmp.dircmp(left, right)
+    assert not compared.left_only and not compared.right_only, compared.report()
+    assert not filecmp.cmpfiles(left, right, compared.common_files, shallow=False)[1]
+    for name in compared.common_dirs:
+        same(os.path.join(left, name), os.path.join(right, name))
+
+
+def stored():
+    return sum(len(files) for _, _, files in os.walk("d_store"))
+
+
+@pytest.mark.incremental
+class Test_dedup(object):
+
+    def test_001_chunks(self):
+        HEADING()
+        data = os.urandom(3 * 1024 * 1024)
+        pieces = list(chunks(io.BytesIO(data)))
+        assert b"".join(pieces) == data
+        assert all(MIN_CHUNK <= len(piece) <= MAX_CHUNK for piece in pieces[:-1])
+        # an insertion only changes the chunks next to it
+        shifted = list(chunks(io.BytesIO(data[:1000] + b"inserted" + data[1000:])))
+        assert len(set(pieces) & set(shifted)) >= len(pieces) - 2
+        assert list(chunks(io.BytesIO(bytes(MAX_CHUNK + 1)))) == [bytes(MAX_CHUNK), bytes(1)]
+        assert list(chunks(io.BytesIO(b""))) == []
+
+    def test_002_compress(self):
+        HEADING()
+        create.tree("d_a", "4MB", files=20, kind="mixed", seed=3, verbose=False)
+        DedupData(algorithm="xz", store="d_store").compress("d_a", "d_a.dedup")
+        recipe = read_recipe("d_a.dedup")
+        assert recipe["type"] == "directory"
+        assert recipe["store"] == os.path.abspath("d_store")
+        assert [entry["name"] for entry in recipe["entries"][:2]] == ["d_a", "d_a/000"]
+        assert stored() == len({digest for entry in recipe["entries"] for digest in entry.get("chunks", [])})
+
+    def test_003_near_copy(self):
+        HEADING()
+        shutil.copytree("d_a", "d_b")
+        with open("d_b/000/file_000002.dat", "r+b") as f:
+            data = f.read()
+            f.seek(0)
+            f.write(data[:100] + b"changed" + data[100:])
+        before = stored()
+        DedupData(algorithm="xz", store="d_store", workers=2).compress("d_b", "d_b.dedup")
+        # only the chunks around the change are new
+        assert 0 < stored() - before <= 2
+        info = DedupData().info("d_b.dedup")
+        print(info)
+        assert info["type"] == "recipe"
+        assert info["files"] == 20
+        assert info["uncompressed"] == 4 * 1024 * 1024 + 7
+
+    def test_004_uncompress(self):
+        HEADING()
+        DedupData(workers=2).uncompress("d_b.dedup", "d_out")
+        same("d_b", "d_out/d_b")
+        assert os.path.getmtime("d_b/000/file_000001.dat") == os.path.getmtime("d_out/d_b/000/file_000001.dat")
+
+    def test_005_file(self):
+        HEADING()
+        DedupData(algorithm="gz").compress("d_a/000/file_000001.dat", "d_file.dedup")
+        assert os.path.isdir(".chunks")
+        DedupData().uncompress("d_file.dedup")
+        assert filecmp.cmp("d_a/000/file_000001.dat", "d_file", shallow=False)
+
+    def test_006_command(self):
+        HEADING()
+        DataCommand().do_data("compress --dedup --algorithm=zst --chunks=d_store"
+                              " --source=d_a --destination=d_c.dedup")
+        assert read_recipe("d_c.dedup")["codec"] == "zst"
+        DataCommand().do_data("uncompress --source=d_c.dedup --destination=d_cmd")
+        same("d_a", "d_cmd/d_a")
+
+    def test_007_unsafe(self):
+        HEADING()
+        os.makedirs("d_outside")
+
+        def recipe(*entries):
+            return dict(type="directory", store="d_store", codec="xz",
+                        entries=[dict(mode=0o644, mtime=0, chunks=[], **entry) for entry in entries])
+
+        with pytest.raises(RuntimeError, match="outside of the destination"):
+            restore_recipe(recipe(dict(name="../d_escaped", type="file")), "d_unsafe")
+        assert not os.path.exists("d_escaped")
+        with pytest.raises(RuntimeError, match="outside of the destination"):
+            restore_recipe(recipe(dict(name="d/link", type="symlink", target=os.path.abspath("d_outside")),
+                                  dict(name="d/link/evil.txt", type="file")), "d_unsafe")
+        assert not os.path.exists("d_outside/evil.txt")
+
+    def test_100_cleanup(self):
+        os.system("rm -rf d_a d_b d_out d_cmd d_store .chunks d_*.dedup d_file d_outside d_unsafe")
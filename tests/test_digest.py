@@ -0,0 +1,87 @@
+###############################################################
+# pytest -v --capture=no  tests/test_digest.py
+# pytest -v tests/test_digest.py
+###############################################################
+
+import io
+import os
+import shutil
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.command.data import DataCommand
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.digest import DigestFile
+from cloudmesh.data.digest import file_digest
+from cloudmesh.data.digest import read_digest
+
+
+@pytest.mark.incremental
+class Test_digest(object):
+
+    def test_001_digest_file(self):
+        HEADING()
+        create.mixed_file("g_file.dat", "3MB", seed=5, verbose=False)
+        expected = file_digest("g_file.dat")
+        with DigestFile("g_file.dat") as f:
+            # reads that jump ahead and back like the block scanner
+            f.seek(-100, io.SEEK_END)
+            f.read(100)
+            f.seek(10)
+            f.read(1000)
+            f.seek(2000)
+            f.read(5000)
+        assert f.hexdigest() == expected
+
+    def test_002_compress(self, native):
+        HEADING()
+        create.tree("g_dir", "2MB", files=20, kind="text", seed=4, verbose=False)
+        PythonData(algorithm="tarxz", workers=2, digest="sha256").compress("g_dir", "g_python.tar.xz")
+        native("targz", digest="sha256").compress("g_dir", "g_native.tar.gz")
+        PythonData(algorithm="xz", digest="sha256").compress("g_file.dat", "g_file.dat.xz")
+        for archive in ["g_python.tar.xz", "g_native.tar.gz", "g_file.dat.xz"]:
+            assert read_digest(archive) == ("sha256", file_digest(archive))
+        with open("g_file.dat.xz.sha256") as f:
+            assert f.read().endswith("  g_file.dat.xz\n")
+
+    def test_003_uncompress(self, native):
+        HEADING()
+        PythonData(algorithm="tarxz", workers=2).uncompress("g_python.tar.xz", "g_out")
+        native("targz", digest="sha256").uncompress("g_native.tar.gz", "g_out_native")
+        PythonData(algorithm="xz").uncompress("g_file.dat.xz", "g_back.dat")
+        assert file_digest("g_back.dat") == file_digest("g_file.dat")
+
+    def test_004_mismatch(self):
+        HEADING()
+        shutil.copy("g_file.dat.xz", "g_bad.dat.xz")
+        with open("g_bad.dat.xz.sha256", "w") as f:
+            f.write(f"{'0' * 64}  g_bad.dat.xz\n")
+        with pytest.raises(RuntimeError, match="does not match its digest"):
+            PythonData(algorithm="xz").uncompress("g_bad.dat.xz", "g_bad.dat")
+
+    def test_005_verify(self):
+        HEADING()
+        shutil.copy("g_python.tar.xz", "g_corrupt.tar.xz")
+        with open("g_corrupt.tar.xz", "r+b") as f:
+            f.seek(500)
+            byte = f.read(1)
+            f.seek(500)
+            f.write(bytes([byte[0] ^ 1]))
+        results = PythonData(workers=2).verify_many(["g_python.tar.xz", "g_native.tar.gz", "g_file.dat.xz",
+                                                     "g_bad.dat.xz", "g_corrupt.tar.xz"], jobs=3)
+        print(results)
+        assert [result["status"] for result in results] == ["ok", "ok", "ok", "failed", "failed"]
+        assert results[0]["members"] == 20 + 1 + 1
+        assert results[2]["uncompressed"] == 3 * 1024 * 1024
+        assert "does not match its digest" in results[3]["error"]
+
+    def test_006_command(self):
+        HEADING()
+        DataCommand().do_data("compress --algorithm=tarxz --digest=sha256 --source=g_dir"
+                              " --destination=g_command.tar.xz")
+        assert read_digest("g_command.tar.xz") == ("sha256", file_digest("g_command.tar.xz"))
+        DataCommand().do_data("verify --threads=2 --source=g_command.tar.xz --source=g_python.tar.xz")
+
+    def test_100_cleanup(self):
+        os.system("rm -rf g_file.dat g_dir g_out g_out_native g_back.dat g_bad.dat g_*.tar.* g_*.dat.xz*")
@@ -0,0 +1,150 @@
+###############################################################
+# pytest -v --capture=no  tests/test_extract.py
+# pytest -v tests/test_extract.py
+###############################################################
+
+import io
+import os
+import stat
+import tarfile
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.block import MB
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.extract import extract_tar
+
+
+def tree(path):
+    """The names, types, modes, mtimes and contents below a directory"""
+    result = {}
+    for root, directories, names in os.walk(path):
+        for name in directories + names:
+            full = os.path.join(root, name)
+            status = os.lstat(full)
+            if os.path.islink(full):
+                content = os.readlink(full)
+            elif os.path.isfile(full):
+                with open(full, "rb") as f:
+                    content = f.read()
+            else:
+                content = None
+            # tarfile does not set the mtime of symbolic links
+            mtime = None if os.path.islink(full) else int(status.st_mtime)
+            result[os.path.relpath(full, path)] = (status.st_mode, mtime, content)
+    return result
+
+
+@pytest.mark.incremental
+class Test_extract(object):
+
+    def test_001_create(self):
+        HEADING()
+        create.tree("x_dir", "3MB", files=300, kind="mixed", seed=8, verbose=False)
+        create.random_file("x_dir/000/large.dat", "3MB", verbose=False)
+        os.makedirs("x_dir/readonly/nested")
+        with open("x_dir/readonly/nested/file.txt", "w") as f:
+            f.write("text")
+        os.symlink("../000/large.dat", "x_dir/readonly/link")
+        os.link("x_dir/000/large.dat", "x_dir/hard.dat")
+        os.chmod("x_dir/readonly/nested", 0o555)
+        os.chmod("x_dir/readonly", 0o555)
+        for root, directories, _ in os.walk("x_dir"):
+            for name in directories:
+                os.utime(os.path.join(root, name), (1000000000, 1000000000))
+        with tarfile.open("x_dir.tar", "w") as tf:
+            tf.add("x_dir")
+
+    def test_002_extract(self):
+        HEADING()
+        with tarfile.open("x_dir.tar") as tf:
+            members = len(tf.getmembers())
+            # the writers apply the metadata of the data filter
+            tf.extractall("x_expected", filter="data")
+        with tarfile.open("x_dir.tar", "r|") as tf:
+            assert extract_tar(tf, "x_out", writers=4) == members
+        expected = tree("x_expected")
+        assert tree("x_out") == expected
+        assert expected["x_dir/readonly"][1] == 1000000000
+        assert os.path.samefile("x_out/x_dir/hard.dat", "x_out/x_dir/000/large.dat")
+
+    def test_003_unsafe(self):
+        HEADING()
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w") as tf:
+            member = tarfile.TarInfo("../outside.txt")
+            member.size = 4
+            tf.addfile(member, io.BytesIO(b"text"))
+        data.seek(0)
+        with tarfile.open(fileobj=data, mode="r|") as tf:
+            with pytest.raises(RuntimeError, match="outside of the destination"):
+                extract_tar(tf, "x_unsafe")
+        assert not os.path.exists("outside.txt")
+
+    def test_004_symlink(self):
+        HEADING()
+        os.makedirs("x_outside")
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w") as tf:
+            link = tarfile.TarInfo("d/link")
+            link.type = tarfile.SYMTYPE
+            link.linkname = os.path.abspath("x_outside")
+            tf.addfile(link)
+            member = tarfile.TarInfo("d/link/evil.txt")
+            member.size = 4
+            tf.addfile(member, io.BytesIO(b"text"))
+        for writers in [1, 4]:
+            data.seek(0)
+            with tarfile.open(fileobj=data, mode="r|") as tf:
+                with pytest.raises(RuntimeError, match="d/link"):
+                    extract_tar(tf, "x_unsafe", writers=writers)
+            assert not os.path.exists("x_outside/evil.txt")
+        # a link that is already in the destination is not followed either
+        os.makedirs("x_unsafe/d", exist_ok=True)
+        os.symlink(os.path.abspath("x_outside"), "x_unsafe/d/link")
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w") as tf:
+            tf.addfile(member, io.BytesIO(b"text"))
+        data.seek(0)
+        with tarfile.open(fileobj=data, mode="r|") as tf:
+            with pytest.raises(RuntimeError, match="outside of the destination"):
+                extract_tar(tf, "x_unsafe")
+        assert not os.path.exists("x_outside/evil.txt")
+
+    def test_005_mode(self):
+        HEADING()
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w") as tf:
+            directory = tarfile.TarInfo("x_mode")
+            directory.type = tarfile.DIRTYPE
+            directory.mode = 0o2777
+            tf.addfile(directory)
+            for name, size, mode in [("small", 4, 0o4777), ("large", 2 * MB, 0o4777), ("plain", 4, 0o444)]:
+                member = tarfile.TarInfo(f"x_mode/{name}")
+                member.size = size
+                member.mode = mode
+                member.uid = member.gid = 12345
+                tf.addfile(member, io.BytesIO(b"t" * size))
+        data.seek(0)
+        with tarfile.open(fileobj=data, mode="r|") as tf:
+            extract_tar(tf, "x_mode_out")
+        umask = os.umask(0o022)
+        os.umask(umask)
+        assert oct(os.stat("x_mode_out/x_mode").st_mode) == oct(stat.S_IFDIR | 0o777 & ~umask)
+        # small files are written by the writers, large ones by tarfile
+        assert oct(os.stat("x_mode_out/x_mode/small").st_mode) == oct(stat.S_IFREG | 0o755)
+        assert oct(os.stat("x_mode_out/x_mode/large").st_mode) == oct(stat.S_IFREG | 0o755)
+        assert oct(os.stat("x_mode_out/x_mode/plain").st_mode) == oct(stat.S_IFREG | 0o644)
+        assert os.stat("x_mode_out/x_mode/small").st_uid == os.getuid()
+
+    def test_006_uncompress(self):
+        HEADING()
+        PythonData(algorithm="targz").compress("x_dir", "x_dir.tar.gz", level=1)
+        PythonData(algorithm="targz").uncompress("x_dir.tar.gz", "x_python")
+        assert tree("x_python") == tree("x_expected")
+
+    def test_100_cleanup(self):
+        for path in ["x_dir", "x_out", "x_expected", "x_python"]:
+            os.system(f"chmod -R u+w {path} 2>/dev/null")
+        os.system("rm -rf x_dir x_out x_expected x_python x_unsafe x_outside x_mode_out x_dir.tar x_dir.tar.gz")
@@ -0,0 +1,91 @@
+###############################################################
+# pytest -v --capture=no  tests/test_incremental.py
+# pytest -v tests/test_incremental.py
+###############################################################
+
+import filecmp
+import os
+import shutil
+import tarfile
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.command.data import DataCommand
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.incremental import read_manifest
+from cloudmesh.data.incremental import restore
+
+
+def same(left, right):
+    compared = filecmp.dircmp(left, right)
+    assert not compared.left_only and not compared.right_only, compared.report()
+    assert not filecmp.cmpfiles(left, right, compared.common_files, shallow=False)[1]
+    for name in compared.common_dirs:
+        same(os.path.join(left, name), os.path.join(right, name))
+
+
+@pytest.mark.incremental
+class Test_incremental(object):
+
+    def test_001_full(self):
+        HEADING()
+        create.tree("n_dir", "200KB", files=150, kind="log", seed=2, verbose=False)
+        result = PythonData(algorithm="tarxz").compress_incremental("n_dir", "n_0.tar.xz", digest=True)
+        assert result["archived"] == 150 + 3
+        manifest = read_manifest("n_0.tar.xz")
+        assert manifest["parent"] is None
+        assert manifest["files"]["n_dir/000/file_000000.dat"][3] is not None
+
+    def test_002_delta(self):
+        HEADING()
+        create.text_file("n_dir/000/file_000005.dat", "3KB", seed=1, verbose=False)
+        os.remove("n_dir/001/file_000120.dat")
+        os.makedirs("n_dir/002")
+        create.ascii_file("n_dir/002/new.dat", "1KB", verbose=False)
+        # touched, but the content is the same
+        os.utime("n_dir/000/file_000006.dat", (1, 1))
+        result = PythonData(algorithm="tarxz", workers=2).compress_incremental(
+            "n_dir", "n_1.tar.xz", base="n_0.tar.xz", digest=True)
+        print(result)
+        assert result == dict(archive="n_1.tar.xz", parent="n_0.tar.xz",
+                              archived=3, unchanged=151, deleted=1)
+        with tarfile.open("n_1.tar.xz") as tar:
+            assert tar.getnames() == ["n_dir/000/file_000005.dat", "n_dir/002", "n_dir/002/new.dat"]
+        assert read_manifest("n_1.tar.xz")["deleted"] == ["n_dir/001/file_000120.dat"]
+
+    def test_003_command(self):
+        HEADING()
+        shutil.rmtree("n_dir/002")
+        DataCommand().do_data("compress --algorithm=targz --incremental --base=n_1.tar.xz"
+                              " --source=n_dir --destination=n_2.tar.gz")
+        manifest = read_manifest("n_2.tar.gz")
+        assert manifest["members"] == []
+        assert manifest["deleted"] == ["n_dir/002", "n_dir/002/new.dat"]
+
+    def test_004_restore(self):
+        HEADING()
+        PythonData(algorithm="targz").uncompress("n_2.tar.gz", "n_restored")
+        same("n_dir", "n_restored/n_dir")
+        PythonData(algorithm="tarxz").uncompress("n_1.tar.xz", "n_restored_1")
+        assert os.path.isfile("n_restored_1/n_dir/002/new.dat")
+        assert not os.path.exists("n_restored_1/n_dir/001/file_000120.dat")
+
+    def test_005_deleted(self):
+        HEADING()
+        os.makedirs("n_victim")
+        os.makedirs("n_hostile")
+        os.symlink(os.path.abspath("n_victim"), "n_hostile/link")
+        create.ascii_file("n_victim/keep.dat", "1KB", verbose=False)
+        for name in ["../n_victim", os.path.abspath("n_victim"), "link/keep.dat", "."]:
+            manifest = dict(files={}, members=[], deleted=["n_dir/gone", name])
+            with pytest.raises(RuntimeError, match="outside of the destination"):
+                restore([("n_hostile.tar", manifest)], "n_hostile", None)
+        assert os.path.isfile("n_victim/keep.dat")
+        # the link itself is in the destination and can be deleted
+        restore([("n_hostile.tar", dict(files={}, members=[], deleted=["link"]))], "n_hostile", None)
+        assert not os.path.lexists("n_hostile/link") and os.path.isfile("n_victim/keep.dat")
+
+    def test_100_cleanup(self):
+        HEADING()
+        os.system("rm -rf n_dir n_restored n_restored_1 n_?.tar.* n_victim n_hostile")
@@ -0,0 +1,85 @@
+###############################################################
+# pytest -v --capture=no  tests/test_info.py
+# pytest -v tests/test_info.py
+###############################################################
+
+import gzip
+import lzma
+import os
+import tarfile
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.block import compress_file
+from cloudmesh.data.command.data import DataCommand
+from cloudmesh.data.data import NativeData
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.info import human_size
+from cloudmesh.data.info import walk
+
+size = 300 * 1024
+
+
+@pytest.mark.incremental
+class Test_info(object):
+
+    def test_001_create(self):
+        HEADING()
+        create.tree("i_dir", size, files=250, kind="text", distribution="pareto", seed=3, verbose=False)
+        create.log_file("i_log.txt", size, seed=3, verbose=False)
+        with open("i_log.txt", "rb") as f:
+            data = f.read()
+        with lzma.open("i_log.txt.xz", "wb") as f:
+            f.write(data)
+        with gzip.open("i_log.txt.gz", "wb") as f:
+            f.write(data)
+        compress_file("i_log.txt", "i_blocks.txt.gz", codec="gz", workers=2, block_size=64 * 1024)
+        compress_file("i_log.txt", "i_blocks.txt.xz", codec="xz", workers=2, block_size=64 * 1024)
+        with tarfile.open("i_dir.tar", "w") as tar:
+            tar.add("i_dir")
+        with tarfile.open("i_dir.tar.xz", "w:xz") as tar:
+            tar.add("i_dir")
+
+    def test_002_walk(self):
+        HEADING()
+        assert walk("i_dir") == (size, 250)
+        assert walk("i_dir", workers=4) == (size, 250)
+        assert walk("i_log.txt") == (size, 1)
+        assert PythonData.get_info("i_dir", binary=True) == str(size)
+        assert human_size(size) == "300K"
+        assert human_size(5 * 1024 ** 3 + 700 * 1024 ** 2) == "5.7G"
+
+    def test_003_archives(self):
+        HEADING()
+        data = PythonData(workers=2)
+        for source in ["i_log.txt.xz", "i_log.txt.gz", "i_blocks.txt.gz", "i_blocks.txt.xz"]:
+            result = data.info(source)
+            print(result)
+            assert result["type"] == "archive"
+            assert result["uncompressed"] == size
+            assert result["ratio"] == round(os.path.getsize(source) / size, 4)
+
+        # native zstd reads the file on stdin and is told its size
+        NativeData(algorithm="zst").compress("i_log.txt", "i_log.txt.zst")
+        assert data.info("i_log.txt.zst")["uncompressed"] == size
+
+        result = data.info("i_dir.tar")
+        # 250 files, i_dir and its subdirectories 000 to 002
+        assert result["members"] == 254
+        result = data.info("i_dir.tar.xz")
+        assert result["uncompressed"] == os.path.getsize("i_dir.tar")
+
+        result = data.info("i_dir")
+        assert result["type"] == "directory"
+        assert result["files"] == 250
+
+    def test_004_command(self):
+        HEADING()
+        DataCommand().do_data("info --source=i_dir --source=i_log.txt.xz --source=i_missing.gz")
+        results = PythonData().info_many(["i_dir", "i_missing.gz"])
+        assert [result["status"] for result in results] == ["ok", "failed"]
+
+    def test_100_cleanup(self):
+        HEADING()
+        os.system("rm -rf i_dir i_dir.tar* i_log.txt* i_blocks.txt*")
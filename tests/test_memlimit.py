@@ -0,0 +1,80 @@
+###############################################################
+# pytest -v --capture=no  tests/test_memlimit.py
+# pytest -v tests/test_memlimit.py
+###############################################################
+
+import json
+import os
+import subprocess
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.block import MB
+from cloudmesh.data.data import NativeData
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.pipeline import TOOLS
+from cloudmesh.data.pipeline import tool_command
+from cloudmesh.data.pool import fit
+from cloudmesh.data.pool import job_memory
+from cloudmesh.data.pool import pool_size
+
+
+@pytest.mark.incremental
+class Test_memlimit(object):
+
+    def test_001_fit(self):
+        HEADING()
+        assert fit("xz", 9, None, threads=4) == (9, 4)
+        # the threads are lowered before the level
+        level, threads = fit("xz", 6, 300 * MB, threads=8)
+        assert level == 6 and 1 < threads < 8
+        assert job_memory("xz", level, threads=threads) <= 300 * MB
+        # one thread at preset 9 needs 674 MB
+        level, threads = fit("xz", 9, 200 * MB, threads=4)
+        assert (level, threads) == (7, 1)
+        assert fit("bz2", 9, 4 * MB)[0] < 9
+        # the memory of an uncompress is given by the archive
+        assert fit("xz", 9, 1 * MB, action="uncompress", threads=4) == (9, 1)
+        with pytest.raises(RuntimeError):
+            fit("xz", 9, 1 * MB)
+
+    def test_002_pool(self):
+        HEADING()
+        assert pool_size("xz", 6, items=100, memlimit=200 * MB) <= 2
+        assert pool_size("xz", 6, items=100, memlimit=1 * MB) == 1
+
+    def test_003_tools(self):
+        HEADING()
+        xz = TOOLS["xz"][1]
+        assert tool_command(xz, "compress", level=6, codec="xz", memlimit=1000)[1] == "--memlimit-compress=1000"
+        assert "--memlimit-decompress=1000" in tool_command(xz, "uncompress", codec="xz", memlimit=1000)
+        zstd = TOOLS["zst"][0]
+        assert not any(arg.startswith("--memory") for arg in tool_command(zstd, "compress", codec="zst", memlimit=1000))
+        assert "--memory=1000" in tool_command(zstd, "uncompress", codec="zst", memlimit=1000)
+        assert not any("memlimit" in arg for arg in tool_command(xz, "compress", codec="xz"))
+
+    def test_004_compress(self, content):
+        HEADING()
+        create.mixed_file("m_file.dat", "2MB", seed=8, verbose=False)
+        for backend in [NativeData, PythonData]:
+            worker = backend(algorithm="xz", workers=4, memlimit="120M", metrics="m_metrics.json")
+            limits = worker.limits("compress", 9)
+            assert limits["level"] == 6 and limits["threads"] == 1 and limits["memory"] <= 120 * MB
+            worker.compress("m_file.dat", f"m_file.{backend.__name__}.xz", level=9)
+            worker.uncompress(f"m_file.{backend.__name__}.xz", f"m_file.{backend.__name__}.dat")
+            assert content(f"m_file.{backend.__name__}.dat") == content("m_file.dat")
+        with open("m_metrics.json") as f:
+            records = [json.loads(line) for line in f]
+        assert all(record["memlimit"] == 120 * MB for record in records)
+        assert records[0]["memory"] == job_memory("xz", 6)
+
+    def test_005_cli(self):
+        HEADING()
+        result = subprocess.run("cms data compress --algorithm=xz --level=9 --threads=4 --memlimit=200M "
+                                "--source=m_file.dat --destination=m_cli.xz",
+                                shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+        assert "level 9 lowered to 7" in result.stderr.decode()
+
+    def test_100_cleanup(self):
+        os.system("rm -f m_file.* m_metrics.json m_cli.xz")
@@ -0,0 +1,77 @@
+###############################################################
+# pytest -v --capture=no  tests/test_metrics.py
+# pytest -v tests/test_metrics.py
+###############################################################
+
+import json
+import os
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.command.data import DataCommand
+from cloudmesh.data.data import PythonData
+
+
+@pytest.mark.incremental
+class Test_metrics(object):
+
+    def test_001_python(self):
+        HEADING()
+        create.tree("m_dir", "2MB", files=20, kind="text", seed=3, verbose=False)
+        records = []
+        data = PythonData(algorithm="tarxz", metrics=records.append)
+        data.compress("m_dir", "m_python.tar.xz")
+        data.uncompress("m_python.tar.xz", "m_out")
+        compress, uncompress = records
+        print(compress, uncompress)
+        assert compress["operation"] == "compress" and compress["backend"] == "python"
+        assert compress["status"] == "ok"
+        assert compress["bytes_in"] == 2 * 1024 * 1024
+        assert compress["bytes_out"] == os.path.getsize("m_python.tar.xz")
+        assert set(compress["phases"]) == {"walk", "read", "compress", "write"}
+        assert sum(compress["phases"].values()) == pytest.approx(compress["seconds"], rel=0.05)
+        assert compress["throughput"] > 0
+        assert compress["cpu_user"] > 0
+        assert compress["peak_rss"] > 0
+        assert set(uncompress["phases"]) == {"read", "uncompress", "write"}
+        assert uncompress["bytes_in"] == compress["bytes_out"]
+        assert uncompress["bytes_out"] > 2 * 1024 * 1024
+
+    def test_002_native_json_lines(self, native):
+        HEADING()
+        data = native("tarxz", metrics="m_metrics.jsonl")
+        data.compress("m_dir", "m_native.tar.xz")
+        data.uncompress("m_native.tar.xz", "m_out_native")
+        with open("m_metrics.jsonl") as f:
+            records = [json.loads(line) for line in f]
+        assert [record["operation"] for record in records] == ["compress", "uncompress"]
+        assert all(record["status"] == "ok" for record in records)
+        assert records[0]["bytes_out"] == os.path.getsize("m_native.tar.xz")
+
+    def test_003_failed(self):
+        HEADING()
+        records = []
+        with pytest.raises(Exception):
+            PythonData(algorithm="xz", metrics=records.append).uncompress("m_missing.xz", "m_missing")
+        assert records[0]["status"] == "failed"
+        assert records[0]["error"]
+
+    def test_004_profile(self):
+        HEADING()
+        records = []
+        PythonData(algorithm="tarxz", metrics=records.append, profile=True).compress("m_dir", "m_profile.tar.xz")
+        profile = records[0]["profile"]
+        assert 0 < len(profile) <= 20
+        assert any("tarfile" in entry["function"] for entry in profile)
+
+    def test_005_command(self):
+        HEADING()
+        DataCommand().do_data("compress --algorithm=targz --metrics=m_command.jsonl --profile --source=m_dir"
+                              " --destination=m_command.tar.gz")
+        with open("m_command.jsonl") as f:
+            record = json.loads(f.readline())
+        assert record["algorithm"] == "targz"
+
+    def test_100_cleanup(self):
+        os.system("rm -rf m_dir m_out m_out_native m_*.tar.* m_metrics.jsonl m_command.jsonl")
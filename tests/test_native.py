@@ -0,0 +1,81 @@
+###############################################################
+# pytest -v --capture=no  tests/test_native.py
+# pytest -v tests/test_native.py
+###############################################################
+
+import io
+import os
+import shutil
+import subprocess
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data.create import ascii_file
+from cloudmesh.data.create import random_file
+from cloudmesh.data.data import NativeData
+from cloudmesh.data.pipeline import Pipeline
+from cloudmesh.data.pipeline import find_tool
+
+size = "100KB"
+
+
+@pytest.mark.incremental
+class Test_native(object):
+
+    def test_001_create_files(self):
+        HEADING()
+        os.makedirs("n_dir", exist_ok=True)
+        ascii_file(f"n_dir/n_a_{size}.txt", size)
+        random_file(f"n_dir/n_r_{size}.txt", size)
+
+    @pytest.mark.parametrize("algorithm", ["gz", "bz2", "xz", "zst", "lz4"])
+    def test_002_file(self, algorithm):
+        HEADING()
+        data = NativeData(algorithm=algorithm, workers=2)
+        data.compress(source=f"n_dir/n_r_{size}.txt",
+                      destination=f"n_r_{size}.txt.{algorithm}")
+        data.uncompress(source=f"n_r_{size}.txt.{algorithm}",
+                        destination=f"n_r_uncompressed_{size}.txt")
+        with open(f"n_dir/n_r_{size}.txt", 'rb') as a, open(f"n_r_uncompressed_{size}.txt", 'rb') as b:
+            assert a.read() == b.read()
+
+    @pytest.mark.parametrize("algorithm", ["tar", "targz", "tarbz2", "tarxz", "tarzst", "tarlz4"])
+    def test_003_directory(self, algorithm):
+        HEADING()
+        data = NativeData(algorithm=algorithm, workers=2)
+        data.compress(source="n_dir", destination=f"n_dir.{algorithm}")
+        data.uncompress(source=f"n_dir.{algorithm}", destination=f"n_restored_{algorithm}")
+        assert os.path.isfile(f"n_restored_{algorithm}/n_dir/n_a_{size}.txt")
+
+    def test_004_detect(self):
+        HEADING()
+        for codec in ["gz", "bz2", "xz"]:
+            tool = find_tool(codec)
+            print(codec, tool.name if tool else None)
+
+    def test_005_failure(self):
+        HEADING()
+        with pytest.raises(RuntimeError):
+            Pipeline(["xz", "-d", "-c"], stdin=f"n_dir/n_a_{size}.txt", stdout="n_broken.txt").run()
+        assert not os.path.exists("n_broken.txt")
+
+    def test_006_missing_tool(self):
+        HEADING()
+        # the feeder blocks on the first command until it is killed
+        with pytest.raises(FileNotFoundError):
+            Pipeline(["sleep", "61.5"], ["n-missing-tool"],
+                     stdin=io.BytesIO(bytes(4 * 1024 * 1024)), stdout="n_missing.txt").run()
+        assert not os.path.exists("n_missing.txt")
+        assert subprocess.run(["pgrep", "-f", "^sleep 61.5$"], stdout=subprocess.DEVNULL).returncode == 1
+
+    def test_007_dryrun(self):
+        HEADING()
+        data = NativeData(algorithm="tarxz", dryrun=True)
+        command = data._pipeline("compress", "n_dir", "n_dir.tar.xz")
+        print(command)
+        assert str(command).startswith("tar -cf - n_dir | ")
+
+    def test_100_cleanup(self):
+        HEADING()
+        shutil.rmtree("n_dir", ignore_errors=True)
+        os.system("rm -rf n_r_* n_dir.* n_restored_*")
@@ -0,0 +1,78 @@
+###############################################################
+# pytest -v --capture=no  tests/test_seekable.py
+# pytest -v tests/test_seekable.py
+###############################################################
+
+import filecmp
+import os
+import tarfile
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.command.data import DataCommand
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.seekable import read_index
+from cloudmesh.data.seekable import write_archive
+
+algorithms = {"tarxz": "s_dir.tar.xz", "targz": "s_dir.tar.gz", "tarbz2": "s_dir.tar.bz2"}
+
+
+@pytest.mark.incremental
+class Test_seekable(object):
+
+    def test_001_create(self):
+        HEADING()
+        create.tree("s_dir", "600KB", files=120, kind="text", distribution="lognormal",
+                    seed=5, verbose=False)
+
+    def test_002_compress(self):
+        HEADING()
+        for algorithm, archive in algorithms.items():
+            PythonData(algorithm=algorithm, workers=2).compress("s_dir", archive, level=1, seekable=True)
+            index = read_index(archive)
+            assert len(index["members"]) == 123
+            assert sum(block[2] for block in index["blocks"]) == index["size"]
+            # the archive is a regular tar archive of its codec
+            with tarfile.open(archive) as tar:
+                assert len(tar.getnames()) == 123
+        # small blocks give several blocks to choose from
+        write_archive("s_dir", "s_small.tar.xz", codec="xz", block_size=64 * 1024)
+        assert len(read_index("s_small.tar.xz")["blocks"]) > 5
+
+    def test_003_extract(self):
+        HEADING()
+        for archive in list(algorithms.values()) + ["s_small.tar.xz"]:
+            data = PythonData(workers=2)
+            names = data.extract(archive, ["s_dir/000/file_000042.dat", "s_dir/001"],
+                                 destination=f"s_out_{archive}")
+            assert names[0] == "s_dir/000/file_000042.dat"
+            assert len(names) == 1 + 1 + 20
+            assert filecmp.cmp("s_dir/000/file_000042.dat",
+                               f"s_out_{archive}/s_dir/000/file_000042.dat", shallow=False)
+            assert filecmp.cmp("s_dir/001/file_000119.dat",
+                               f"s_out_{archive}/s_dir/001/file_000119.dat", shallow=False)
+            with pytest.raises(RuntimeError):
+                data.extract(archive, ["s_dir/missing"], destination=f"s_out_{archive}")
+
+    def test_004_without_index(self):
+        HEADING()
+        os.rename("s_dir.tar.gz.idx", "s_dir.tar.gz.json")
+        data = PythonData()
+        assert len(data.list("s_dir.tar.gz")) == 123
+        data.extract("s_dir.tar.gz", ["s_dir/000/file_000007.dat"], destination="s_fallback")
+        assert filecmp.cmp("s_dir/000/file_000007.dat",
+                           "s_fallback/s_dir/000/file_000007.dat", shallow=False)
+
+    def test_005_command(self):
+        HEADING()
+        command = DataCommand()
+        command.do_data("list --source=s_dir.tar.xz")
+        command.do_data("extract --source=s_dir.tar.xz --member=s_dir/000/file_000003.dat"
+                        " --destination=s_command")
+        assert filecmp.cmp("s_dir/000/file_000003.dat",
+                           "s_command/s_dir/000/file_000003.dat", shallow=False)
+
+    def test_100_cleanup(self):
+        HEADING()
+        os.system("rm -rf s_dir s_dir.tar.* s_small.tar.xz* s_out_* s_fallback s_command")
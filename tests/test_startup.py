@@ -0,0 +1,85 @@
+###############################################################
+# pytest -v --capture=no  tests/test_startup.py
+# pytest -v tests/test_startup.py
+###############################################################
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data.capabilities import Registry
+from cloudmesh.data.capabilities import path_key
+from cloudmesh.data.pipeline import TOOLS
+from cloudmesh.data.pipeline import _single_threaded
+from cloudmesh.data.pipeline import thread_flag
+
+
+def imported(module):
+    """The milliseconds a fresh interpreter needs to import a module and the modules it loaded"""
+    code = ("import json, sys, time\n"
+            "start = time.perf_counter()\n"
+            f"import {module}\n"
+            "print(json.dumps([(time.perf_counter() - start) * 1000, sorted(sys.modules)]))\n")
+    output = subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.PIPE).stdout
+    milliseconds, modules = json.loads(output)
+    print(f"import {module}: {milliseconds:.1f} ms, {len(modules)} modules")
+    return milliseconds, set(modules)
+
+
+@pytest.mark.incremental
+class Test_startup(object):
+
+    def test_001_command(self):
+        HEADING()
+        _, modules = imported("cloudmesh.data.command.data")
+        assert not modules & {"cloudmesh.data.data", "cloudmesh.data.pipeline", "asyncio", "gzip"}
+
+    def test_002_data(self):
+        HEADING()
+        milliseconds, modules = imported("cloudmesh.data.data")
+        assert not modules & {"cloudmesh.common.Shell", "cloudmesh.common.StopWatch", "asyncio", "gzip",
+                              "multiprocessing", "cProfile", "cloudmesh.data.benchmark", "cloudmesh.data.calibrate"}
+        # the import takes about 30 ms
+        assert milliseconds < 200
+
+    def test_003_registry(self):
+        HEADING()
+        registry = Registry(cache="s_capabilities.json")
+        tar = registry.tool("tar")
+        assert tar is not None and os.path.isfile(tar.path)
+        with open("s_capabilities.json") as f:
+            content = json.load(f)
+        assert content["key"] == path_key()
+        assert content["tools"]["tar"]["path"] == tar.path
+        # the threads of a tool are probed for the flag that is asked for
+        assert registry.tool("xz", "-T").threads and not registry.tool("xz", "--s_missing").threads
+
+    def test_004_cache(self):
+        HEADING()
+        with open("s_capabilities.json") as f:
+            content = json.load(f)
+        content["tools"]["s_tool"] = {"name": "s_tool", "path": "/s_tool", "version": "1.0", "threads": True}
+        with open("s_capabilities.json", "w") as f:
+            json.dump(content, f)
+        # a new process reads the tools from the cache without probing
+        assert Registry(cache="s_capabilities.json").tool("s_tool").version == "1.0"
+        # a changed PATH probes again
+        path = os.environ["PATH"]
+        try:
+            os.environ["PATH"] = path + os.pathsep + os.path.abspath("s_bin")
+            assert Registry(cache="s_capabilities.json").tool("s_tool") is None
+        finally:
+            os.environ["PATH"] = path
+
+    def test_005_thread_flags(self):
+        HEADING()
+        flags = {tool.name: thread_flag(tool.compress) for tools in TOOLS.values() for tool in tools}
+        assert flags["pigz"] == "-p" and flags["pbzip2"] == "-p" and flags["xz"] == "-T" and flags["lz4"] is None
+        assert _single_threaded(["pigz", "-p", "{THREADS}", "-{LEVEL}", "-c"]) == ["pigz", "-{LEVEL}", "-c"]
+        assert _single_threaded(["xz", "-T{THREADS}", "-{LEVEL}", "-c"]) == ["xz", "-{LEVEL}", "-c"]
+
+    def test_100_cleanup(self):
+        os.system("rm -rf s_capabilities.json")
@@ -0,0 +1,89 @@
+###############################################################
+# pytest -v --capture=no  tests/test_stream.py
+# pytest -v tests/test_stream.py
+###############################################################
+
+import gzip
+import io
+import os
+import subprocess
+import tarfile
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.data import NativeData
+from cloudmesh.data.data import PythonData
+
+BACKENDS = [NativeData, PythonData]
+
+
+@pytest.mark.incremental
+class Test_stream(object):
+
+    def test_001_compress_stream(self, content):
+        HEADING()
+        create.mixed_file("s_file.dat", "2MB", seed=4, verbose=False)
+        expected = content("s_file.dat")
+        for backend in BACKENDS:
+            for algorithm in ["gz", "xz", "zst"]:
+                archive = io.BytesIO()
+                backend(algorithm=algorithm).compress_stream(io.BytesIO(expected), archive)
+                archive.seek(0)
+                out = io.BytesIO()
+                PythonData(algorithm=algorithm).uncompress_stream(archive, out)
+                assert out.getvalue() == expected, (backend, algorithm)
+        # gzip level 0 stores the data
+        archive = io.BytesIO()
+        PythonData(algorithm="gz").compress_stream(io.BytesIO(expected), archive, level=0)
+        assert len(archive.getvalue()) > len(expected)
+        assert gzip.decompress(archive.getvalue()) == expected
+
+    def test_002_parallel(self, content):
+        HEADING()
+        expected = content("s_file.dat")
+        with open("s_file.dat", "rb") as f:
+            PythonData(algorithm="xz", workers=4).compress_stream(f, "s_file.dat.xz")
+        for backend in BACKENDS:
+            out = io.BytesIO()
+            backend(algorithm="xz", workers=4).uncompress_stream("s_file.dat.xz", out)
+            assert out.getvalue() == expected
+
+    def test_003_directory(self):
+        HEADING()
+        create.tree("s_dir", "1MB", files=20, seed=5, verbose=False)
+        for backend in BACKENDS:
+            archive = io.BytesIO()
+            backend(algorithm="targz").compress("s_dir", archive)
+            archive.seek(0)
+            # blocks compressed in parallel are gzip members of their own,
+            # the stream mode of tarfile only reads the first one
+            with tarfile.open(fileobj=archive, mode="r:gz") as tf:
+                names = [member.name for member in tf]
+            assert "s_dir/000/file_000000.dat" in names
+            # the tar stream itself, without extracting it
+            archive.seek(0)
+            out = io.BytesIO()
+            backend(algorithm="targz").uncompress_stream(archive, out)
+            out.seek(0)
+            with tarfile.open(fileobj=out, mode="r|") as tf:
+                assert [member.name for member in tf] == names
+
+    def test_004_cli(self, content):
+        HEADING()
+        expected = content("s_file.dat")
+        for backend in ["native", "python"]:
+            archive = subprocess.run(f"cms data compress --backend={backend} --algorithm=xz --source=-",
+                                     shell=True, input=expected, stdout=subprocess.PIPE, check=True).stdout
+            out = subprocess.run(f"cms data uncompress --backend={backend} --algorithm=xz --source=-",
+                                 shell=True, input=archive, stdout=subprocess.PIPE, check=True).stdout
+            assert out == expected
+            # a tar stream from stdin is extracted into the destination
+            tar = subprocess.run("tar -cf - s_dir | gzip", shell=True, stdout=subprocess.PIPE, check=True).stdout
+            subprocess.run(f"cms data uncompress --backend={backend} --algorithm=targz --source=- "
+                           f"--destination=s_out_{backend}",
+                           shell=True, input=tar, stdout=subprocess.DEVNULL, check=True)
+            assert content(f"s_out_{backend}/s_dir/000/file_000000.dat") == content("s_dir/000/file_000000.dat")
+
+    def test_100_cleanup(self):
+        os.system("rm -rf s_file.dat s_file.dat.xz s_dir s_out_native s_out_python")
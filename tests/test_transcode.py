@@ -0,0 +1,79 @@
+###############################################################
+# pytest -v --capture=no  tests/test_transcode.py
+# pytest -v tests/test_transcode.py
+###############################################################
+
+import filecmp
+import json
+import lzma
+import os
+import subprocess
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.block import scan
+from cloudmesh.data.data import NativeData
+from cloudmesh.data.data import PythonData
+
+
+@pytest.mark.incremental
+class Test_transcode(object):
+
+    def test_001_file(self, content):
+        HEADING()
+        create.mixed_file("r_file.dat", "8MB", seed=10, verbose=False)
+        PythonData(algorithm="gz").compress("r_file.dat", "r_file.dat.gz")
+        for backend in [NativeData, PythonData]:
+            destination = f"r_file.{backend.__name__}.xz"
+            assert backend(algorithm="xz").transcode("r_file.dat.gz", destination) == destination
+            assert lzma.decompress(content(destination)) == content("r_file.dat")
+
+    def test_002_directory(self):
+        HEADING()
+        create.tree("r_dir", "2MB", files=20, seed=11, verbose=False)
+        PythonData(algorithm="targz").compress("r_dir", "r_dir.tar.gz")
+        for backend in [NativeData, PythonData]:
+            # a tar archive stays a tar archive
+            os.system("rm -f r_dir.tar.xz")
+            assert backend(algorithm="xz").transcode("r_dir.tar.gz") == "r_dir.tar.xz"
+            out = f"r_out_{backend.__name__}"
+            backend(algorithm="tarxz").uncompress("r_dir.tar.xz", out)
+            assert not filecmp.dircmp("r_dir/000", f"{out}/r_dir/000").diff_files
+
+    def test_003_blocks(self, content):
+        HEADING()
+        PythonData(algorithm="xz", workers=4).transcode("r_file.dat.gz", "r_blocks.xz", level=1)
+        with open("r_blocks.xz", "rb") as f:
+            assert len(scan(f, "xz")) > 1
+        assert lzma.decompress(content("r_blocks.xz")) == content("r_file.dat")
+        with pytest.raises(RuntimeError, match="into itself"):
+            PythonData(algorithm="gz").transcode("r_file.dat.gz")
+        with pytest.raises(RuntimeError, match="not a tar archive"):
+            PythonData(algorithm="tar").transcode("r_file.dat.gz")
+
+    def test_004_metrics(self):
+        HEADING()
+        PythonData(algorithm="bz2", metrics="r_metrics.json").transcode("r_blocks.xz")
+        with open("r_metrics.json") as f:
+            record = json.loads(f.readline())
+        assert record["operation"] == "transcode"
+        assert record["bytes_out"] == os.path.getsize("r_blocks.bz2")
+        assert record["throughput"] is not None
+
+    def test_005_many(self):
+        HEADING()
+        results = PythonData(algorithm="zst").transcode_many(["r_file.dat.gz", "r_dir.tar.gz", "r_missing.dat"],
+                                                             destination="r_many", jobs=2)
+        assert [result["status"] for result in results] == ["ok", "ok", "failed"]
+        assert os.path.isfile("r_many/r_file.dat.zst") and os.path.isfile("r_many/r_dir.tar.zst")
+
+    def test_006_cli(self):
+        HEADING()
+        subprocess.run("cms data transcode --source=r_dir.tar.gz --destination=r_cli.tar.bz2",
+                       shell=True, stdout=subprocess.DEVNULL, check=True)
+        subprocess.run("mkdir -p r_out_cli && tar -xjf r_cli.tar.bz2 -C r_out_cli", shell=True, check=True)
+        assert not filecmp.dircmp("r_dir/000", "r_out_cli/r_dir/000").diff_files
+
+    def test_100_cleanup(self):
+        os.system("rm -rf r_file.* r_dir r_dir.tar.* r_out_* r_blocks.* r_metrics.json r_many r_cli.tar.bz2")
@@ -0,0 +1,92 @@
+###############################################################
+# pytest -v --capture=no  tests/test_transfer.py
+# pytest -v tests/test_transfer.py
+###############################################################
+
+import filecmp
+import io
+import os
+import tarfile
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.digest import file_digest
+from cloudmesh.data.transfer import KernelTarFile
+from cloudmesh.data.transfer import copy_file
+from cloudmesh.data.transfer import copy_range
+from cloudmesh.data.transfer import copy_stream
+
+
+class ShortWriter(io.RawIOBase):
+    """Raw file that writes at most 1000 bytes per call"""
+
+    def __init__(self):
+        super().__init__()
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        with memoryview(b) as view:
+            self.data += view[:1000]
+        return min(len(b), 1000)
+
+
+@pytest.mark.incremental
+class Test_transfer(object):
+
+    def test_001_copy_stream(self):
+        HEADING()
+        create.mixed_file("t_file.dat", "3MB", seed=2, verbose=False)
+        with open("t_file.dat", "rb") as f:
+            expected = f.read()
+        out = ShortWriter()
+        with open("t_file.dat", "rb") as f:
+            assert copy_stream(f, out, size=12345) == len(expected)
+        assert out.data == expected
+
+    def test_002_copy_file(self):
+        HEADING()
+        for threshold in [0, 1024 ** 3]:
+            out = io.BytesIO()
+            assert copy_file("t_file.dat", out, size=100000, threshold=threshold) == 3 * 1024 * 1024
+            with open("t_file.dat", "rb") as f:
+                assert out.getvalue() == f.read()
+
+    def test_003_copy_range(self):
+        HEADING()
+        with open("t_file.dat", "rb") as source, open("t_range.dat", "wb") as target:
+            assert copy_range(source.fileno(), target.fileno(), 2000, offset=100) == 2000
+            assert source.tell() == 0
+        with open("t_file.dat", "rb") as f:
+            f.seek(100)
+            with open("t_range.dat", "rb") as g:
+                assert g.read() == f.read(2000)
+
+    def test_004_tar(self):
+        HEADING()
+        create.tree("t_dir", "2MB", files=30, kind="mixed", seed=6, verbose=False)
+        with open("t_dir/000/empty", "wb"):
+            pass
+        with tarfile.open("t_plain.tar", "w:", format=tarfile.PAX_FORMAT) as tf:
+            tf.add("t_dir")
+        with KernelTarFile.open("t_kernel.tar", "w:", format=tarfile.PAX_FORMAT) as tf:
+            tf.add("t_dir")
+        assert file_digest("t_plain.tar") == file_digest("t_kernel.tar")
+        with KernelTarFile.open("t_kernel.tar", "r:") as tf:
+            tf.extractall("t_out")
+        names = os.listdir("t_dir/000")
+        assert not filecmp.cmpfiles("t_dir/000", "t_out/t_dir/000", names, shallow=False)[1]
+
+    def test_005_python_tar(self):
+        HEADING()
+        PythonData(algorithm="tar").compress("t_dir", "t_python.tar")
+        PythonData(algorithm="tar").uncompress("t_python.tar", "t_python")
+        names = os.listdir("t_dir/000")
+        assert not filecmp.cmpfiles("t_dir/000", "t_python/t_dir/000", names, shallow=False)[1]
+
+    def test_100_cleanup(self):
+        os.system("rm -rf t_file.dat t_range.dat t_dir t_out t_python t_*.tar")
@@ -0,0 +1,99 @@
+###############################################################
+# pytest -v --capture=no  tests/test_volume.py
+# pytest -v tests/test_volume.py
+###############################################################
+
+import asyncio
+import filecmp
+import gzip
+import lzma
+import os
+import subprocess
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.data import create
+from cloudmesh.data.block import MB
+from cloudmesh.data.data import CompressExtensions
+from cloudmesh.data.data import NativeData
+from cloudmesh.data.data import PythonData
+from cloudmesh.data.volume import parse_size
+from cloudmesh.data.volume import read_volumes
+
+
+@pytest.mark.incremental
+class Test_volume(object):
+
+    def test_001_parse_size(self):
+        HEADING()
+        assert parse_size("2G") == 2 * 1024 ** 3
+        assert parse_size("512MB") == 512 * MB
+        assert parse_size("1.5k") == 1536
+        assert parse_size(1000) == 1000
+        with pytest.raises(RuntimeError):
+            parse_size("2 pieces")
+
+    def test_002_compress(self):
+        HEADING()
+        create.tree("v_dir", "6MB", files=30, seed=6, verbose=False)
+        for backend, codec in [(NativeData, "xz"), (PythonData, "gz"), (PythonData, "bz2")]:
+            backend(algorithm=f"tar{codec}", workers=4).compress("v_dir", f"v_dir.tar.{codec}", volume_size="1M")
+            volumes = read_volumes(f"v_dir.tar.{codec}")
+            assert len(volumes["parts"]) > 2
+            for part in volumes["paths"]:
+                assert os.path.getsize(part) <= MB
+            assert not os.path.exists(f"v_dir.tar.{codec}")
+
+    def test_003_independent(self, content):
+        HEADING()
+        volumes = read_volumes("v_dir.tar.xz")
+        for part, path in zip(volumes["parts"], volumes["paths"]):
+            assert len(lzma.decompress(content(path))) == part["uncompressed"]
+        # concatenated the parts are the whole archive
+        data = b"".join(gzip.decompress(content(path)) for path in read_volumes("v_dir.tar.gz")["paths"])
+        assert data == gzip.decompress(b"".join(content(path) for path in read_volumes("v_dir.tar.gz")["paths"]))
+
+    def test_004_uncompress(self):
+        HEADING()
+        for backend in [NativeData, PythonData]:
+            for codec, source in [("xz", "v_dir.tar.xz"), ("gz", "v_dir.tar.gz.volumes"), ("bz2", "v_dir.tar.bz2.002")]:
+                destination = f"v_out_{backend.__name__}_{codec}"
+                backend(algorithm=CompressExtensions.detect(source), workers=4).uncompress(source, destination)
+                assert not filecmp.dircmp("v_dir/000", f"{destination}/v_dir/000").diff_files
+
+    def test_005_file(self, content):
+        HEADING()
+        create.mixed_file("v_file.dat", "3MB", seed=7, verbose=False)
+        PythonData(algorithm="xz", workers=2).compress("v_file.dat", "v_file.dat.xz", volume_size="1MB")
+        NativeData(algorithm="xz", workers=2).uncompress("v_file.dat.xz.001", "v_file.out")
+        assert content("v_file.out") == content("v_file.dat")
+
+    def test_006_incomplete(self):
+        HEADING()
+        os.remove("v_file.dat.xz.002")
+        with pytest.raises(RuntimeError, match="v_file.dat.xz.002 is missing"):
+            PythonData(algorithm="xz").uncompress("v_file.dat.xz", "v_file.out")
+        with open("v_dir.tar.gz.001", "ab") as f:
+            f.write(b"x")
+        with pytest.raises(RuntimeError, match="v_dir.tar.gz.001 has"):
+            read_volumes("v_dir.tar.gz")
+
+    def test_007_cli(self):
+        HEADING()
+        subprocess.run("cms data compress --algorithm=targz --volume-size=2M --threads=2 "
+                       "--source=v_dir --destination=v_cli.tar.gz",
+                       shell=True, stdout=subprocess.DEVNULL, check=True)
+        assert read_volumes("v_cli.tar.gz")["codec"] == "gz"
+        subprocess.run("cms data uncompress --threads=2 --source=v_cli.tar.gz.001 --destination=v_out_cli",
+                       shell=True, stdout=subprocess.DEVNULL, check=True)
+        assert not filecmp.dircmp("v_dir/000", "v_out_cli/v_dir/000").diff_files
+
+    def test_008_async(self):
+        HEADING()
+        for backend in [NativeData, PythonData]:
+            archive = f"v_async_{backend.__name__}.tar.xz"
+            asyncio.run(backend(algorithm="tarxz", workers=2).compress_async("v_dir", archive, volume_size="1M"))
+            assert len(read_volumes(archive)["parts"]) > 2
+
+    def test_100_cleanup(self):
+        os.system("rm -rf v_dir v_dir.tar.* v_out_* v_file.* v_cli.tar.gz.* v_async_*")